@@ -0,0 +1,77 @@
+"""
+Helpers shared by the benchmark scripts
+"""
+
+import json
+import math
+import platform
+import subprocess
+import sys
+import typing
+from copy import deepcopy
+
+from pluthon import compiler_config
+
+OPT_LEVELS = {f"O{i}": config for i, config in enumerate(compiler_config.OPT_CONFIGS)}
+
+# the generated programs are deeply nested, the visitors are recursive
+RECURSION_LIMIT = 20000
+
+
+def setup():
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), RECURSION_LIMIT))
+
+
+def git_revision() -> typing.Optional[str]:
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+            )
+            .decode()
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def report_header() -> dict:
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def write_report(report: dict, path: typing.Optional[str]):
+    dumped = json.dumps(report, indent=2, sort_keys=True)
+    if path is None:
+        print(dumped)
+    else:
+        with open(path, "w") as f:
+            f.write(dumped + "\n")
+
+
+def load_report(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def fresh(x):
+    """The compiler modifies its input in place, so every measurement needs its own copy"""
+    return deepcopy(x)
+
+
+def fit_exponent(sizes: typing.Sequence[float], values: typing.Sequence[float]):
+    """
+    Least squares fit of log(value) = e * log(size) + c, returns the exponent e
+    """
+    points = [(math.log(s), math.log(v)) for s, v in zip(sizes, values) if v > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
@@ -0,0 +1,186 @@
+"""
+Compile time benchmark
+
+Compiles every synthetic corpus from benchmarks/corpora.py at every size and optimization
+level and records the wall time and peak memory of pluthon.compile.
+The compile time is fitted against the corpus size to obtain a scaling exponent,
+which is checked against the maximum tolerated exponent of the corpus.
+
+Usage (from the repository root):
+
+    python -m benchmarks.compile_time --output compile_time.json
+    python -m benchmarks.compile_time --compare compile_time.json
+
+The exit code is non-zero if a scaling exponent is exceeded or, when comparing,
+a measurement regressed by more than the tolerance.
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+import typing
+
+from pluthon import compile
+
+from .common import (
+    OPT_LEVELS,
+    setup,
+    fresh,
+    fit_exponent,
+    report_header,
+    write_report,
+    load_report,
+)
+from .corpora import CORPORA, Corpus
+
+
+def measure_time(program, config, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        x = fresh(program)
+        gc.collect()
+        start = time.perf_counter()
+        compile(x, config)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_peak_memory(program, config) -> int:
+    x = fresh(program)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        compile(x, config)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run_corpus(
+    corpus: Corpus, levels: typing.List[str], repeat: int, memory: bool
+) -> dict:
+    results = {}
+    for level in levels:
+        config = OPT_LEVELS[level]
+        measurements = []
+        for size in corpus.sizes:
+            program = corpus.build(size)
+            measurement = {
+                "size": size,
+                "time": measure_time(program, config, repeat),
+            }
+            if memory:
+                measurement["peak_memory"] = measure_peak_memory(program, config)
+            measurements.append(measurement)
+        exponent = fit_exponent(
+            [m["size"] for m in measurements], [m["time"] for m in measurements]
+        )
+        results[level] = {
+            "measurements": measurements,
+            "time_exponent": exponent,
+            "max_exponent": corpus.max_exponent,
+        }
+        if memory:
+            results[level]["memory_exponent"] = fit_exponent(
+                [m["size"] for m in measurements],
+                [m["peak_memory"] for m in measurements],
+            )
+    return results
+
+
+def check_exponents(report: dict) -> typing.List[str]:
+    failures = []
+    for corpus, levels in report["corpora"].items():
+        for level, res in levels.items():
+            if (
+                res["time_exponent"] is not None
+                and res["time_exponent"] > res["max_exponent"]
+            ):
+                failures.append(
+                    f"{corpus} at {level}: compile time scales with exponent {res['time_exponent']:.2f} > {res['max_exponent']:.2f}"
+                )
+    return failures
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> typing.List[str]:
+    failures = []
+    for corpus, levels in report["corpora"].items():
+        for level, res in levels.items():
+            try:
+                base_measurements = baseline["corpora"][corpus][level]["measurements"]
+            except KeyError:
+                continue
+            base_by_size = {m["size"]: m for m in base_measurements}
+            for m in res["measurements"]:
+                base = base_by_size.get(m["size"])
+                if base is None:
+                    continue
+                for key in ("time", "peak_memory"):
+                    if key not in m or key not in base or base[key] <= 0:
+                        continue
+                    ratio = m[key] / base[key]
+                    print(
+                        f"{corpus:>20} {level} size={m['size']:<4} {key:>11}: {ratio:6.2f}x"
+                    )
+                    if ratio > 1 + tolerance:
+                        failures.append(
+                            f"{corpus} at {level}, size {m['size']}: {key} regressed by {ratio:.2f}x"
+                        )
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        choices=[c.name for c in CORPORA],
+        help="Only run the given corpus (can be given multiple times)",
+    )
+    parser.add_argument(
+        "--level",
+        action="append",
+        choices=list(OPT_LEVELS),
+        help="Only run the given optimization level (can be given multiple times)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of repetitions per measurement, the fastest is reported",
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="Do not measure peak memory"
+    )
+    parser.add_argument("--output", help="Write the report to this file")
+    parser.add_argument("--compare", help="Compare against a previously written report")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Relative slowdown tolerated when comparing against a report",
+    )
+    args = parser.parse_args(argv)
+    setup()
+
+    levels = args.level or list(OPT_LEVELS)
+    corpora = [c for c in CORPORA if not args.corpus or c.name in args.corpus]
+    report = report_header()
+    report["corpora"] = {
+        c.name: run_corpus(c, levels, args.repeat, not args.no_memory) for c in corpora
+    }
+    write_report(report, args.output)
+
+    failures = check_exponents(report)
+    if args.compare:
+        failures.extend(compare(report, load_report(args.compare), args.tolerance))
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Synthetic, parameterized pluthon programs used to track how the compiler scales.
+
+Every corpus is a function that takes a single size parameter and returns a closed
+pluthon Program. The programs are deterministic so that measurements are comparable
+across commits.
+"""
+
+import typing
+from dataclasses import dataclass
+
+from pluthon import (
+    Program,
+    AST,
+    Integer,
+    Bool,
+    PVar,
+    PLet,
+    PLambda,
+    AddInteger,
+    FoldList,
+    MapList,
+    FilterList,
+    AnyList,
+    AllList,
+    LengthList,
+    IndexAccessList,
+    NthField,
+    Range,
+    Not,
+    And,
+    Or,
+    ConcatList,
+    EmptyIntegerList,
+    PrependList,
+    ConstrData,
+    IData,
+    SingleDataList,
+)
+from uplc import ast as uplc_ast
+
+PROGRAM_VERSION = (1, 0, 0)
+
+
+def _int_list(n: int) -> AST:
+    res = EmptyIntegerList()
+    for i in reversed(range(n)):
+        res = PrependList(Integer(i), res)
+    return res
+
+
+def _sum_op() -> AST:
+    return PLambda(["a", "x"], AddInteger(PVar("a"), PVar("x")))
+
+
+def _always_true() -> AST:
+    return PLambda(["x"], Not(Bool(False)))
+
+
+# One builder per pattern class, each one takes an index to vary the constants
+# such that occurrences are not trivially identical
+PATTERN_BUILDERS: typing.List[typing.Callable[[int], AST]] = [
+    lambda i: FoldList(Range(Integer(i % 7)), _sum_op(), Integer(i)),
+    lambda i: LengthList(MapList(_int_list(3), PLambda(["x"], PVar("x")))),
+    lambda i: LengthList(FilterList(_int_list(3), _always_true())),
+    lambda i: AnyList(_int_list(2), PLambda(["x"], Bool(i % 2 == 0))),
+    lambda i: AllList(_int_list(2), PLambda(["x"], Bool(i % 2 == 1))),
+    lambda i: IndexAccessList(_int_list(3), PLet([("i", Integer(i % 3))], PVar("i"))),
+    lambda i: NthField(
+        ConstrData(Integer(0), SingleDataList(IData(Integer(i)))),
+        PLet([("i", Integer(0))], PVar("i")),
+    ),
+    lambda i: And(Bool(i % 2 == 0), Or(Bool(False), Not(Bool(True)))),
+]
+
+
+def nested_lets(n: int) -> Program:
+    """n nested let bindings, each depending on the previous one"""
+    term = PVar(f"x{n}")
+    for i in reversed(range(1, n + 1)):
+        term = PLet([(f"x{i}", AddInteger(PVar(f"x{i - 1}"), Integer(1)))], term)
+    return Program(PROGRAM_VERSION, PLet([("x0", Integer(0))], term))
+
+
+def pattern_mix(k: int, m: int) -> Program:
+    """k distinct pattern classes with m occurrences each"""
+    if not 0 < k <= len(PATTERN_BUILDERS):
+        raise ValueError(f"k must be between 1 and {len(PATTERN_BUILDERS)}")
+    bindings = [
+        (f"v{j}_{i}", PATTERN_BUILDERS[j](i)) for i in range(m) for j in range(k)
+    ]
+    return Program(PROGRAM_VERSION, PLet(bindings, Integer(0)))
+
+
+def pattern_occurrences(m: int) -> Program:
+    """All available pattern classes with m occurrences each"""
+    return pattern_mix(len(PATTERN_BUILDERS), m)
+
+
+def pattern_classes(k: int) -> Program:
+    """k pattern classes with a fixed number of occurrences each"""
+    return pattern_mix(k, 4)
+
+
+def deep_index_access(i: int) -> Program:
+    """A single constant index access at depth i into a list of length i + 1"""
+    return Program(PROGRAM_VERSION, IndexAccessList(_int_list(i + 1), Integer(i)))
+
+
+def concat_chain(n: int) -> Program:
+    """A chain of n list concatenations"""
+    return Program(
+        PROGRAM_VERSION,
+        LengthList(
+            ConcatList(uplc_ast.BuiltinInteger(0))(*(_int_list(2) for _ in range(n)))
+        ),
+    )
+
+
+@dataclass(frozen=True)
+class Corpus:
+    name: str
+    build: typing.Callable[[int], Program]
+    sizes: typing.Tuple[int, ...]
+    # the maximal tolerated exponent of compile time in the size parameter
+    max_exponent: float
+
+
+CORPORA = [
+    Corpus("nested_lets", nested_lets, (25, 50, 100, 200), 1.5),
+    Corpus("pattern_occurrences", pattern_occurrences, (2, 4, 8, 16), 1.5),
+    Corpus("pattern_classes", pattern_classes, (1, 2, 4, 8), 2.0),
+    Corpus("deep_index_access", deep_index_access, (4, 8, 16, 32), 2.0),
+    Corpus("concat_chain", concat_chain, (4, 8, 16, 32), 1.5),
+]
@@ -0,0 +1,139 @@
+"""
+Differential benchmark on randomly generated programs
+
+Generates random programs with benchmarks/generator.py, compiles them at O0 and at every
+higher optimization level and evaluates them on the same random arguments.
+Results at every level must be equal to the result at O0 (errors are considered equal
+to each other, traces are not compared since they may be removed by the optimizer).
+Reports the compile time, script size and ExBudget of every level relative to O0.
+
+Usage (from the repository root):
+
+    python -m benchmarks.differential --programs 200 --seed 0
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import typing
+
+from uplc import eval as uplc_eval, flatten
+
+from pluthon import compile, dumps
+
+from .common import OPT_LEVELS, setup, fresh, report_header, write_report
+from .generator import generate, GeneratorConfig
+
+BASE_LEVEL = "O0"
+
+
+def result_key(result) -> str:
+    if isinstance(result, Exception):
+        return "<error>"
+    return result.dumps()
+
+
+def evaluate(program, args, config) -> dict:
+    start = time.perf_counter()
+    compiled = compile(fresh(program), config)
+    compile_time = time.perf_counter() - start
+    res = uplc_eval(compiled, *args)
+    return {
+        "result": result_key(res.result),
+        "compile_time": compile_time,
+        "size": len(flatten(compiled)),
+        "cpu": res.cost.cpu,
+        "memory": res.cost.memory,
+    }
+
+
+def run(
+    seeds: typing.Iterable[int], config: GeneratorConfig, levels: typing.List[str]
+) -> dict:
+    mismatches = []
+    ratios = {
+        level: {"compile_time": [], "size": [], "cpu": [], "memory": []}
+        for level in levels
+        if level != BASE_LEVEL
+    }
+    for seed in seeds:
+        program, args = generate(seed, config)
+        base = evaluate(program, args, OPT_LEVELS[BASE_LEVEL])
+        for level in ratios:
+            res = evaluate(program, args, OPT_LEVELS[level])
+            if res["result"] != base["result"]:
+                mismatches.append(
+                    {
+                        "seed": seed,
+                        "level": level,
+                        "expected": base["result"],
+                        "actual": res["result"],
+                        "program": dumps(program),
+                        "arguments": [a.dumps() for a in args],
+                    }
+                )
+            if base["result"] == "<error>":
+                # costs of failing programs are not meaningful
+                continue
+            for key, values in ratios[level].items():
+                if base[key] > 0:
+                    values.append(res[key] / base[key])
+    summary = {
+        level: {
+            key: {
+                "mean": statistics.mean(values),
+                "median": statistics.median(values),
+                "min": min(values),
+                "max": max(values),
+            }
+            for key, values in keys.items()
+            if values
+        }
+        for level, keys in ratios.items()
+    }
+    return {"mismatches": mismatches, "relative_to_O0": summary}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--programs", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first program")
+    parser.add_argument("--size", type=int, default=GeneratorConfig.size)
+    parser.add_argument("--max-depth", type=int, default=GeneratorConfig.max_depth)
+    parser.add_argument(
+        "--weight",
+        action="append",
+        default=[],
+        metavar="PRODUCTION=WEIGHT",
+        help="Relative weight of a production of the generator, e.g. FoldList=3",
+    )
+    parser.add_argument(
+        "--level",
+        action="append",
+        choices=list(OPT_LEVELS),
+        help="Only compare the given optimization level (can be given multiple times)",
+    )
+    parser.add_argument("--output", help="Write the report to this file")
+    args = parser.parse_args(argv)
+    setup()
+
+    weights = {}
+    for w in args.weight:
+        name, value = w.split("=")
+        weights[name] = float(value)
+    config = GeneratorConfig(size=args.size, max_depth=args.max_depth, weights=weights)
+    levels = args.level or list(OPT_LEVELS)
+    report = report_header()
+    report.update(run(range(args.seed, args.seed + args.programs), config, levels))
+    write_report(report, args.output)
+    for mismatch in report["mismatches"]:
+        print(
+            f"Mismatch for seed {mismatch['seed']} at {mismatch['level']}: expected {mismatch['expected']}, got {mismatch['actual']}",
+            file=sys.stderr,
+        )
+    return 1 if report["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
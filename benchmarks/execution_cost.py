@@ -0,0 +1,428 @@
+"""
+Execution cost benchmark
+
+Evaluates every sugar pattern of pluthon_sugar.py and pluthon_functional_data.py
+on representative input sizes under every optimization level and records the
+CPU and memory budget and the size of the serialized script.
+Inputs are passed as arguments to the compiled script such that
+compile time evaluation can not remove the measured computation.
+
+Usage (from the repository root):
+
+    python -m benchmarks.execution_cost --check
+    python -m benchmarks.execution_cost --update
+
+--check fails if the cost of any case increased with respect to the stored baseline
+or if a higher optimization level costs more CPU or memory than a lower one (see LEVEL_PAIRS),
+--update overwrites the stored baseline with the current measurements.
+"""
+
+import argparse
+import os
+import sys
+import typing
+from dataclasses import dataclass
+
+from uplc import ast as uplc_ast, eval as uplc_eval, flatten
+
+from pluthon import (
+    AST,
+    Program,
+    Integer,
+    UPLCConstant,
+    Bool,
+    PVar,
+    PLambda,
+    compile,
+    AddInteger,
+    SubtractInteger,
+    LessThanInteger,
+    EqualsInteger,
+    IData,
+    UnIData,
+    ConstrData,
+    MkPairData,
+    Not,
+    Iff,
+    And,
+    Or,
+    Xor,
+    Implies,
+    NotEqualsInteger,
+    Negate,
+    SingleDataList,
+    EmptyDataList,
+    SingleDataPairList,
+    FoldList,
+    FoldListAbort,
+    RFoldList,
+    ConstantIndexAccessList,
+    ConstantIndexAccessListFast,
+    IndexAccessList,
+    IndexAccessListFast,
+    Range,
+    FoldRange,
+    MapRange,
+    MapList,
+    FindList,
+    AnyList,
+    AllList,
+    FilterList,
+    MapFilterList,
+    LengthList,
+    TakeList,
+    DropList,
+    SliceList,
+    Constructor,
+    Fields,
+    NthField,
+    ConstantNthField,
+    ConstantNthFieldFast,
+    NoneData,
+    SomeData,
+    AppendList,
+    ConcatList,
+    FunctionalMap,
+    FunctionalMapAccess,
+    FunctionalTuple,
+    FunctionalTupleAccess,
+)
+
+from .common import OPT_LEVELS, setup, report_header, write_report, load_report
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(__file__), "baselines", "execution_cost.json"
+)
+
+SIZES = (1, 8, 32)
+
+INPUT = "input"
+
+
+def int_list_input(n: int) -> uplc_ast.Constant:
+    return uplc_ast.BuiltinList(
+        [uplc_ast.BuiltinInteger(i) for i in range(n)], uplc_ast.BuiltinInteger(0)
+    )
+
+
+def data_list_input(n: int) -> uplc_ast.Constant:
+    return uplc_ast.BuiltinList(
+        [uplc_ast.PlutusInteger(i) for i in range(n)], uplc_ast.PlutusInteger(0)
+    )
+
+
+def constr_input(n: int) -> uplc_ast.Constant:
+    return uplc_ast.PlutusConstr(0, [uplc_ast.PlutusInteger(i) for i in range(n)])
+
+
+def int_input(n: int) -> uplc_ast.Constant:
+    return uplc_ast.BuiltinInteger(n)
+
+
+def _inp():
+    return PVar(INPUT)
+
+
+def _last(n: int) -> AST:
+    return Integer(n - 1)
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    # the benchmarked term, may refer to the input as PVar("input")
+    term: typing.Callable[[int], AST]
+    # the input passed to the script for a given size
+    input: typing.Callable[[int], uplc_ast.Constant]
+    sizes: typing.Tuple[int, ...] = SIZES
+
+
+def _sum():
+    return PLambda(["a", "x"], AddInteger(PVar("a"), PVar("x")))
+
+
+def _lt(n):
+    return PLambda(["x"], LessThanInteger(PVar("x"), Integer(n)))
+
+
+def _data_incr():
+    return PLambda(["x"], IData(AddInteger(UnIData(PVar("x")), Integer(1))))
+
+
+def _bool_case(name: str, op: typing.Callable[[AST, AST], AST]) -> Case:
+    return Case(
+        name,
+        lambda n: op(EqualsInteger(_inp(), Integer(0)), Bool(True)),
+        int_input,
+        (0, 1),
+    )
+
+
+def _index_access_fast_case(step: int) -> Case:
+    return Case(
+        f"IndexAccessListFast({step})",
+        lambda n: IndexAccessListFast(step)(_inp(), _last(n)),
+        int_list_input,
+    )
+
+
+CASES: typing.List[Case] = (
+    [
+        _bool_case("Not", lambda x, y: Not(x)),
+        _bool_case("Iff", Iff),
+        _bool_case("And", And),
+        _bool_case("Or", Or),
+        _bool_case("Xor", Xor),
+        _bool_case("Implies", Implies),
+        Case(
+            "NotEqualsInteger",
+            lambda n: NotEqualsInteger(_inp(), Integer(1)),
+            int_input,
+            (1,),
+        ),
+        Case("Negate", lambda n: Negate(_inp()), int_input, (1,)),
+        Case(
+            "SingleDataList", lambda n: SingleDataList(IData(_inp())), int_input, (1,)
+        ),
+        Case(
+            "SingleDataPairList",
+            lambda n: SingleDataPairList(MkPairData(IData(_inp()), IData(_inp()))),
+            int_input,
+            (1,),
+        ),
+        Case(
+            "FoldList", lambda n: FoldList(_inp(), _sum(), Integer(0)), int_list_input
+        ),
+        Case(
+            "FoldListAbort",
+            lambda n: FoldListAbort(_inp(), _sum(), Integer(0), _lt(-1)),
+            int_list_input,
+        ),
+        Case(
+            "RFoldList", lambda n: RFoldList(_inp(), _sum(), Integer(0)), int_list_input
+        ),
+        Case(
+            "ConstantIndexAccessList",
+            lambda n: ConstantIndexAccessList(_inp(), n - 1),
+            int_list_input,
+        ),
+        Case(
+            "ConstantIndexAccessListFast",
+            lambda n: ConstantIndexAccessListFast(_inp(), n - 1),
+            int_list_input,
+        ),
+        Case(
+            "IndexAccessList",
+            lambda n: IndexAccessList(_inp(), _last(n)),
+            int_list_input,
+        ),
+        Case(
+            "IndexAccessList(variable)",
+            lambda n: IndexAccessList(
+                UPLCConstant(int_list_input(n)), SubtractInteger(_inp(), Integer(1))
+            ),
+            int_input,
+        ),
+    ]
+    + [_index_access_fast_case(step) for step in (2, 5, 10)]
+    + [
+        Case("Range", lambda n: Range(_inp()), int_input),
+        Case("FoldRange", lambda n: FoldRange(_inp(), _sum(), Integer(0)), int_input),
+        Case(
+            "MapRange",
+            lambda n: MapRange(
+                _inp(), PLambda(["x"], IData(PVar("x"))), empty_list=EmptyDataList()
+            ),
+            int_input,
+        ),
+        Case("MapList", lambda n: MapList(_inp(), _data_incr()), data_list_input),
+        Case(
+            "FindList",
+            lambda n: FindList(_inp(), _lt(-1), Integer(-1)),
+            int_list_input,
+        ),
+        Case("AnyList", lambda n: AnyList(_inp(), _lt(-1)), int_list_input),
+        Case("AllList", lambda n: AllList(_inp(), _lt(n)), int_list_input),
+        Case(
+            "FilterList",
+            lambda n: FilterList(
+                _inp(),
+                PLambda(["x"], LessThanInteger(UnIData(PVar("x")), Integer(n // 2))),
+            ),
+            data_list_input,
+        ),
+        Case(
+            "MapFilterList",
+            lambda n: MapFilterList(
+                _inp(),
+                PLambda(["x"], LessThanInteger(UnIData(PVar("x")), Integer(n // 2))),
+                _data_incr(),
+            ),
+            data_list_input,
+        ),
+        Case("LengthList", lambda n: LengthList(_inp()), int_list_input),
+        Case("TakeList", lambda n: TakeList(_inp(), Integer(n // 2)), data_list_input),
+        Case("DropList", lambda n: DropList(_inp(), Integer(n // 2)), data_list_input),
+        Case(
+            "SliceList",
+            lambda n: SliceList(Integer(n // 4), Integer(n // 2), _inp()),
+            data_list_input,
+        ),
+        Case("AppendList", lambda n: AppendList(_inp(), _inp()), data_list_input),
+        Case(
+            "ConcatList",
+            lambda n: ConcatList(uplc_ast.BuiltinInteger(0))(_inp(), _inp(), _inp()),
+            int_list_input,
+        ),
+        Case("Constructor", lambda n: Constructor(_inp()), constr_input, (1,)),
+        Case("Fields", lambda n: Fields(_inp()), constr_input, (1,)),
+        Case("NthField", lambda n: NthField(_inp(), _last(n)), constr_input),
+        Case(
+            "ConstantNthField", lambda n: ConstantNthField(_inp(), n - 1), constr_input
+        ),
+        Case(
+            "ConstantNthFieldFast",
+            lambda n: ConstantNthFieldFast(_inp(), n - 1),
+            constr_input,
+        ),
+        Case(
+            "NoneData",
+            lambda n: ConstrData(_inp(), SingleDataList(NoneData())),
+            int_input,
+            (1,),
+        ),
+        Case("SomeData", lambda n: SomeData(IData(_inp())), int_input, (1,)),
+        Case(
+            "FunctionalMapAccess",
+            lambda n: FunctionalMapAccess(
+                FunctionalMap({i: Integer(i) for i in range(n)}), _inp()
+            ),
+            lambda n: int_input(0),
+        ),
+        Case(
+            "FunctionalTupleAccess",
+            lambda n: FunctionalTupleAccess(
+                FunctionalTuple(*(AddInteger(_inp(), Integer(i)) for i in range(n))),
+                n - 1,
+                n,
+            ),
+            int_input,
+        ),
+    ]
+)
+
+
+def measure(case: Case, size: int, config) -> dict:
+    program = Program((1, 0, 0), PLambda([INPUT], case.term(size)))
+    compiled = compile(program, config)
+    res = uplc_eval(compiled, case.input(size))
+    if isinstance(res.result, Exception):
+        raise RuntimeError(
+            f"Evaluation of {case.name} with size {size} failed"
+        ) from res.result
+    return {
+        "cpu": res.cost.cpu,
+        "memory": res.cost.memory,
+        "size": len(flatten(compiled)),
+    }
+
+
+def run(cases: typing.List[Case], levels: typing.List[str]) -> dict:
+    return {
+        case.name: {
+            level: {
+                str(size): measure(case, size, OPT_LEVELS[level]) for size in case.sizes
+            }
+            for level in levels
+        }
+        for case in cases
+    }
+
+
+def check(results: dict, baseline: dict, tolerance: float) -> typing.List[str]:
+    failures = []
+    for case, levels in results.items():
+        for level, sizes in levels.items():
+            for size, measured in sizes.items():
+                try:
+                    base = baseline["cases"][case][level][size]
+                except KeyError:
+                    continue
+                for key, value in measured.items():
+                    if value > base[key] * (1 + tolerance):
+                        failures.append(
+                            f"{case} at {level}, size {size}: {key} increased from {base[key]} to {value}"
+                        )
+    return failures
+
+
+# pairs of a lower and a higher optimization level, the higher level must not cost more CPU or memory in any case
+LEVEL_PAIRS = [("O1", "O2")]
+
+
+def check_levels(results: dict) -> typing.List[str]:
+    failures = []
+    for case, levels in results.items():
+        for lower, higher in LEVEL_PAIRS:
+            if lower not in levels or higher not in levels:
+                continue
+            for size, measured in levels[higher].items():
+                for key in ("cpu", "memory"):
+                    if measured[key] > levels[lower][size][key]:
+                        failures.append(
+                            f"{case} at {higher}, size {size}: {key} {measured[key]} exceeds {levels[lower][size][key]} at {lower}"
+                        )
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--case",
+        action="append",
+        choices=[c.name for c in CASES],
+        help="Only run the given case (can be given multiple times)",
+    )
+    parser.add_argument(
+        "--level",
+        action="append",
+        choices=list(OPT_LEVELS),
+        help="Only run the given optimization level (can be given multiple times)",
+    )
+    parser.add_argument("--output", help="Write the report to this file")
+    parser.add_argument(
+        "--baseline", default=BASELINE_PATH, help="Path of the stored baseline"
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="Fail if a cost exceeds the baseline"
+    )
+    parser.add_argument("--update", action="store_true", help="Overwrite the baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.0,
+        help="Relative cost increase tolerated when checking against the baseline",
+    )
+    args = parser.parse_args(argv)
+    setup()
+
+    cases = [c for c in CASES if not args.case or c.name in args.case]
+    levels = args.level or list(OPT_LEVELS)
+    report = report_header()
+    report["cases"] = run(cases, levels)
+    if args.update:
+        write_report(report, args.baseline)
+    if args.output or not (args.update or args.check):
+        write_report(report, args.output)
+
+    failures = []
+    if args.check:
+        failures = check(report["cases"], load_report(args.baseline), args.tolerance)
+        failures.extend(check_levels(report["cases"]))
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,383 @@
+"""
+Seeded generator of random, well-scoped and terminating pluthon programs
+
+Programs are generated in a typed manner such that they do not fail with type errors
+at runtime. Recursion only occurs through the list patterns of pluthon_sugar, which all
+iterate over finite lists, so every generated program terminates.
+Every generated program is a function of an integer and an integer list
+(the names are in INPUTS) such that compile time evaluation can not remove it.
+"""
+
+import enum
+import random
+import typing
+from dataclasses import dataclass, field
+
+from uplc import ast as uplc_ast
+
+from pluthon import (
+    AST,
+    Program,
+    Integer,
+    Bool,
+    ByteString,
+    Ite,
+    PVar,
+    PLambda,
+    PLet,
+    AddInteger,
+    SubtractInteger,
+    MultiplyInteger,
+    ModInteger,
+    EqualsInteger,
+    LessThanInteger,
+    AppendByteString,
+    LengthOfByteString,
+    EqualsByteString,
+    Sha2_256,
+    IData,
+    BData,
+    UnIData,
+    ConstrData,
+    EqualsData,
+    Not,
+    And,
+    Or,
+    Xor,
+    Iff,
+    Implies,
+    NotEqualsInteger,
+    Negate,
+    FoldList,
+    RFoldList,
+    LengthList,
+    AnyList,
+    AllList,
+    FindList,
+    MapList,
+    FilterList,
+    MapFilterList,
+    TakeList,
+    DropList,
+    AppendList,
+    Range,
+    PrependList,
+    EmptyIntegerList,
+    EmptyDataList,
+    SingleDataList,
+    NoneData,
+    SomeData,
+    Constructor,
+    Fields,
+    IndexAccessList,
+)
+
+
+class Type(enum.Enum):
+    Int = "int"
+    Bool = "bool"
+    ByteString = "bytestring"
+    Data = "data"
+    IntList = "intlist"
+    DataList = "datalist"
+
+
+INPUTS = (("in_int", Type.Int), ("in_list", Type.IntList))
+
+
+def inputs(rng: random.Random) -> typing.List[uplc_ast.Constant]:
+    """Random arguments for a generated program"""
+    return [
+        uplc_ast.BuiltinInteger(rng.randint(-10, 10)),
+        uplc_ast.BuiltinList(
+            [
+                uplc_ast.BuiltinInteger(rng.randint(-10, 10))
+                for _ in range(rng.randint(0, 6))
+            ],
+            uplc_ast.BuiltinInteger(0),
+        ),
+    ]
+
+
+# limit for the length of generated Range lists
+MAX_RANGE = 6
+
+
+@dataclass
+class GeneratorConfig:
+    # approximate maximum number of nodes per program
+    size: int = 60
+    # maximum nesting depth
+    max_depth: int = 8
+    # relative weight of each production, productions not mentioned have weight 1
+    weights: typing.Dict[str, float] = field(default_factory=dict)
+
+
+class ProgramGenerator:
+    def __init__(self, seed: int, config: typing.Optional[GeneratorConfig] = None):
+        self.rng = random.Random(seed)
+        self.config = config or GeneratorConfig()
+        self.budget = 0
+        self.var_counter = 0
+
+    def program(self) -> Program:
+        self.budget = self.config.size
+        env = dict(INPUTS)
+        term = self.gen(Type.Int, 0, env)
+        return Program((1, 0, 0), PLambda([name for name, _ in INPUTS], term))
+
+    def inputs(self) -> typing.List[uplc_ast.Constant]:
+        return inputs(self.rng)
+
+    # helpers
+
+    def fresh(self) -> str:
+        self.var_counter += 1
+        return f"v{self.var_counter}"
+
+    def leaf(self, typ: Type, env: typing.Dict[str, Type]) -> AST:
+        candidates = [name for name, t in env.items() if t == typ]
+        if candidates and self.rng.random() < 0.5:
+            return PVar(self.rng.choice(candidates))
+        return LEAVES[typ](self.rng)
+
+    def gen(self, typ: Type, depth: int, env: typing.Dict[str, Type]) -> AST:
+        self.budget -= 1
+        if depth >= self.config.max_depth or self.budget <= 0:
+            return self.leaf(typ, env)
+        productions = PRODUCTIONS[typ]
+        weights = [self.config.weights.get(name, 1.0) for name, _ in productions]
+        if sum(weights) <= 0:
+            return self.leaf(typ, env)
+        _, production = self.rng.choices(productions, weights)[0]
+        return production(self, depth + 1, env)
+
+    def let(self, typ: Type, depth: int, env: typing.Dict[str, Type]) -> AST:
+        bound_typ = self.rng.choice(list(Type))
+        name = self.fresh()
+        value = self.gen(bound_typ, depth, env)
+        return PLet([(name, value)], self.gen(typ, depth, {**env, name: bound_typ}))
+
+    def lam(
+        self,
+        params: typing.List[Type],
+        res: Type,
+        depth: int,
+        env: typing.Dict[str, Type],
+    ) -> AST:
+        names = [self.fresh() for _ in params]
+        inner_env = {**env, **dict(zip(names, params))}
+        return PLambda(names, self.gen(res, depth, inner_env))
+
+    def to_data_op(self) -> AST:
+        name = self.fresh()
+        return PLambda([name], IData(PVar(name)))
+
+
+def _binop(op, arg: Type):
+    return lambda g, d, e: op(g.gen(arg, d, e), g.gen(arg, d, e))
+
+
+def _unop(op, arg: Type):
+    return lambda g, d, e: op(g.gen(arg, d, e))
+
+
+def _ite(typ: Type):
+    return lambda g, d, e: Ite(
+        g.gen(Type.Bool, d, e), g.gen(typ, d, e), g.gen(typ, d, e)
+    )
+
+
+def _let(typ: Type):
+    return lambda g, d, e: g.let(typ, d, e)
+
+
+def _bounded(x: AST) -> AST:
+    return ModInteger(x, Integer(MAX_RANGE))
+
+
+LEAVES: typing.Dict[Type, typing.Callable[[random.Random], AST]] = {
+    Type.Int: lambda rng: Integer(rng.randint(-5, 5)),
+    Type.Bool: lambda rng: Bool(rng.random() < 0.5),
+    Type.ByteString: lambda rng: ByteString(rng.randbytes(rng.randint(0, 3))),
+    Type.Data: lambda rng: IData(Integer(rng.randint(-5, 5))),
+    Type.IntList: lambda rng: EmptyIntegerList(),
+    Type.DataList: lambda rng: EmptyDataList(),
+}
+
+# productions per result type, in the form (name, production)
+PRODUCTIONS: typing.Dict[
+    Type, typing.List[typing.Tuple[str, typing.Callable[..., AST]]]
+] = {
+    Type.Int: [
+        ("AddInteger", _binop(AddInteger, Type.Int)),
+        ("SubtractInteger", _binop(SubtractInteger, Type.Int)),
+        ("MultiplyInteger", _binop(MultiplyInteger, Type.Int)),
+        ("Negate", _unop(Negate, Type.Int)),
+        ("LengthOfByteString", _unop(LengthOfByteString, Type.ByteString)),
+        ("UnIData", lambda g, d, e: UnIData(IData(g.gen(Type.Int, d, e)))),
+        ("Ite", _ite(Type.Int)),
+        ("Let", _let(Type.Int)),
+        ("LengthList", _unop(LengthList, Type.IntList)),
+        (
+            "FoldList",
+            lambda g, d, e: FoldList(
+                g.gen(Type.IntList, d, e),
+                g.lam([Type.Int, Type.Int], Type.Int, d, e),
+                g.gen(Type.Int, d, e),
+            ),
+        ),
+        (
+            "RFoldList",
+            lambda g, d, e: RFoldList(
+                g.gen(Type.IntList, d, e),
+                g.lam([Type.Int, Type.Int], Type.Int, d, e),
+                g.gen(Type.Int, d, e),
+            ),
+        ),
+        (
+            "FindList",
+            lambda g, d, e: FindList(
+                g.gen(Type.IntList, d, e),
+                g.lam([Type.Int], Type.Bool, d, e),
+                g.gen(Type.Int, d, e),
+            ),
+        ),
+        (
+            "IndexAccessList",
+            lambda g, d, e: IndexAccessList(
+                PrependList(g.gen(Type.Int, d, e), g.gen(Type.IntList, d, e)),
+                Integer(0),
+            ),
+        ),
+        (
+            "Constructor",
+            lambda g, d, e: Constructor(
+                ConstrData(Integer(g.rng.randint(0, 3)), g.gen(Type.DataList, d, e))
+            ),
+        ),
+    ],
+    Type.Bool: [
+        ("EqualsInteger", _binop(EqualsInteger, Type.Int)),
+        ("LessThanInteger", _binop(LessThanInteger, Type.Int)),
+        ("NotEqualsInteger", _binop(NotEqualsInteger, Type.Int)),
+        ("EqualsByteString", _binop(EqualsByteString, Type.ByteString)),
+        ("EqualsData", _binop(EqualsData, Type.Data)),
+        ("Not", _unop(Not, Type.Bool)),
+        ("And", _binop(And, Type.Bool)),
+        ("Or", _binop(Or, Type.Bool)),
+        ("Xor", _binop(Xor, Type.Bool)),
+        ("Iff", _binop(Iff, Type.Bool)),
+        ("Implies", _binop(Implies, Type.Bool)),
+        ("Ite", _ite(Type.Bool)),
+        ("Let", _let(Type.Bool)),
+        (
+            "AnyList",
+            lambda g, d, e: AnyList(
+                g.gen(Type.IntList, d, e), g.lam([Type.Int], Type.Bool, d, e)
+            ),
+        ),
+        (
+            "AllList",
+            lambda g, d, e: AllList(
+                g.gen(Type.IntList, d, e), g.lam([Type.Int], Type.Bool, d, e)
+            ),
+        ),
+    ],
+    Type.ByteString: [
+        ("AppendByteString", _binop(AppendByteString, Type.ByteString)),
+        ("Sha2_256", _unop(Sha2_256, Type.ByteString)),
+        ("Ite", _ite(Type.ByteString)),
+        ("Let", _let(Type.ByteString)),
+    ],
+    Type.Data: [
+        ("IData", _unop(IData, Type.Int)),
+        ("BData", _unop(BData, Type.ByteString)),
+        (
+            "ConstrData",
+            lambda g, d, e: ConstrData(
+                Integer(g.rng.randint(0, 3)), g.gen(Type.DataList, d, e)
+            ),
+        ),
+        ("NoneData", lambda g, d, e: NoneData()),
+        ("SomeData", _unop(SomeData, Type.Data)),
+        ("Ite", _ite(Type.Data)),
+        ("Let", _let(Type.Data)),
+    ],
+    Type.IntList: [
+        (
+            "PrependList",
+            lambda g, d, e: PrependList(
+                g.gen(Type.Int, d, e), g.gen(Type.IntList, d, e)
+            ),
+        ),
+        ("Range", lambda g, d, e: Range(_bounded(g.gen(Type.Int, d, e)))),
+        (
+            "MapList",
+            lambda g, d, e: MapList(
+                g.gen(Type.IntList, d, e),
+                g.lam([Type.Int], Type.Int, d, e),
+                EmptyIntegerList(),
+            ),
+        ),
+        (
+            "FilterList",
+            lambda g, d, e: FilterList(
+                g.gen(Type.IntList, d, e),
+                g.lam([Type.Int], Type.Bool, d, e),
+                EmptyIntegerList(),
+            ),
+        ),
+        (
+            "MapFilterList",
+            lambda g, d, e: MapFilterList(
+                g.gen(Type.IntList, d, e),
+                g.lam([Type.Int], Type.Bool, d, e),
+                g.lam([Type.Int], Type.Int, d, e),
+                EmptyIntegerList(),
+            ),
+        ),
+        (
+            "TakeList",
+            lambda g, d, e: TakeList(
+                g.gen(Type.IntList, d, e), g.gen(Type.Int, d, e), EmptyIntegerList()
+            ),
+        ),
+        (
+            "DropList",
+            lambda g, d, e: DropList(
+                g.gen(Type.IntList, d, e), g.gen(Type.Int, d, e), EmptyIntegerList()
+            ),
+        ),
+        ("AppendList", _binop(AppendList, Type.IntList)),
+        ("Ite", _ite(Type.IntList)),
+        ("Let", _let(Type.IntList)),
+    ],
+    Type.DataList: [
+        ("SingleDataList", _unop(SingleDataList, Type.Data)),
+        (
+            "PrependList",
+            lambda g, d, e: PrependList(
+                g.gen(Type.Data, d, e), g.gen(Type.DataList, d, e)
+            ),
+        ),
+        (
+            "Fields",
+            lambda g, d, e: Fields(ConstrData(Integer(0), g.gen(Type.DataList, d, e))),
+        ),
+        (
+            "MapList",
+            lambda g, d, e: MapList(g.gen(Type.IntList, d, e), g.to_data_op()),
+        ),
+        ("Ite", _ite(Type.DataList)),
+        ("Let", _let(Type.DataList)),
+    ],
+}
+
+
+def generate(
+    seed: int, config: typing.Optional[GeneratorConfig] = None
+) -> typing.Tuple[Program, typing.List[uplc_ast.Constant]]:
+    """Generate a random program and matching random arguments for the given seed"""
+    g = ProgramGenerator(seed, config)
+    return g.program(), g.inputs()
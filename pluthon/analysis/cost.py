@@ -0,0 +1,709 @@
+"""
+Static estimation of the execution cost (ExBudget) of pluthon programs
+
+The estimator abstractly interprets a pluthon AST with the step and builtin costs
+of the uplc cost model instead of running it.
+Closed straight-line code is estimated exactly. Where the control flow depends on
+unknown values the maximum over all branches is taken, so the estimate is an upper bound.
+Loops of the list patterns (and all other recursive functions) are summarized symbolically,
+i.e. the cost of FoldList(xs, ...) is expressed as a linear function of len(xs).
+Every lambda body is analyzed only once for a bounded number of argument shapes,
+which keeps the analysis linear in the size of the (pattern-expanded) program.
+"""
+
+import typing
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from uplc import ast as uplc_ast
+from uplc.cost_model import (
+    Budget,
+    BuiltinCostModel,
+    CekMachineCostModel,
+    CekOp,
+    ConstantCost,
+    default_builtin_cost_model_plutus_v3,
+    default_cek_machine_cost_model_plutus_v3,
+)
+from uplc.machine import budget_cost_of_op_on_model
+
+from ..pluthon_ast import (
+    AST,
+    Apply,
+    BuiltIn,
+    Delay,
+    Force,
+    Integer,
+    Lambda,
+    Let,
+    Pattern,
+    Program,
+    UPLCConstant,
+)
+from ..pluthon_sugar import (
+    AllList,
+    AnyList,
+    AppendList,
+    DropList,
+    EmptyList,
+    FilterList,
+    FindList,
+    FoldList,
+    FoldListAbort,
+    FoldRange,
+    IndexAccessList,
+    LengthList,
+    MapFilterList,
+    MapList,
+    MapRange,
+    RFoldList,
+    Range,
+    RecFun,
+    TakeList,
+)
+from ..util import iter_fields
+
+# memory usage assumed for arguments of builtins whose value is not known statically
+UNKNOWN_ARGUMENT_MEMORY = 1
+# number of differently shaped argument tuples for which a lambda body is analyzed
+MAX_SPECIALIZATIONS = 8
+# symbols are named after the expression they describe if it is at most this long
+MAX_SYMBOL_DESCRIPTION = 40
+
+Monomial = typing.Tuple[str, ...]
+
+
+def _budget_max(a: Budget, b: Budget) -> Budget:
+    return Budget(cpu=max(a.cpu, b.cpu), memory=max(a.memory, b.memory))
+
+
+@dataclass(frozen=True)
+class SymbolicBudget:
+    """
+    A budget that is a polynomial in the symbols of a cost estimate, with non-negative coefficients.
+    Maps each monomial (a sorted tuple of symbol names, the empty tuple is the constant part) to its coefficient.
+    """
+
+    terms: typing.Dict[Monomial, Budget] = field(default_factory=dict)
+
+    @classmethod
+    def constant(cls, budget: Budget) -> "SymbolicBudget":
+        return cls({(): budget})
+
+    def __add__(self, other: "SymbolicBudget") -> "SymbolicBudget":
+        terms = dict(self.terms)
+        for m, b in other.terms.items():
+            terms[m] = terms[m] + b if m in terms else b
+        return SymbolicBudget(terms)
+
+    def __mul__(self, other: int) -> "SymbolicBudget":
+        return SymbolicBudget({m: b * other for m, b in self.terms.items()})
+
+    def times(self, symbol: str) -> "SymbolicBudget":
+        """Multiplies the budget with the given symbol"""
+        return SymbolicBudget(
+            {tuple(sorted(m + (symbol,))): b for m, b in self.terms.items()}
+        )
+
+    def join(self, other: "SymbolicBudget") -> "SymbolicBudget":
+        """An upper bound of both budgets (for non-negative symbol values)"""
+        terms = dict(self.terms)
+        for m, b in other.terms.items():
+            terms[m] = _budget_max(terms[m], b) if m in terms else b
+        return SymbolicBudget(terms)
+
+    @property
+    def fixed(self) -> Budget:
+        """The part of the budget that does not depend on any symbol"""
+        return self.terms.get((), Budget(0, 0))
+
+    @property
+    def symbols(self) -> typing.Set[str]:
+        return {s for m in self.terms for s in m}
+
+    def evaluate(self, values: typing.Dict[str, int]) -> Budget:
+        """The budget for the given values of the symbols"""
+        res = Budget(0, 0)
+        for m, b in self.terms.items():
+            factor = 1
+            for s in m:
+                factor *= values[s]
+            res += b * factor
+        return res
+
+    def dumps(self) -> str:
+        def part(mode: str) -> str:
+            summands = []
+            for m, b in sorted(self.terms.items()):
+                coefficient = getattr(b, mode)
+                if coefficient == 0:
+                    continue
+                summands.append("*".join([str(coefficient), *m]))
+            return " + ".join(summands) or "0"
+
+        return f"cpu: {part('cpu')}, memory: {part('memory')}"
+
+
+ZERO = SymbolicBudget()
+
+
+@dataclass
+class CostEstimate:
+    budget: SymbolicBudget
+    # the expression of the program that each symbol of the budget describes
+    symbols: typing.Dict[str, AST]
+    # whether the estimate is the exact cost, otherwise it is an upper bound
+    # (or could not account for calls of unknown functions)
+    exact: bool
+
+    def evaluate(self, values: typing.Optional[typing.Dict[str, int]] = None) -> Budget:
+        return self.budget.evaluate(values or {})
+
+
+# Abstract values
+
+
+class _Value:
+    pass
+
+
+@dataclass(frozen=True)
+class _Unknown(_Value):
+    pass
+
+
+UNKNOWN = _Unknown()
+
+
+@dataclass(frozen=True)
+class _Bottom(_Value):
+    """The result of a computation that failed"""
+
+    pass
+
+
+BOTTOM = _Bottom()
+
+
+@dataclass(frozen=True)
+class _ErrorFun(_Value):
+    """Error() is compiled to a lambda that fails when applied"""
+
+    pass
+
+
+@dataclass(frozen=True)
+class _Const(_Value):
+    value: uplc_ast.Constant
+
+
+@dataclass(frozen=True, eq=False)
+class _Closure(_Value):
+    node: Lambda
+    env: dict
+    # number of variables of the lambda that are already bound
+    bound: int = 0
+
+
+@dataclass(frozen=True, eq=False)
+class _Thunk(_Value):
+    node: Delay
+    env: dict
+
+
+@dataclass(frozen=True)
+class _Builtin(_Value):
+    builtin: uplc_ast.BuiltInFun
+    forces: int = 0
+    args: typing.Tuple[_Value, ...] = ()
+
+
+@dataclass(frozen=True)
+class _OneOf(_Value):
+    """Any one of the given values"""
+
+    options: typing.Tuple[_Value, ...]
+
+
+def _one_of(options: typing.Iterable[_Value]) -> _Value:
+    unique = []
+    for o in options:
+        for p in o.options if isinstance(o, _OneOf) else (o,):
+            if p not in unique and p is not BOTTOM:
+                unique.append(p)
+    if not unique:
+        return BOTTOM
+    if len(unique) == 1:
+        return unique[0]
+    return _OneOf(tuple(unique))
+
+
+def _signature(v: _Value):
+    """Shape of a value that is relevant for the cost of a function it is passed to"""
+    if isinstance(v, _Closure):
+        return "closure", id(v.node), v.bound
+    if isinstance(v, _Thunk):
+        return "thunk", id(v.node)
+    if isinstance(v, _Const):
+        try:
+            return "const", hash(v.value), v.value
+        except TypeError:
+            # lists and maps are not hashable
+            return "const", v.value.ex_mem()
+    if isinstance(v, _OneOf):
+        return tuple(_signature(o) for o in v.options)
+    return v
+
+
+def _generalize(env: dict, names: typing.List[str]) -> dict:
+    """Forgets the constant values of the given variables, they may change between loop iterations"""
+
+    def generalize(v: _Value) -> _Value:
+        if isinstance(v, _Const):
+            return UNKNOWN
+        if isinstance(v, _OneOf):
+            return _one_of(generalize(o) for o in v.options)
+        return v
+
+    return {**env, **{n: generalize(env[n]) for n in names}}
+
+
+def _arity(b: uplc_ast.BuiltInFun) -> int:
+    return uplc_ast.BuiltInFunEvalMap[b].__code__.co_argcount
+
+
+# Loop bounds, i.e. the number of recursive calls of the RecFun loops in a pattern
+
+
+def static_length(lst: AST) -> typing.Optional[int]:
+    """The length of the list if it is built from constants, MkCons and empty lists, None otherwise"""
+    length = 0
+    while True:
+        if isinstance(lst, EmptyList):
+            return length
+        if isinstance(lst, UPLCConstant) and isinstance(lst.x, uplc_ast.BuiltinList):
+            return length + len(lst.x.values)
+        if (
+            isinstance(lst, Apply)
+            and isinstance(lst.f, Force)
+            and isinstance(lst.f.x, BuiltIn)
+            and lst.f.x.builtin == uplc_ast.BuiltInFun.MkCons
+        ):
+            length += 1
+            lst = lst.xs[1]
+        elif (
+            isinstance(lst, Apply)
+            and isinstance(lst.f, BuiltIn)
+            and lst.f.builtin
+            in (uplc_ast.BuiltInFun.MkNilData, uplc_ast.BuiltInFun.MkNilPairData)
+        ):
+            return length
+        else:
+            return None
+
+
+# patterns whose result is at most as long as their list
+SHORTENING_PATTERNS = (MapList, FilterList, MapFilterList, TakeList, DropList)
+
+
+def max_length(lst: AST) -> typing.Optional[int]:
+    """An upper bound on the length of the list if it is known statically, None otherwise"""
+    length = static_length(lst)
+    if length is not None:
+        return length
+    if isinstance(lst, SHORTENING_PATTERNS):
+        length = max_length(lst.lst)
+        if isinstance(lst, TakeList) and isinstance(lst.n, Integer):
+            return max(0, lst.n.x) if length is None else min(length, max(0, lst.n.x))
+        return length
+    if isinstance(lst, AppendList):
+        xs, ys = max_length(lst.xs), max_length(lst.ys)
+        if xs is not None and ys is not None:
+            return xs + ys
+    return None
+
+
+def _length(estimator: "CostEstimator", lst: AST):
+    length = max_length(lst)
+    if length is not None:
+        return length
+    return estimator.symbol("len", lst)
+
+
+def _value(estimator: "CostEstimator", x: AST):
+    if isinstance(x, Integer):
+        return max(x.x, 0)
+    return estimator.symbol("value", x)
+
+
+def _range_length(
+    estimator: "CostEstimator", node: typing.Union[Range, FoldRange, MapRange]
+):
+    if all(isinstance(x, Integer) for x in (node.limit, node.start, node.step)):
+        if node.step.x > 0:
+            return max(0, -((node.start.x - node.limit.x) // node.step.x))
+    return estimator.symbol("len", node)
+
+
+def _index_access_fast_bounds(estimator: "CostEstimator", node: Pattern):
+    step_size = type(node).step_size
+    # the loop that steps through the last elements is defined first
+    if isinstance(node.i, Integer):
+        return [step_size - 1, max(node.i.x, 0) // step_size]
+    return [step_size - 1, estimator.symbol(f"value/{step_size}", node.i)]
+
+
+LOOP_BOUNDS: typing.Dict[
+    typing.Type[Pattern],
+    typing.Callable[["CostEstimator", Pattern], typing.List[typing.Union[int, str]]],
+] = {
+    FoldList: lambda e, n: [_length(e, n.lst)],
+    FoldListAbort: lambda e, n: [_length(e, n.lst)],
+    RFoldList: lambda e, n: [_length(e, n.lst)],
+    MapList: lambda e, n: [_length(e, n.lst)],
+    FindList: lambda e, n: [_length(e, n.lst)],
+    AnyList: lambda e, n: [_length(e, n.lst)],
+    AllList: lambda e, n: [_length(e, n.lst)],
+    FilterList: lambda e, n: [_length(e, n.lst)],
+    MapFilterList: lambda e, n: [_length(e, n.lst)],
+    LengthList: lambda e, n: [_length(e, n.lst)],
+    TakeList: lambda e, n: [_length(e, n.lst)],
+    DropList: lambda e, n: [_length(e, n.lst)],
+    AppendList: lambda e, n: [_length(e, n.xs)],
+    IndexAccessList: lambda e, n: [_value(e, n.i)],
+    Range: lambda e, n: [_range_length(e, n)],
+    FoldRange: lambda e, n: [_range_length(e, n)],
+    MapRange: lambda e, n: [_range_length(e, n)],
+}
+
+
+class CostEstimator:
+    """
+    Abstract interpreter that computes the execution cost of pluthon programs.
+    Patterns are analyzed by their composition, their loops receive the bounds from LOOP_BOUNDS.
+    """
+
+    def __init__(
+        self,
+        cek_machine_cost_model: CekMachineCostModel = default_cek_machine_cost_model_plutus_v3(),
+        builtin_cost_model: BuiltinCostModel = default_builtin_cost_model_plutus_v3(),
+    ):
+        self.cek_machine_cost_model = cek_machine_cost_model
+        self.builtin_cost_model = builtin_cost_model
+        self.symbols: typing.Dict[str, AST] = {}
+        self.exact = True
+        self._steps = {
+            op: SymbolicBudget.constant(
+                budget_cost_of_op_on_model(cek_machine_cost_model, op, 0)
+            )
+            for op in CekOp
+        }
+        # remaining loop bounds of the innermost pattern (lexically)
+        self._frame: typing.List[typing.Union[int, str]] = []
+        # the frame in which the arguments of the pattern that is currently analyzed are evaluated
+        self._argument_frames: typing.Dict[int, list] = {}
+        # the loop bound of the lambdas passed to RecFun
+        self._loop_bounds: typing.Dict[int, typing.Union[int, str]] = {}
+        self._in_progress: typing.Set[int] = set()
+        self._recursive: typing.Set[int] = set()
+        self._specializations: typing.Dict[int, int] = defaultdict(int)
+        # the analysis results of lambda bodies (the lambda is kept as ids are only unique during its lifetime)
+        self._memo: typing.Dict[
+            tuple, typing.Tuple[Lambda, SymbolicBudget, _Value]
+        ] = {}
+
+    def symbol(self, kind: str, x: AST) -> str:
+        """A symbol for a property (i.e. the length) of the value of expression x"""
+        description = x.dumps() if not isinstance(x, Pattern) else ""
+        if not description or len(description) > MAX_SYMBOL_DESCRIPTION:
+            description = f"{x.__class__.__name__}#{len(self.symbols)}"
+        name = f"{kind}({description})"
+        self.symbols.setdefault(name, x)
+        return name
+
+    def estimate(self, x: AST) -> CostEstimate:
+        cost, _ = self.visit(x, {})
+        return CostEstimate(cost, dict(self.symbols), self.exact)
+
+    # Evaluation of terms
+
+    def visit(self, node: AST, env: dict) -> typing.Tuple[SymbolicBudget, _Value]:
+        frame = self._argument_frames.get(id(node))
+        if frame is not None:
+            frame, self._frame = self._frame, frame
+        try:
+            method = getattr(self, "visit_" + node.__class__.__name__, None)
+            if method is None:
+                if not isinstance(node, Pattern):
+                    raise NotImplementedError(
+                        f"Can not estimate the cost of {node.__class__.__name__}"
+                    )
+                method = self.visit_Pattern
+            return method(node, env)
+        finally:
+            if frame is not None:
+                self._frame = frame
+
+    def visit_Program(self, node: Program, env: dict):
+        cost, value = self.visit(node.prog, env)
+        return self._steps[CekOp.Startup] + cost, value
+
+    def visit_Var(self, node, env: dict):
+        value = env.get(node.name)
+        if value is None:
+            # free variable, i.e. a parameter of the program
+            value = UNKNOWN
+        return self._steps[CekOp.Var], value
+
+    def visit_Lambda(self, node: Lambda, env: dict):
+        return self._steps[CekOp.Lam], _Closure(node, env)
+
+    def visit_Delay(self, node: Delay, env: dict):
+        return self._steps[CekOp.Delay], _Thunk(node, env)
+
+    def visit_Force(self, node: Force, env: dict):
+        cost, value = self.visit(node.x, env)
+        force_cost, value = self.force(value)
+        return self._steps[CekOp.Force] + cost + force_cost, value
+
+    def visit_Apply(self, node: Apply, env: dict):
+        cost, f = self.visit(node.f, env)
+        cost += self._steps[CekOp.Apply] * len(node.xs)
+        for x in node.xs:
+            x_cost, x_value = self.visit(x, env)
+            apply_cost, f = self.apply(f, x_value)
+            cost += x_cost + apply_cost
+        return cost, f
+
+    def visit_Let(self, node: Let, env: dict):
+        cost = ZERO
+        for name, binding in node.bindings:
+            b_cost, b_value = self.visit(binding, env)
+            cost += self._steps[CekOp.Apply] + self._steps[CekOp.Lam] + b_cost
+            env = {**env, name: b_value}
+        t_cost, value = self.visit(node.term, env)
+        return cost + t_cost, value
+
+    def visit_Ite(self, node, env: dict):
+        # Ite is compiled to the IfThenElse builtin with delayed branches
+        return self.visit(
+            Force(
+                Apply(
+                    Force(BuiltIn(uplc_ast.BuiltInFun.IfThenElse)),
+                    node.i,
+                    Delay(node.t),
+                    Delay(node.e),
+                )
+            ),
+            env,
+        )
+
+    def visit_BuiltIn(self, node: BuiltIn, env: dict):
+        return self._steps[CekOp.Builtin], _Builtin(node.builtin)
+
+    def visit_Error(self, node, env: dict):
+        return self._steps[CekOp.Lam], _ErrorFun()
+
+    def _visit_constant(self, node: AST, env: dict):
+        return self._steps[CekOp.Const], _Const(node.compile())
+
+    visit_Integer = _visit_constant
+    visit_ByteString = _visit_constant
+    visit_Text = _visit_constant
+    visit_Bool = _visit_constant
+    visit_Unit = _visit_constant
+    visit_UPLCConstant = _visit_constant
+    visit_EmptyList = _visit_constant
+
+    def visit_RecFun(self, node: RecFun, env: dict):
+        if self._frame:
+            self._loop_bounds[id(node.x)] = self._frame.pop(0)
+        return self.visit_Pattern(node, env)
+
+    def visit_Pattern(self, node: Pattern, env: dict):
+        bounds = LOOP_BOUNDS.get(type(node))
+        if bounds is None and hasattr(type(node), "step_size"):
+            bounds = _index_access_fast_bounds
+        # the arguments of the pattern are evaluated in the frame of the enclosing pattern
+        arguments = [v for _, v in iter_fields(node) if isinstance(v, AST)]
+        previous_frames = {id(v): self._argument_frames.get(id(v)) for v in arguments}
+        for v in arguments:
+            self._argument_frames[id(v)] = self._frame
+        outer_frame = self._frame
+        self._frame = bounds(self, node) if bounds is not None else []
+        try:
+            return self.visit(node.compose(), env)
+        finally:
+            self._frame = outer_frame
+            for k, v in previous_frames.items():
+                if v is None:
+                    del self._argument_frames[k]
+                else:
+                    self._argument_frames[k] = v
+
+    # Evaluation of values
+
+    def force(self, value: _Value) -> typing.Tuple[SymbolicBudget, _Value]:
+        if isinstance(value, _Thunk):
+            return self.visit(value.node.x, value.env)
+        if isinstance(value, _Builtin):
+            return ZERO, _Builtin(value.builtin, value.forces + 1, value.args)
+        if isinstance(value, _OneOf):
+            return self._join(self.force(o) for o in value.options)
+        if isinstance(value, _Bottom):
+            return ZERO, BOTTOM
+        self.exact = False
+        return ZERO, UNKNOWN
+
+    def apply(self, f: _Value, x: _Value) -> typing.Tuple[SymbolicBudget, _Value]:
+        if isinstance(f, _Closure):
+            env = {**f.env, f.node.vars[f.bound]: x}
+            if f.bound + 1 < len(f.node.vars):
+                # evaluates the lambda of the next variable
+                return self._steps[CekOp.Lam], _Closure(f.node, env, f.bound + 1)
+            return self.call(f.node, env)
+        if isinstance(f, _Builtin):
+            if f.forces != uplc_ast.BuiltInFunForceMap[f.builtin]:
+                return ZERO, BOTTOM
+            args = f.args + (x,)
+            if len(args) < _arity(f.builtin):
+                return ZERO, _Builtin(f.builtin, f.forces, args)
+            return self.builtin_cost(f.builtin, args), self.builtin_result(
+                f.builtin, args
+            )
+        if isinstance(f, _OneOf):
+            return self._join(self.apply(o, x) for o in f.options)
+        if isinstance(f, (_ErrorFun, _Bottom)):
+            return ZERO, BOTTOM
+        self.exact = False
+        return ZERO, UNKNOWN
+
+    def call(self, node: Lambda, env: dict) -> typing.Tuple[SymbolicBudget, _Value]:
+        """Evaluates the body of a lambda whose variables are all bound in env"""
+        if id(node) in self._in_progress:
+            # recursive call, the cost is accounted for when the outermost call returns
+            self._recursive.add(id(node))
+            return ZERO, UNKNOWN
+        key = (id(node), tuple(_signature(env[v]) for v in node.vars))
+        if (
+            key not in self._memo
+            and self._specializations[id(node)] >= MAX_SPECIALIZATIONS
+        ):
+            self.exact = False
+            key = (id(node), None)
+            env = {**env, **{v: UNKNOWN for v in node.vars}}
+        if key not in self._memo:
+            self._specializations[id(node)] += 1
+            if id(node) in self._loop_bounds:
+                # the body of a loop is analyzed for all iterations at once
+                env = _generalize(env, node.vars)
+            cost, value = self._call_once(node, env)
+            if id(node) in self._recursive:
+                self._recursive.discard(id(node))
+                if id(node) not in self._loop_bounds:
+                    cost, value = self._call_once(node, _generalize(env, node.vars))
+                    self._recursive.discard(id(node))
+                cost = self._loop(node, cost)
+            self._memo[key] = (node, cost, value)
+        _, cost, value = self._memo[key]
+        return cost, value
+
+    def _call_once(self, node: Lambda, env: dict):
+        self._in_progress.add(id(node))
+        try:
+            return self.visit(node.term, env)
+        finally:
+            self._in_progress.discard(id(node))
+
+    def _loop(self, node: Lambda, body: SymbolicBudget) -> SymbolicBudget:
+        self.exact = False
+        bound = self._loop_bounds.get(id(node))
+        if bound is None:
+            bound = f"iterations(#{len(self.symbols)})"
+            self.symbols[bound] = node
+        # the body is evaluated once more than the function recurses
+        if isinstance(bound, int):
+            return body * (bound + 1)
+        return body.times(bound) + body
+
+    def _join(self, results: typing.Iterable[typing.Tuple[SymbolicBudget, _Value]]):
+        results = list(results)
+        cost = results[0][0]
+        for c, _ in results[1:]:
+            if c != cost:
+                self.exact = False
+            cost = cost.join(c)
+        return cost, _one_of(v for _, v in results)
+
+    def builtin_cost(
+        self, builtin: uplc_ast.BuiltInFun, args: typing.Tuple[_Value, ...]
+    ) -> SymbolicBudget:
+        known = all(isinstance(a, _Const) for a in args)
+        if not known and not all(
+            isinstance(m.get(builtin), ConstantCost)
+            for m in (self.builtin_cost_model.cpu, self.builtin_cost_model.memory)
+        ):
+            # the cost depends on the size of values that are not known statically
+            self.exact = False
+        try:
+            return SymbolicBudget.constant(
+                budget_cost_of_op_on_model(
+                    self.builtin_cost_model,
+                    builtin,
+                    *(
+                        a.value.ex_mem()
+                        if isinstance(a, _Const)
+                        else UNKNOWN_ARGUMENT_MEMORY
+                        for a in args
+                    ),
+                    values=[a.value if isinstance(a, _Const) else None for a in args],
+                )
+            )
+        except (AttributeError, IndexError, TypeError):
+            # the cost depends on the literal value of an unknown argument
+            self.exact = False
+            return ZERO
+
+    def builtin_result(
+        self, builtin: uplc_ast.BuiltInFun, args: typing.Tuple[_Value, ...]
+    ) -> _Value:
+        BuiltInFun = uplc_ast.BuiltInFun
+        if builtin in (BuiltInFun.Trace, BuiltInFun.ChooseUnit):
+            return args[1]
+        if builtin in (
+            BuiltInFun.IfThenElse,
+            BuiltInFun.ChooseList,
+            BuiltInFun.ChooseData,
+        ):
+            scrutinee = args[0].value if isinstance(args[0], _Const) else None
+            if builtin == BuiltInFun.IfThenElse and isinstance(
+                scrutinee, uplc_ast.BuiltinBool
+            ):
+                return args[1] if scrutinee.value else args[2]
+            if builtin == BuiltInFun.ChooseList and isinstance(
+                scrutinee, uplc_ast.BuiltinList
+            ):
+                return args[1] if not scrutinee.values else args[2]
+            return _one_of(args[1:])
+        if all(isinstance(a, _Const) for a in args):
+            try:
+                return _Const(
+                    uplc_ast.BuiltInFunEvalMap[builtin](*(a.value for a in args))
+                )
+            except Exception:
+                return BOTTOM
+        return UNKNOWN
+
+
+def estimate_cost(
+    x: AST,
+    cek_machine_cost_model: CekMachineCostModel = default_cek_machine_cost_model_plutus_v3(),
+    builtin_cost_model: BuiltinCostModel = default_builtin_cost_model_plutus_v3(),
+) -> CostEstimate:
+    """
+    Statically estimates the execution cost of a pluthon program (or term).
+    Free variables (i.e. parameters of the program) are considered unknown.
+    :param x: the program to analyze
+    :return: the cost, symbolic in the length of lists that are traversed by loops
+    """
+    return CostEstimator(cek_machine_cost_model, builtin_cost_model).estimate(x)
@@ -0,0 +1,268 @@
+"""
+Effect analysis of pluthon terms
+
+Classifies what can happen when a term is evaluated: nothing observable (pure),
+an error (which includes exceeding the budget in loops) and/or a trace.
+Besides the effect of evaluating a term, the analysis tracks the latent effect of its value,
+i.e. what can happen when the value is forced or applied to all of its arguments.
+This way immediately applied lambdas, Ite branches and the delayed branches of the
+choice builtins are analyzed precisely, applications of unknown functions are assumed to
+have any effect.
+Results are cached on the nodes like the variable analysis (see variables.py).
+"""
+
+import dataclasses
+import enum
+import typing
+import uuid
+from functools import lru_cache
+
+from uplc import ast as uplc_ast
+
+from ..pluthon_ast import (
+    AST,
+    Apply,
+    BuiltIn,
+    Delay,
+    Error,
+    Force,
+    Ite,
+    Lambda,
+    Let,
+    Pattern,
+    Var,
+)
+from ..util import analyze_cached, cached_analysis, iter_fields
+from .variables import pattern_summary
+
+EFFECTS_KEY = "effects"
+
+
+class Effect(enum.IntFlag):
+    PURE = 0
+    MAY_ERROR = 1
+    MAY_TRACE = 2
+
+
+UNKNOWN = Effect.MAY_ERROR | Effect.MAY_TRACE
+
+# builtins that do not fail on arguments of the right type
+TOTAL_BUILTINS = frozenset(
+    uplc_ast.BuiltInFun[name]
+    for name in [
+        "AddInteger",
+        "SubtractInteger",
+        "MultiplyInteger",
+        "EqualsInteger",
+        "LessThanInteger",
+        "LessThanEqualsInteger",
+        "AppendByteString",
+        "SliceByteString",
+        "LengthOfByteString",
+        "EqualsByteString",
+        "LessThanByteString",
+        "LessThanEqualsByteString",
+        "Sha2_256",
+        "Sha3_256",
+        "Blake2b_256",
+        "Blake2b_224",
+        "Keccak_256",
+        "Ripemd_160",
+        "AppendString",
+        "EqualsString",
+        "EncodeUtf8",
+        "IfThenElse",
+        "ChooseUnit",
+        "FstPair",
+        "SndPair",
+        "ChooseList",
+        "MkCons",
+        "NullList",
+        "ChooseData",
+        "ConstrData",
+        "MapData",
+        "ListData",
+        "IData",
+        "BData",
+        "EqualsData",
+        "SerialiseData",
+        "MkPairData",
+        "MkNilData",
+        "MkNilPairData",
+        "ByteStringToInteger",
+        "AndByteString",
+        "OrByteString",
+        "XorByteString",
+        "ComplementByteString",
+        "ShiftByteString",
+        "RotateByteString",
+        "CountSetBits",
+        "FindFirstSetBit",
+    ]
+)
+
+# builtins that return one of their arguments, indices of these arguments
+CHOICE_BUILTINS = {
+    uplc_ast.BuiltInFun.IfThenElse: (1, 2),
+    uplc_ast.BuiltInFun.ChooseUnit: (1,),
+    uplc_ast.BuiltInFun.Trace: (1,),
+    uplc_ast.BuiltInFun.ChooseList: (1, 2),
+    uplc_ast.BuiltInFun.ChooseData: (1, 2, 3, 4, 5),
+}
+
+
+def builtin_effect(b: uplc_ast.BuiltInFun) -> Effect:
+    """The effect of a saturated call to the builtin"""
+    if b == uplc_ast.BuiltInFun.Trace:
+        return Effect.MAY_TRACE
+    if b in TOTAL_BUILTINS:
+        return Effect.PURE
+    return Effect.MAY_ERROR
+
+
+def builtin_arity(b: uplc_ast.BuiltInFun) -> int:
+    return uplc_ast.BuiltInFunEvalMap[b].__code__.co_argcount
+
+
+class Effects(typing.NamedTuple):
+    # effect of evaluating the term
+    effect: Effect
+    # effect of forcing the value of the term resp. applying it to all of its arguments
+    latent: Effect
+
+
+def builtin_head(node: AST) -> typing.Optional[typing.Tuple[uplc_ast.BuiltInFun, int]]:
+    """The builtin and number of forces if the node is a (forced) builtin"""
+    forces = 0
+    while isinstance(node, Force):
+        node = node.x
+        forces += 1
+    if isinstance(node, BuiltIn):
+        return node.builtin, forces
+    return None
+
+
+def _children(node: AST) -> typing.Iterator[AST]:
+    if isinstance(node, Let):
+        yield from (b for _, b in node.bindings)
+    for _, value in iter_fields(node):
+        if isinstance(value, (list, tuple)):
+            yield from (v for v in value if isinstance(v, AST))
+        elif isinstance(value, AST):
+            yield value
+
+
+def _effects(node: AST) -> Effects:
+    return cached_analysis(node, EFFECTS_KEY)
+
+
+def _union(effects: typing.Iterable[Effect]) -> Effect:
+    res = Effect.PURE
+    for e in effects:
+        res |= e
+    return res
+
+
+@lru_cache()
+def pattern_effects(pattern_class: typing.Type[Pattern]) -> Effects:
+    """Effects of the pattern when all of its fields are pure values of unknown shape"""
+    fields = dataclasses.fields(pattern_class)
+    term = pattern_class(
+        *[Var(f"0{f.name}_{uuid.uuid4().hex}_") for f in fields]
+    ).compose()
+    return effects(term)
+
+
+def _apply_builtin(node: Apply, builtin: uplc_ast.BuiltInFun, forces: int) -> Effects:
+    args = _union(_effects(x).effect for x in node.xs)
+    if forces != uplc_ast.BuiltInFunForceMap[builtin]:
+        # over- or underforced builtins fail when applied
+        return Effects(args | Effect.MAY_ERROR, UNKNOWN)
+    arity = builtin_arity(builtin)
+    returned = CHOICE_BUILTINS.get(builtin)
+    if len(node.xs) < arity:
+        latent = builtin_effect(builtin) | (UNKNOWN if returned else Effect.PURE)
+        return Effects(args, latent)
+    effect = args | builtin_effect(builtin)
+    if returned is None:
+        latent = UNKNOWN
+    else:
+        latent = _union(_effects(node.xs[i]).latent for i in returned)
+    if len(node.xs) > arity:
+        # the result is applied further
+        return Effects(effect | latent, UNKNOWN)
+    return Effects(effect, latent)
+
+
+def _analyze(node: AST) -> Effects:
+    if isinstance(node, Var):
+        return Effects(Effect.PURE, UNKNOWN)
+    if isinstance(node, Error):
+        return Effects(Effect.PURE, Effect.MAY_ERROR)
+    if isinstance(node, Lambda):
+        return Effects(Effect.PURE, _effects(node.term).effect)
+    if isinstance(node, Delay):
+        return Effects(Effect.PURE, _effects(node.x).effect)
+    if isinstance(node, Force):
+        head = builtin_head(node)
+        if head is not None:
+            builtin, forces = head
+            return Effects(
+                (
+                    Effect.PURE
+                    if forces <= uplc_ast.BuiltInFunForceMap[builtin]
+                    else Effect.MAY_ERROR
+                ),
+                UNKNOWN,
+            )
+        x = _effects(node.x)
+        latent = _effects(node.x.x).latent if isinstance(node.x, Delay) else UNKNOWN
+        return Effects(x.effect | x.latent, latent)
+    if isinstance(node, Apply):
+        if not node.xs:
+            return _effects(node.f)
+        head = builtin_head(node.f)
+        if head is not None:
+            return _apply_builtin(node, *head)
+        f = _effects(node.f)
+        args = _union(_effects(x).effect for x in node.xs)
+        if isinstance(node.f, Lambda) and len(node.xs) == len(node.f.vars):
+            return Effects(f.effect | args | f.latent, _effects(node.f.term).latent)
+        if isinstance(node.f, Lambda) and len(node.xs) < len(node.f.vars):
+            return Effects(f.effect | args, f.latent)
+        return Effects(f.effect | args | f.latent, UNKNOWN)
+    if isinstance(node, Let):
+        return Effects(
+            _union(_effects(c).effect for c in _children(node)),
+            _effects(node.term).latent,
+        )
+    if isinstance(node, Ite):
+        t, e = _effects(node.t), _effects(node.e)
+        return Effects(
+            _effects(node.i).effect | t.effect | e.effect, t.latent | e.latent
+        )
+    if isinstance(node, Pattern):
+        summary = pattern_effects(type(node))
+        uses = pattern_summary(type(node))
+        fields = _union(
+            _effects(value).effect
+            for name, value in iter_fields(node)
+            if isinstance(value, AST) and uses[name][0] > 0
+        )
+        return Effects(summary.effect | fields, summary.latent)
+    # constants and programs
+    return Effects(_union(_effects(c).effect for c in _children(node)), UNKNOWN)
+
+
+def effects(node: AST) -> Effects:
+    """The effect of evaluating the term and the latent effect of its value"""
+    return analyze_cached(node, EFFECTS_KEY, _children, _analyze)
+
+
+def effect(node: AST) -> Effect:
+    return effects(node).effect
+
+
+def is_pure(node: AST) -> bool:
+    """Whether evaluating the term can neither fail nor trace"""
+    return effects(node).effect == Effect.PURE
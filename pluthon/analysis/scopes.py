@@ -0,0 +1,136 @@
+"""
+Scopes, dominators and evaluation order of pluthon terms
+
+A scope is a term together with everything that is evaluated as part of it, but not the bodies
+of lambdas and delayed terms, which are scopes of their own. The optimizations that bind terms
+(see optimize/cse.py and optimize/tail_chains.py) collect the nodes of a scope with their paths,
+bind the terms at the lowest node that dominates all occurrences and check that the binding
+is only evaluated where one of the occurrences would be evaluated anyway.
+"""
+
+import typing
+
+from ..pluthon_ast import AST, Apply, Lambda, Let
+from .effects import Effect, effect
+from .variables import Occurrence, free_variables, scoped_children
+
+# identifies the binding of a variable: the binding node and the position of the name in the bound names
+Binder = typing.Optional[typing.Tuple[int, int]]
+
+
+def context(
+    node: AST, env: typing.Dict[str, Binder]
+) -> typing.Tuple[typing.Tuple[str, Binder], ...]:
+    """The bindings that the free variables of the node refer to"""
+    return tuple(sorted((name, env.get(name)) for name in free_variables(node)))
+
+
+class ScopeCollector:
+    """
+    Walks the nodes of a scope and records the parent of every node and the roots of the nested scopes.
+    Subclasses record the nodes they are interested in by overriding add.
+    """
+
+    def __init__(self, root: AST, shared: typing.Set[int]):
+        self.root = root
+        # shared nodes are left alone, a rewrite of them would apply in several places
+        self.shared = shared
+        # the roots of the scopes within this scope
+        self.scopes = []
+        # the parent of every node in the scope by id
+        self.parents: typing.Dict[int, AST] = {}
+
+    def collect(self):
+        stack = [(self.root, {})]
+        while stack:
+            node, env = stack.pop()
+            if id(node) in self.shared:
+                continue
+            self.add(node, env)
+            for child, position, multiplicity, bound in scoped_children(node):
+                if multiplicity == 0:
+                    continue
+                if position == Occurrence.REPEATED:
+                    self.scopes.append(child)
+                    continue
+                child_env = env
+                if bound:
+                    child_env = dict(env)
+                    for i, name in enumerate(bound):
+                        child_env[name] = (id(node), i)
+                self.parents[id(child)] = node
+                stack.append((child, child_env))
+
+    def add(self, node: AST, env: typing.Dict[str, Binder]):
+        """Records a node of the scope, env maps the variables to their binding"""
+        pass
+
+    def path(self, node: AST) -> typing.List[AST]:
+        """The nodes from the root of the scope to the node"""
+        path = [node]
+        while path[-1] is not self.root:
+            path.append(self.parents[id(path[-1])])
+        return path[::-1]
+
+
+def dominator_depth(paths: typing.List[typing.List[AST]]) -> int:
+    """The depth of the closest node that contains all occurrences"""
+    depth = 0
+    while all(
+        len(p) > depth + 1 and p[depth + 1] is paths[0][depth + 1] for p in paths
+    ):
+        depth += 1
+    return depth
+
+
+def child_index(node: AST, child: AST) -> int:
+    """The position of the child in the scoped children of the node"""
+    return next(i for i, (c, *_) in enumerate(scoped_children(node)) if c is child)
+
+
+def evaluated_before(node: AST, child: AST) -> typing.Optional[typing.List[AST]]:
+    """
+    The terms that are evaluated before the child whenever the node is evaluated
+    or None if the child is not evaluated every time
+    """
+    children = scoped_children(node)
+    _, position, multiplicity, _ = children[child_index(node, child)]
+    if position != Occurrence.STRICT or multiplicity == 0:
+        return None
+    if isinstance(node, Let):
+        evaluated = [b for _, b in node.bindings] + [node.term]
+    elif isinstance(node, Apply) and isinstance(node.f, Lambda):
+        if child is node.f.term:
+            return list(node.xs)
+        evaluated = list(node.xs)
+    elif isinstance(node, Apply):
+        evaluated = [node.f, *node.xs]
+    else:
+        # the order of evaluation is not known, e.g. for the fields of patterns
+        return [c for c, *_ in children if c is not child]
+    return evaluated[: next(i for i, c in enumerate(evaluated) if c is child)]
+
+
+def _may_trace(node: AST) -> bool:
+    return bool(effect(node) & Effect.MAY_TRACE)
+
+
+def certainly_evaluated(
+    path: typing.List[AST],
+    depth: int,
+    index: int,
+    may_trace: typing.Callable[[AST], bool] = _may_trace,
+) -> bool:
+    """
+    Whether the occurrence at the end of the path is evaluated whenever the children of the node at depth
+    starting at index are evaluated, and nothing that may trace is evaluated before it
+    """
+    for j in range(depth, len(path) - 1):
+        before = evaluated_before(path[j], path[j + 1])
+        if before is None:
+            return False
+        if j == depth:
+            before = [b for b in before if child_index(path[j], b) >= index]
+        if any(may_trace(b) for b in before):
+            return False
+    return True
@@ -0,0 +1,74 @@
+"""
+Lower bound on the machine steps of evaluating pluthon terms
+
+Every compiled node that is evaluated counts as one step and every saturated builtin call
+counts as one more step, as no builtin is cheaper than a machine step.
+Only the cheaper branch of Ite and nothing below lambdas and delayed terms is counted.
+Unlike the estimate of cost.py this is cheap enough to be queried for every subterm
+by the optimizations. Results are cached on the nodes like the variable analysis (see variables.py).
+"""
+
+import typing
+
+from ..pluthon_ast import AST, Apply, Delay, Force, Ite, Lambda, Let, Pattern, Program
+from ..util import analyze_cached, cached_analysis
+from .effects import builtin_arity, builtin_head
+
+STEPS_KEY = "steps"
+
+
+def _children(node: AST) -> typing.Iterable[AST]:
+    if isinstance(node, Apply):
+        children = [node.f, *node.xs]
+        if isinstance(node.f, Lambda):
+            children.append(node.f.term)
+        return children
+    if isinstance(node, Force):
+        children = [node.x]
+        if isinstance(node.x, Delay):
+            children.append(node.x.x)
+        return children
+    if isinstance(node, Ite):
+        return [node.i, node.t, node.e]
+    if isinstance(node, Let):
+        return [b for _, b in node.bindings] + [node.term]
+    if isinstance(node, Program):
+        return [node.prog]
+    return []
+
+
+def _steps(node: AST) -> int:
+    return cached_analysis(node, STEPS_KEY)
+
+
+def _analyze(node: AST) -> int:
+    if isinstance(node, Apply):
+        res = _steps(node.f) + sum(_steps(x) + 1 for x in node.xs)
+        head = builtin_head(node.f)
+        if head is not None and len(node.xs) >= builtin_arity(head[0]):
+            res += 1
+        if isinstance(node.f, Lambda) and len(node.f.vars) == len(node.xs):
+            res += _steps(node.f.term)
+        return res
+    if isinstance(node, Force):
+        res = 1 + _steps(node.x)
+        if isinstance(node.x, Delay):
+            res += _steps(node.x.x)
+        return res
+    if isinstance(node, Ite):
+        # force, three applications, the forced builtin, its call and the delayed branches
+        return 9 + _steps(node.i) + min(_steps(node.t), _steps(node.e))
+    if isinstance(node, Let):
+        # each binding is an application of a lambda
+        return sum(2 + _steps(b) for _, b in node.bindings) + _steps(node.term)
+    if isinstance(node, Pattern):
+        return steps(node.compose())
+    if isinstance(node, Program):
+        return _steps(node.prog)
+    # variables, constants, builtins, lambdas, delayed terms and errors
+    return 1
+
+
+def steps(node: AST) -> int:
+    """A lower bound on the number of machine steps of evaluating the term"""
+    return analyze_cached(node, STEPS_KEY, _children, _analyze)
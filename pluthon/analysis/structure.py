@@ -0,0 +1,47 @@
+"""
+Structural hashes of pluthon terms
+
+Terms that are equal (i.e. have the same shape, variable names and constants) have the same hash,
+so repeated terms can be found in linear time. Different terms may collide, so users compare
+terms with equal hashes before treating them as equal.
+Results are cached on the nodes like the variable analysis (see variables.py).
+"""
+
+import typing
+
+from ..pluthon_ast import AST, Let
+from ..util import analyze_cached, cached_analysis, iter_fields
+
+STRUCTURE_KEY = "structure"
+
+
+def _children(node: AST) -> typing.Iterator[AST]:
+    if isinstance(node, Let):
+        yield from (b for _, b in node.bindings)
+    for _, value in iter_fields(node):
+        if isinstance(value, (list, tuple)):
+            yield from (v for v in value if isinstance(v, AST))
+        elif isinstance(value, AST):
+            yield value
+
+
+def _value_key(value) -> typing.Hashable:
+    if isinstance(value, AST):
+        return cached_analysis(value, STRUCTURE_KEY)
+    if isinstance(value, (list, tuple)):
+        return tuple(_value_key(v) for v in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        # constants of uplc are not hashable
+        return repr(value)
+
+
+def _analyze(node: AST) -> int:
+    return hash((type(node), tuple(_value_key(v) for _, v in iter_fields(node))))
+
+
+def structural_hash(node: AST) -> int:
+    """A hash of the term that is equal for equal terms"""
+    return analyze_cached(node, STRUCTURE_KEY, _children, _analyze)
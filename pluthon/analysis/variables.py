@@ -0,0 +1,201 @@
+"""
+Free variables, use counts and occurrence positions of pluthon terms
+
+The results are cached on every analyzed node, so repeated queries (also for subterms)
+take constant time. NodeTransformer.generic_visit drops the cached results of a node
+when one of its children is replaced or was invalidated itself, so the analysis stays
+valid while a tree is rewritten by transformers.
+Occurrences inside patterns are counted in the term the pattern composes to.
+"""
+
+import dataclasses
+import enum
+import typing
+import uuid
+from functools import lru_cache
+
+from ..pluthon_ast import AST, Apply, Delay, Ite, Lambda, Let, Pattern, Var
+from ..util import analyze_cached, cached_analysis, iter_fields
+
+VARIABLES_KEY = "variables"
+
+
+class Occurrence(enum.IntEnum):
+    """Position of an occurrence relative to the term that contains it (ordered from strongest to weakest)"""
+
+    # evaluated once whenever the term is evaluated
+    STRICT = 0
+    # evaluated at most once whenever the term is evaluated (branches of Ite)
+    CONDITIONAL = 1
+    # evaluated any number of times (bodies of lambdas, delayed terms)
+    REPEATED = 2
+
+
+@dataclasses.dataclass(frozen=True)
+class Variables:
+    # number of free occurrences per variable name
+    uses: typing.Dict[str, int]
+    # the weakest position in which each variable occurs freely
+    occurrences: typing.Dict[str, Occurrence]
+
+    @property
+    def free(self) -> typing.FrozenSet[str]:
+        return frozenset(self.uses)
+
+
+class BinderUse(typing.NamedTuple):
+    name: str
+    uses: int
+    # None if the binder is not used
+    occurrence: typing.Optional[Occurrence]
+
+
+# a child of a node: (child, position, multiplicity, names bound by the node for the child)
+ScopedChild = typing.Tuple[AST, Occurrence, int, typing.Sequence[str]]
+
+
+def _field_children(node: AST) -> typing.Iterator[AST]:
+    for _, value in iter_fields(node):
+        if isinstance(value, (list, tuple)):
+            yield from (v for v in value if isinstance(v, AST))
+        elif isinstance(value, AST):
+            yield value
+
+
+@lru_cache()
+def pattern_summary(
+    pattern_class: typing.Type[Pattern],
+) -> typing.Dict[str, typing.Tuple[int, typing.Optional[Occurrence]]]:
+    """
+    How often and in which position each field of the pattern occurs in the composed term
+    """
+    fields = dataclasses.fields(pattern_class)
+    uuid_map = {f.name: f"0{f.name}_{uuid.uuid4().hex}_" for f in fields}
+    term = pattern_class(*[Var(uuid_map[f.name]) for f in fields]).compose()
+    res = variables(term)
+    return {
+        f.name: (
+            res.uses.get(uuid_map[f.name], 0),
+            res.occurrences.get(uuid_map[f.name]),
+        )
+        for f in fields
+    }
+
+
+def scoped_children(node: AST) -> typing.List[ScopedChild]:
+    if isinstance(node, Lambda):
+        return [(node.term, Occurrence.REPEATED, 1, node.vars)]
+    if isinstance(node, Delay):
+        return [(node.x, Occurrence.REPEATED, 1, ())]
+    if isinstance(node, Ite):
+        return [
+            (node.i, Occurrence.STRICT, 1, ()),
+            (node.t, Occurrence.CONDITIONAL, 1, ()),
+            (node.e, Occurrence.CONDITIONAL, 1, ()),
+        ]
+    if isinstance(node, Let):
+        names = [name for name, _ in node.bindings]
+        return [
+            (binding, Occurrence.STRICT, 1, names[:i])
+            for i, (_, binding) in enumerate(node.bindings)
+        ] + [(node.term, Occurrence.STRICT, 1, names)]
+    if (
+        isinstance(node, Apply)
+        and isinstance(node.f, Lambda)
+        and len(node.f.vars) <= len(node.xs)
+    ):
+        # the body of an immediately applied lambda is evaluated exactly once
+        # the lambda itself is only analyzed to keep its analysis cached with the parent
+        return [
+            (node.f, Occurrence.STRICT, 0, ()),
+            (node.f.term, Occurrence.STRICT, 1, node.f.vars),
+        ] + [(x, Occurrence.STRICT, 1, ()) for x in node.xs]
+    if isinstance(node, Pattern):
+        summary = pattern_summary(type(node))
+        res = []
+        for name, value in iter_fields(node):
+            if not isinstance(value, AST):
+                continue
+            uses, occurrence = summary[name]
+            res.append((value, occurrence or Occurrence.STRICT, uses, ()))
+        return res
+    return [(child, Occurrence.STRICT, 1, ()) for child in _field_children(node)]
+
+
+def _analyze(node: AST) -> Variables:
+    if isinstance(node, Var):
+        return Variables({node.name: 1}, {node.name: Occurrence.STRICT})
+    uses = {}
+    occurrences = {}
+    for child, position, multiplicity, bound in scoped_children(node):
+        if multiplicity == 0:
+            continue
+        child_variables = cached_analysis(child, VARIABLES_KEY)
+        for name, count in child_variables.uses.items():
+            if name in bound:
+                continue
+            uses[name] = uses.get(name, 0) + count * multiplicity
+            occurrences[name] = max(
+                occurrences.get(name, Occurrence.STRICT),
+                child_variables.occurrences[name],
+                position,
+            )
+    return Variables(uses, occurrences)
+
+
+def variables(node: AST) -> Variables:
+    """Free variables of the term with their number of uses and weakest occurrence position"""
+    return analyze_cached(
+        node,
+        VARIABLES_KEY,
+        lambda n: (c for c, *_ in scoped_children(n)),
+        _analyze,
+    )
+
+
+def free_variables(node: AST) -> typing.FrozenSet[str]:
+    return variables(node).free
+
+
+def use_count(node: AST, name: str) -> int:
+    """Number of free occurrences of the variable in the term"""
+    return variables(node).uses.get(name, 0)
+
+
+def binder_uses(node: typing.Union[Lambda, Let]) -> typing.List[BinderUse]:
+    """
+    Number of uses and weakest occurrence position of each variable bound by a lambda or let,
+    in order of the variables resp. bindings
+    """
+    res = []
+    if isinstance(node, Lambda):
+        term = variables(node.term)
+        for i, name in enumerate(node.vars):
+            if name in node.vars[i + 1 :]:
+                # shadowed by a later variable of the same lambda
+                res.append(BinderUse(name, 0, None))
+            else:
+                res.append(
+                    BinderUse(name, term.uses.get(name, 0), term.occurrences.get(name))
+                )
+        return res
+    if isinstance(node, Let):
+        names = {name for name, _ in node.bindings}
+        scope = [b for _, b in node.bindings] + [node.term]
+        # the uses in the scope following the current binding, collected from the term to the first binding
+        following = {}
+        res = [None] * len(node.bindings)
+        for j in reversed(range(len(scope))):
+            if j < len(node.bindings):
+                name = node.bindings[j][0]
+                # the earlier bindings of the same name are shadowed by this one
+                res[j] = BinderUse(name, *following.pop(name, (0, None)))
+            scope_variables = variables(scope[j])
+            for name in names.intersection(scope_variables.uses):
+                uses, occurrence = following.get(name, (0, Occurrence.STRICT))
+                following[name] = (
+                    uses + scope_variables.uses[name],
+                    max(occurrence, scope_variables.occurrences[name]),
+                )
+        return res
+    raise NotImplementedError(f"{node.__class__.__name__} does not bind variables")
@@ -0,0 +1,175 @@
+"""
+Evaluation of a compiled program on many argument tuples
+
+The program is compiled once and then applied to every tuple of arguments (UPLC constants).
+Evaluations are distributed over a process pool, the results are streamed back in order
+together with the ExBudget of every run and can be summarized in percentiles.
+"""
+
+import multiprocessing
+import typing
+from dataclasses import dataclass, field
+
+from uplc import ast as uplc_ast, eval as uplc_eval, flatten, unflatten
+from uplc.cost_model import (
+    Budget,
+    BuiltinCostModel,
+    CekMachineCostModel,
+    default_budget,
+    default_builtin_cost_model_plutus_v3,
+    default_cek_machine_cost_model_plutus_v3,
+)
+
+from .compiler_config import DEFAULT_CONFIG
+from .pluthon_ast import Program
+from .tools import compile
+
+DEFAULT_PERCENTILES = (50, 90, 99, 100)
+
+
+@dataclass
+class EvaluationResult:
+    # position of the arguments in the batch
+    index: int
+    result: typing.Optional[uplc_ast.AST]
+    # message of the error if the evaluation failed
+    error: typing.Optional[str]
+    logs: typing.List[str]
+    cost: Budget
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+
+@dataclass
+class BatchSummary:
+    runs: int = 0
+    failures: int = 0
+    # percentile -> budget of the runs (computed separately for cpu and memory)
+    cpu: typing.Dict[int, int] = field(default_factory=dict)
+    memory: typing.Dict[int, int] = field(default_factory=dict)
+
+
+def _percentile(sorted_values: typing.List[int], p: int) -> int:
+    # nearest-rank method
+    rank = max(1, -(-p * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+def summarize(
+    results: typing.Iterable[EvaluationResult],
+    percentiles: typing.Sequence[int] = DEFAULT_PERCENTILES,
+) -> BatchSummary:
+    """Percentiles of the budget of all runs (including failed runs)"""
+    summary = BatchSummary()
+    cpu, memory = [], []
+    for r in results:
+        summary.runs += 1
+        summary.failures += r.failed
+        cpu.append(r.cost.cpu)
+        memory.append(r.cost.memory)
+    if summary.runs:
+        cpu.sort()
+        memory.sort()
+        summary.cpu = {p: _percentile(cpu, p) for p in percentiles}
+        summary.memory = {p: _percentile(memory, p) for p in percentiles}
+    return summary
+
+
+def _evaluate(
+    program: uplc_ast.Program,
+    index: int,
+    args: typing.Sequence[uplc_ast.AST],
+    budget: Budget,
+    cek_machine_cost_model: CekMachineCostModel,
+    builtin_cost_model: BuiltinCostModel,
+) -> EvaluationResult:
+    res = uplc_eval(
+        program,
+        *args,
+        budget=budget,
+        cek_machine_cost_model=cek_machine_cost_model,
+        builtin_cost_model=builtin_cost_model,
+    )
+    if isinstance(res.result, Exception):
+        # exceptions are not necessarily picklable
+        return EvaluationResult(index, None, repr(res.result), res.logs, res.cost)
+    return EvaluationResult(index, res.result, None, res.logs, res.cost)
+
+
+# state of the worker processes, set by _init_worker
+_worker_state = None
+
+
+def _init_worker(flat_program: bytes, *eval_args):
+    global _worker_state
+    # the flat encoding is much smaller to transfer than the pickled AST
+    _worker_state = (unflatten(flat_program), *eval_args)
+
+
+def _evaluate_in_worker(indexed_args):
+    program, *eval_args = _worker_state
+    index, args = indexed_args
+    return _evaluate(program, index, args, *eval_args)
+
+
+class BatchEvaluator:
+    """
+    Compiles a program once and evaluates it on batches of arguments
+    """
+
+    def __init__(
+        self,
+        program: typing.Union[Program, uplc_ast.Program],
+        config=DEFAULT_CONFIG,
+        budget: Budget = default_budget(),
+        cek_machine_cost_model: CekMachineCostModel = default_cek_machine_cost_model_plutus_v3(),
+        builtin_cost_model: BuiltinCostModel = default_builtin_cost_model_plutus_v3(),
+    ):
+        if isinstance(program, Program):
+            program = compile(program, config)
+        self.program = program
+        self.eval_args = (budget, cek_machine_cost_model, builtin_cost_model)
+
+    def evaluate_one(self, *args: uplc_ast.AST) -> EvaluationResult:
+        return _evaluate(self.program, 0, args, *self.eval_args)
+
+    def evaluate(
+        self,
+        batch: typing.Iterable[typing.Sequence[uplc_ast.AST]],
+        processes: typing.Optional[int] = None,
+        chunksize: int = 16,
+        ordered: bool = True,
+    ) -> typing.Iterator[EvaluationResult]:
+        """
+        Evaluates the program on every tuple of arguments in the batch and yields the results as they become available.
+        :param processes: number of worker processes, defaults to the number of CPUs. With 1 the batch is evaluated in this process.
+        :param ordered: whether the results are yielded in the order of the batch
+        """
+        indexed = enumerate(batch)
+        if processes == 1:
+            for index, args in indexed:
+                yield _evaluate(self.program, index, args, *self.eval_args)
+            return
+        with multiprocessing.Pool(
+            processes,
+            initializer=_init_worker,
+            initargs=(flatten(self.program), *self.eval_args),
+        ) as pool:
+            imap = pool.imap if ordered else pool.imap_unordered
+            yield from imap(_evaluate_in_worker, indexed, chunksize)
+
+
+def evaluate_batch(
+    program: typing.Union[Program, uplc_ast.Program],
+    batch: typing.Iterable[typing.Sequence[uplc_ast.AST]],
+    config=DEFAULT_CONFIG,
+    processes: typing.Optional[int] = None,
+) -> typing.Tuple[typing.List[EvaluationResult], BatchSummary]:
+    """
+    Compiles the program once, evaluates it on every tuple of arguments in the batch
+    and returns the results in order together with a summary of their budgets
+    """
+    results = list(BatchEvaluator(program, config).evaluate(batch, processes))
+    return results, summarize(results)
@@ -9,6 +9,18 @@ class CompilationConfig(uplc_compiler_config.CompilationConfig):
     iterative_unfold_patterns: Optional[bool] = None
     constant_index_access_list: Optional[bool] = None
     remove_trace: Optional[bool] = None
+    simplify_bindings: Optional[bool] = None
+    simplify_booleans: Optional[bool] = None
+    eliminate_common_subexpressions: Optional[bool] = None
+    hoist_loop_invariants: Optional[bool] = None
+    fuse_list_patterns: Optional[bool] = None
+    materialize_constant_lists: Optional[bool] = None
+    share_index_access_tails: Optional[bool] = None
+    unchecked_index_access: Optional[bool] = None
+    inline_list_operators: Optional[bool] = None
+    remove_dead_parameters: Optional[bool] = None
+    fold_constants: Optional[bool] = None
+    remove_redundant_wrappers: Optional[bool] = None
 
     def update(
         self, other: Optional["CompilationConfig"] = None, **kwargs
@@ -39,13 +51,25 @@ OPT_O1_CONFIG = (
     .update(
         compress_patterns=True,
         constant_index_access_list=True,
+        materialize_constant_lists=True,
+        remove_redundant_wrappers=True,
     )
 )
 OPT_O2_CONFIG = (
     CompilationConfig()
     .update(OPT_O1_CONFIG)
     .update(uplc_compiler_config.OPT_O2_CONFIG)
-    .update()
+    .update(
+        simplify_bindings=True,
+        simplify_booleans=True,
+        eliminate_common_subexpressions=True,
+        hoist_loop_invariants=True,
+        fuse_list_patterns=True,
+        share_index_access_tails=True,
+        inline_list_operators=True,
+        remove_dead_parameters=True,
+        fold_constants=True,
+    )
 )
 OPT_O3_CONFIG = (
     CompilationConfig()
@@ -55,6 +79,7 @@ OPT_O3_CONFIG = (
         unique_variable_names=True,
         iterative_unfold_patterns=True,
         remove_trace=True,
+        unchecked_index_access=True,
     )
 )
 OPT_CONFIGS = [OPT_O0_CONFIG, OPT_O1_CONFIG, OPT_O2_CONFIG, OPT_O3_CONFIG]
@@ -76,6 +101,42 @@ ARGPARSE_ARGS.update(
         "remove_trace": {
             "help": "Removes trace calls from the compiled code. This will make debugging harder but reduces contract size.",
         },
+        "simplify_bindings": {
+            "help": "Removes unused let bindings, inlines bindings that are used once and beta-reduces immediately applied lambdas. Reduces memory and CPU steps.",
+        },
+        "simplify_booleans": {
+            "help": "Folds if-then-else with constant conditions, removes negations by swapping branches and turns boolean operators into short-circuit if-then-else chains. Reduces memory and CPU steps.",
+        },
+        "eliminate_common_subexpressions": {
+            "help": "Binds pure terms that are computed several times in the same scope to a variable. Reduces memory and CPU steps and usually the size of the compiled contract.",
+        },
+        "hoist_loop_invariants": {
+            "help": "Moves pure terms that do not depend on the loop variables out of recursive functions and the functions passed to list operations. Reduces memory and CPU steps.",
+        },
+        "materialize_constant_lists": {
+            "help": "Replaces lists and data that are built from constants, e.g. chains of MkCons over constant elements, with a single constant. Reduces memory and CPU steps and usually the size of the compiled contract.",
+        },
+        "share_index_access_tails": {
+            "help": "Evaluates the list once and shares the tails between several constant index accesses to the same list, e.g. the fields of a datum. Reduces memory and CPU steps.",
+        },
+        "unchecked_index_access": {
+            "help": "Omits the check that the list is long enough at every step of index accesses and picks the cheapest way to step through the list. Accesses out of bounds still fail, but without the IndexError trace. Reduces memory and CPU steps.",
+        },
+        "inline_list_operators": {
+            "help": "Specializes the loops of list operations whose function is a lambda, e.g. a map or fold, so that the function body is evaluated directly in the loop. Reduces memory and CPU steps but may increase the size of the compiled contract.",
+        },
+        "remove_dead_parameters": {
+            "help": "Removes the parameters that let bound functions, e.g. the compressed patterns, do not use from the function and all its calls. Reduces memory and CPU steps and the size of the compiled contract.",
+        },
+        "fold_constants": {
+            "help": "Evaluates closed terms that apply builtins, patterns or lambdas to constants at compile time and replaces them with their result. Reduces memory and CPU steps.",
+        },
+        "remove_redundant_wrappers": {
+            "help": "Replaces Force(Delay(x)) with x and lambdas that only pass their arguments on to a function, e.g. \\x y -> f x y, with the function. Reduces memory and CPU steps and the size of the compiled contract.",
+        },
+        "fuse_list_patterns": {
+            "help": "Fuses list operations that consume the result of a map or filter, e.g. a fold over a mapped list, into a single loop that does not build the intermediate list. Reduces memory and CPU steps.",
+        },
     }
 )
 for k in ARGPARSE_ARGS:
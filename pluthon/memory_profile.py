@@ -0,0 +1,130 @@
+"""
+Memory instrumentation of the compilation pipeline
+
+Tracks the memory allocated by every phase of the compiler with tracemalloc
+and counts the AST nodes that each phase created.
+"""
+
+import dataclasses
+import sys
+import tracemalloc
+import typing
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from uplc import ast as uplc_ast
+
+from .pluthon_ast import AST, Let
+from .util import iter_fields
+
+
+def iter_nodes(node) -> typing.Iterator:
+    """
+    Yields all nodes of a pluthon or UPLC AST (iteratively, the trees may be very deep)
+    """
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        yield n
+        if isinstance(n, AST):
+            if isinstance(n, Let):
+                stack.extend(b for _, b in n.bindings)
+            children = (v for _, v in iter_fields(n))
+        elif isinstance(n, uplc_ast.AST) and dataclasses.is_dataclass(n):
+            children = (getattr(n, f.name, None) for f in dataclasses.fields(n))
+        else:
+            continue
+        for v in children:
+            if isinstance(v, (list, tuple)):
+                stack.extend(c for c in v if isinstance(c, (AST, uplc_ast.AST)))
+            elif isinstance(v, (AST, uplc_ast.AST)):
+                stack.append(v)
+
+
+@dataclass
+class PhaseMemory:
+    """Memory statistics of one compiler phase, accumulated over all of its invocations"""
+
+    phase: str
+    calls: int = 0
+    # maximum memory in use during the phase, on top of what was in use before it started
+    peak: int = 0
+    # memory that was allocated and not freed by the phase
+    net: int = 0
+    # number and (shallow) size of the nodes created by the phase per node class
+    allocated_nodes: typing.Dict[str, int] = field(default_factory=dict)
+    allocated_node_bytes: typing.Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class MemoryReport:
+    phases: typing.List[PhaseMemory] = field(default_factory=list)
+    # peak of memory in use during any of the phases
+    peak: int = 0
+
+    def phase(self, name: str) -> PhaseMemory:
+        for p in self.phases:
+            if p.phase == name:
+                return p
+        p = PhaseMemory(name)
+        self.phases.append(p)
+        return p
+
+    def top_node_classes(self, n: int = 10) -> typing.List[typing.Tuple[str, int]]:
+        """The node classes that were allocated the most bytes over all phases"""
+        total = defaultdict(int)
+        for p in self.phases:
+            for cls, size in p.allocated_node_bytes.items():
+                total[cls] += size
+        return sorted(total.items(), key=lambda x: x[1], reverse=True)[:n]
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+
+class MemoryTracker:
+    """
+    Runs compiler phases while recording their memory usage in a MemoryReport.
+    Starts tracemalloc if it is not running yet.
+    """
+
+    def __init__(self):
+        self.report = MemoryReport()
+        self._started_tracing = False
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, *exc):
+        if self._started_tracing:
+            tracemalloc.stop()
+        return False
+
+    def __call__(self, name: str, phase: typing.Callable, x):
+        before_ids = {id(n) for n in iter_nodes(x)}
+        current_before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        res = phase(x)
+        current_after, peak = tracemalloc.get_traced_memory()
+        stats = self.report.phase(name)
+        stats.calls += 1
+        stats.peak = max(stats.peak, peak - current_before)
+        stats.net += current_after - current_before
+        self.report.peak = max(self.report.peak, peak)
+        for n in iter_nodes(res):
+            if id(n) in before_ids:
+                continue
+            cls = n.__class__.__name__
+            stats.allocated_nodes[cls] = stats.allocated_nodes.get(cls, 0) + 1
+            stats.allocated_node_bytes[cls] = stats.allocated_node_bytes.get(
+                cls, 0
+            ) + sys.getsizeof(n)
+        return res
+
+
+def untracked(name: str, phase: typing.Callable, x):
+    return phase(x)
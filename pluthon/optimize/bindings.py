@@ -0,0 +1,329 @@
+import copy
+import dataclasses
+import itertools
+import typing
+from functools import lru_cache
+
+from uplc import ast as uplc_ast
+
+from ..analysis.effects import Effect, builtin_arity, builtin_head, effect, is_pure
+from ..analysis.variables import (
+    BinderUse,
+    Occurrence,
+    binder_uses,
+    free_variables,
+)
+from ..pluthon_ast import (
+    AST,
+    Apply,
+    Bool,
+    BuiltIn,
+    ByteString,
+    Delay,
+    Force,
+    Integer,
+    Lambda,
+    Let,
+    Pattern,
+    Text,
+    UPLCConstant,
+    Unit,
+    Var,
+)
+from ..pluthon_sugar import EmptyList
+from ..util import NodeTransformer, NodeVisitor, invalidate_analyses
+
+# evaluating these terms costs one step, the same as looking up a variable
+VALUES = (
+    Lambda,
+    Delay,
+    Var,
+    BuiltIn,
+    Integer,
+    ByteString,
+    Text,
+    Bool,
+    Unit,
+    UPLCConstant,
+    EmptyList,
+)
+
+
+class _BinderCollector(NodeVisitor):
+    def __init__(self):
+        self.binders = set()
+
+    def visit_Lambda(self, node: Lambda):
+        self.binders.update(node.vars)
+        self.generic_visit(node)
+
+    def visit_Let(self, node: Let):
+        self.binders.update(name for name, _ in node.bindings)
+        self.generic_visit(node)
+
+    def visit(self, node):
+        if isinstance(node, Pattern):
+            return self.visit(node.compose())
+        return super().visit(node)
+
+
+@lru_cache()
+def pattern_binders(pattern_class: typing.Type[Pattern]) -> typing.FrozenSet[str]:
+    """The variables that the composed pattern binds (possibly around its fields)"""
+    fields = dataclasses.fields(pattern_class)
+    collector = _BinderCollector()
+    collector.visit(pattern_class(*[Var(f"0{f.name}_") for f in fields]))
+    return frozenset(collector.binders)
+
+
+class Substitute(NodeTransformer):
+    """
+    Replaces the free occurrences of variables with terms.
+    With check=True the tree is not changed, only the variables whose terms would capture a variable are recorded.
+    """
+
+    def __init__(self, values: typing.Dict[str, AST], check: bool = False):
+        # the terms of the variables with their free variables and the position of their binding in the let
+        self.values = {
+            name: (value, free_variables(value), -1) for name, value in values.items()
+        }
+        self.check = check
+        self.bound = []
+        # the position of the latest binding of each name in the let, it captures the terms bound before
+        self.bound_at = {}
+        self.captured = set()
+
+    def shadow(self, names: typing.Iterable[str]) -> dict:
+        """Stops substituting the names, returns their terms so that they can be restored after the binder"""
+        return {name: self.values.pop(name) for name in names if name in self.values}
+
+    def visit(self, node):
+        if self.values.keys().isdisjoint(free_variables(node)):
+            return node
+        if isinstance(node, Pattern):
+            self.bound.append(pattern_binders(type(node)))
+            res = super().visit(node)
+            self.bound.pop()
+            return res
+        return super().visit(node)
+
+    def visit_Var(self, node: Var):
+        value, free, position = self.values[node.name]
+        if any(free & bound for bound in self.bound) or any(
+            self.bound_at.get(v, -1) > position for v in free
+        ):
+            self.captured.add(node.name)
+        if self.check:
+            return node
+        if isinstance(value, Var):
+            # variables may be substituted several times
+            return copy.copy(value)
+        return value
+
+    def visit_Lambda(self, node: Lambda):
+        shadowed = self.shadow(node.vars)
+        self.bound.append(frozenset(node.vars))
+        res = self.generic_visit(node)
+        self.bound.pop()
+        self.values.update(shadowed)
+        return res
+
+    def visit_Let(self, node: Let):
+        shadowed = {}
+        # the names bound by the preceding bindings
+        names = set()
+        self.bound.append(names)
+        bindings = []
+        for name, binding in node.bindings:
+            bindings.append((name, self.visit(binding)))
+            names.add(name)
+            shadowed.update(self.shadow([name]))
+        term = self.visit(node.term)
+        self.bound.pop()
+        self.values.update(shadowed)
+        if not self.check:
+            node.bindings = bindings
+            node.term = term
+            invalidate_analyses(node)
+        return node
+
+
+def substitute(term: AST, name: str, value: AST) -> typing.Optional[AST]:
+    """Substitutes the value for the free occurrences of name in term or returns None if a variable would be captured"""
+    checker = Substitute({name: value}, check=True)
+    checker.visit(term)
+    if checker.captured:
+        return None
+    return Substitute({name: value}).visit(term)
+
+
+def _inline(node: Let, inlined: typing.Set[int], check: bool) -> typing.Set[int]:
+    """
+    Substitutes the values of the inlined bindings into their scopes in a single walk of the let and drops them.
+    Returns the inlined bindings whose values would capture a variable, the let is only changed if check is False.
+    """
+    substitution = Substitute({}, check=check)
+    captured = set()
+
+    def visit(term: AST) -> AST:
+        substitution.captured.clear()
+        res = substitution.visit(term)
+        captured.update(substitution.values[name][2] for name in substitution.captured)
+        return res
+
+    bindings = []
+    for i, (name, value) in enumerate(node.bindings):
+        value = visit(value)
+        substitution.shadow([name])
+        substitution.bound_at[name] = i
+        if i not in inlined:
+            bindings.append((name, value))
+            continue
+        # the value is not substituted with check=True, it contains the free variables of the inlined values
+        free = set()
+        for v in free_variables(value):
+            if v in substitution.values:
+                free |= substitution.values[v][1]
+            else:
+                free.add(v)
+        substitution.values[name] = (value, frozenset(free), i)
+    term = visit(node.term)
+    if not check:
+        node.bindings = bindings
+        node.term = term
+        invalidate_analyses(node)
+    return captured
+
+
+def _inlinable(value: AST, use: BinderUse) -> bool:
+    if isinstance(value, Var):
+        # copy propagation
+        return True
+    if use.uses != 1:
+        return False
+    if use.occurrence == Occurrence.REPEATED:
+        # moving the computation into a loop is only fine if it does not cost more than the variable lookup,
+        # or the forces of a builtin that the other optimizations only recognize when it is applied directly
+        return isinstance(value, VALUES) or (
+            builtin_head(value) is not None and effect(value) == Effect.PURE
+        )
+    if use.occurrence == Occurrence.CONDITIONAL:
+        return effect(value) == Effect.PURE
+    # errors still happen when moved to the (only) strict use, traces may be reordered
+    return not effect(value) & Effect.MAY_TRACE
+
+
+def _used_first(node: AST, name: str) -> typing.Optional[bool]:
+    """
+    Whether evaluating the term looks up the variable before evaluating anything that is not pure,
+    None if the term neither uses the variable nor has an effect
+    """
+    if name not in free_variables(node):
+        return None if is_pure(node) else False
+    if isinstance(node, Var):
+        return True
+    if isinstance(node, Force):
+        return _used_first(node.x, name)
+    if isinstance(node, Let):
+        return _let_uses_first(node.bindings, node.term, name)
+    if isinstance(node, Apply):
+        children = [node.f, *node.xs]
+        head = builtin_head(node.f)
+        if head is None or not (
+            head[1] == uplc_ast.BuiltInFunForceMap[head[0]]
+            and builtin_arity(head[0]) >= len(node.xs)
+        ):
+            # applying the function to the first argument may already have an effect
+            children = children[:2]
+        for child in children:
+            res = _used_first(child, name)
+            if res is not None:
+                return res
+    return False
+
+
+def _let_uses_first(
+    bindings: typing.Iterable[typing.Tuple[str, AST]], term: AST, name: str
+) -> typing.Optional[bool]:
+    """_used_first for the bindings and term of a let"""
+    for binding_name, binding in bindings:
+        res = _used_first(binding, name)
+        if res is not None or binding_name == name:
+            return bool(res)
+    return _used_first(term, name)
+
+
+class BindingSimplifier(NodeTransformer):
+    """
+    Removes let bindings of pure terms that are not used, inlines bindings that are used once
+    (and bindings to variables) and turns immediately applied lambdas into lets to do the same for them
+    """
+
+    def visit_Let(self, node: Let):
+        # the bindings are simplified before their scope, so that the inlined variables are found close to the top
+        # of the scope instead of at the bottom of the terms that the nested lets were inlined into
+        node, changed = self.simplify_let(node)
+        if changed:
+            # the bindings of a nested let that is now on top are simplified before the scope as well
+            return self.visit(node)
+        node = self.generic_visit(node)
+        node, _ = self.simplify_let(node)
+        return node
+
+    def visit_Apply(self, node: Apply):
+        node = self.generic_visit(node)
+        if not isinstance(node.f, Lambda) or not node.xs:
+            return node
+        f = node.f
+        n = min(len(f.vars), len(node.xs))
+        for i, x in enumerate(node.xs[:n]):
+            if free_variables(x) & set(f.vars[:i]):
+                # the argument would be captured by the preceding variables
+                return node
+        body = f.term if n == len(f.vars) else Lambda(f.vars[n:], f.term)
+        let, changed = self.simplify_let(Let(list(zip(f.vars[:n], node.xs[:n])), body))
+        if not changed:
+            return node
+        if len(node.xs) > n:
+            return Apply(let, *node.xs[n:])
+        return let
+
+    def simplify_let(self, node: Let) -> typing.Tuple[AST, bool]:
+        """Simplifies the bindings of the let, returns the resulting term and whether it changed"""
+        changed = False
+        while node.bindings:
+            # Removing or inlining a binding changes the uses of the variables in its value,
+            # unless the value moves to its only use in a strict position, so those wait for the next round.
+            inlined = set()
+            outdated = set()
+            for i, use in reversed(list(enumerate(binder_uses(node)))):
+                name, value = node.bindings[i]
+                if name in outdated:
+                    continue
+                if use.uses == 0:
+                    if effect(value) != Effect.PURE:
+                        continue
+                elif not _inlinable(value, use) and not (
+                    use.uses == 1
+                    and use.occurrence == Occurrence.STRICT
+                    # the traces of the value keep their order if it is the first thing that the scope evaluates
+                    and _let_uses_first(
+                        itertools.islice(node.bindings, i + 1, None), node.term, name
+                    )
+                ):
+                    continue
+                if use.uses != 1 or use.occurrence != Occurrence.STRICT:
+                    outdated |= free_variables(value)
+                inlined.add(i)
+            # keeping a binding whose value would capture a variable may make others capture it
+            captured = _inline(node, inlined, check=True)
+            while captured:
+                inlined -= captured
+                captured = _inline(node, inlined, check=True)
+            if not inlined:
+                break
+            _inline(node, inlined, check=False)
+            changed = True
+        if not node.bindings:
+            return node.term, True
+        return node, changed
@@ -0,0 +1,129 @@
+import copy
+import typing
+
+from uplc import ast as uplc_ast
+
+from ..analysis.effects import builtin_head
+from ..pluthon_ast import (
+    AST,
+    Apply,
+    Bool,
+    ByteString,
+    Error,
+    Integer,
+    Ite,
+    Text,
+    Unit,
+    Var,
+)
+from ..pluthon_sugar import (
+    And,
+    EqualsInteger,
+    Iff,
+    Implies,
+    Not,
+    NotEqualsInteger,
+    Or,
+    Xor,
+)
+from ..util import NodeTransformer, compose_in_place
+
+# terms that are small enough to be duplicated into several branches
+DUPLICABLE = (Bool, Integer, ByteString, Text, Unit, Var, Error)
+
+
+def negated(node: AST) -> typing.Optional[AST]:
+    """The term x if the node is the negation of x, otherwise None"""
+    if isinstance(node, Not):
+        return node.x
+    if isinstance(node, NotEqualsInteger):
+        return EqualsInteger(node.a, node.b)
+    if (
+        isinstance(node, Apply)
+        and builtin_head(node.f) == (uplc_ast.BuiltInFun.IfThenElse, 1)
+        and len(node.xs) == 3
+        and node.xs[1] == Bool(False)
+        and node.xs[2] == Bool(True)
+    ):
+        # the composed form of Not
+        return node.xs[0]
+    return None
+
+
+class BooleanSimplifier(NodeTransformer):
+    """
+    Simplifies boolean operators and if-then-else expressions:
+    Ite with literal conditions is reduced to the taken branch, negated conditions swap the branches,
+    And, Or and Implies become short-circuit Ite chains and Ite(c, True, False) becomes c.
+    Assumes that conditions evaluate to booleans.
+    """
+
+    def visit_Ite(self, node: Ite):
+        node = self.generic_visit(node)
+        return self.simplify_ite(node)
+
+    def visit_And(self, node: And):
+        return self.visit(compose_in_place(node))
+
+    def visit_Or(self, node: Or):
+        return self.visit(compose_in_place(node))
+
+    def visit_Implies(self, node: Implies):
+        return self.visit(compose_in_place(node))
+
+    def visit_Not(self, node: Not):
+        node = self.generic_visit(node)
+        if isinstance(node.x, Bool):
+            return Bool(not node.x.x)
+        x = negated(node.x)
+        if x is not None:
+            return x
+        return node
+
+    def visit_Iff(self, node: Iff):
+        node = self.generic_visit(node)
+        return self.simplify_equivalence(node, negate=False)
+
+    def visit_Xor(self, node: Xor):
+        node = self.generic_visit(node)
+        return self.simplify_equivalence(node, negate=True)
+
+    def simplify_equivalence(self, node: typing.Union[Iff, Xor], negate: bool):
+        # comparing with a literal is the other term or its negation
+        for literal, other in ((node.x, node.y), (node.y, node.x)):
+            if isinstance(literal, Bool):
+                if literal.x != negate:
+                    return other
+                return self.visit_Not(Not(other))
+        return node
+
+    def simplify_ite(self, node: Ite) -> AST:
+        if isinstance(node.i, Bool):
+            return node.t if node.i.x else node.e
+        x = negated(node.i)
+        if x is not None:
+            return self.simplify_ite(Ite(x, node.e, node.t))
+        if node.t == Bool(True) and node.e == Bool(False):
+            return node.i
+        if node.t == Bool(False) and node.e == Bool(True):
+            return Not(node.i)
+        if isinstance(node.i, Ite) and (
+            isinstance(node.i.t, Bool) != isinstance(node.i.e, Bool)
+        ):
+            # Ite(Ite(a, b, c), t, e) decides on a directly, e.g. for nested And and Or
+            # one of b, c is a literal, the branch it selects is duplicated
+            literal = node.i.t if isinstance(node.i.t, Bool) else node.i.e
+            duplicated = node.t if literal.x else node.e
+            if not isinstance(duplicated, DUPLICABLE):
+                return node
+            branches = [
+                (
+                    # duplicated terms are leaves, the copy keeps nodes from being shared in the tree
+                    copy.copy(duplicated)
+                    if b is literal
+                    else self.simplify_ite(Ite(b, node.t, node.e))
+                )
+                for b in (node.i.t, node.i.e)
+            ]
+            return self.simplify_ite(Ite(node.i.i, *branches))
+        return node
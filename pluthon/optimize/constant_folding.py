@@ -0,0 +1,149 @@
+import typing
+
+from uplc import ast as uplc_ast, eval as uplc_eval
+from uplc.cost_model import Budget
+
+from ..analysis.effects import builtin_head
+from ..analysis.variables import free_variables
+from ..pluthon_ast import (
+    AST,
+    Apply,
+    Bool,
+    ByteString,
+    Delay,
+    Error,
+    Force,
+    Integer,
+    Ite,
+    Lambda,
+    Pattern,
+    Text,
+    UPLCConstant,
+    Unit,
+)
+from ..pluthon_sugar import EmptyIntegerList, EmptyList, Range
+from ..util import NodeTransformer, analyze_cached, iter_fields
+
+FOLDED_KEY = "folded"
+
+# evaluations that exceed this budget are not folded
+FOLDING_BUDGET = Budget(cpu=100_000_000, memory=1_000_000)
+
+# longer constant ranges are built at runtime, as the constant increases the size of the script
+MAX_RANGE_CONSTANT_LENGTH = 256
+
+LITERALS = (Integer, ByteString, Text, Bool, Unit, UPLCConstant, EmptyList)
+
+UNSERIALIZABLE_CONSTANTS = (
+    uplc_ast.BuiltinBLS12381G1Element,
+    uplc_ast.BuiltinBLS12381G2Element,
+    uplc_ast.BuiltinBLS12381Mlresult,
+)
+
+
+def serializable(c: uplc_ast.Constant) -> bool:
+    """Whether the constant can be part of a flat encoded script"""
+    if isinstance(c, UNSERIALIZABLE_CONSTANTS):
+        return False
+    if isinstance(c, uplc_ast.BuiltinList):
+        return serializable(c.sample_value) and all(map(serializable, c.values))
+    if isinstance(c, uplc_ast.BuiltinPair):
+        return serializable(c.l_value) and serializable(c.r_value)
+    return True
+
+
+def literal(c: uplc_ast.Constant) -> AST:
+    """The pluthon literal that compiles to the constant"""
+    if isinstance(c, uplc_ast.BuiltinInteger):
+        return Integer(c.value)
+    if isinstance(c, uplc_ast.BuiltinByteString):
+        return ByteString(c.value)
+    if isinstance(c, uplc_ast.BuiltinString):
+        return Text(c.value)
+    if isinstance(c, uplc_ast.BuiltinBool):
+        return Bool(c.value)
+    if isinstance(c, uplc_ast.BuiltinUnit):
+        return Unit()
+    return UPLCConstant(c)
+
+
+def _range_constant(node: Range) -> typing.Optional[AST]:
+    """The list of the range if all of its parameters are integer literals and it is not too long"""
+    if not all(isinstance(x, Integer) for x in (node.limit, node.start, node.step)):
+        return None
+    limit, start, step = node.limit.x, node.start.x, node.step.x
+    if start >= limit:
+        return EmptyIntegerList()
+    if step <= 0:
+        # the range does not terminate
+        return None
+    values = range(start, limit, step)
+    if len(values) > MAX_RANGE_CONSTANT_LENGTH:
+        return None
+    return UPLCConstant(
+        uplc_ast.BuiltinList(
+            [uplc_ast.BuiltinInteger(v) for v in values], uplc_ast.BuiltinInteger(0)
+        )
+    )
+
+
+def _foldable_child(node: AST) -> bool:
+    return (
+        isinstance(node, LITERALS + (Lambda, Delay, Error))
+        or builtin_head(node) is not None
+    )
+
+
+# the empty list constants of data are larger than these builtin calls
+EMPTY_LIST_BUILTINS = (uplc_ast.BuiltInFun.MkNilData, uplc_ast.BuiltInFun.MkNilPairData)
+
+
+def _is_candidate(node: AST) -> bool:
+    if not isinstance(node, (Apply, Force, Ite, Pattern)):
+        return False
+    if builtin_head(node) is not None:
+        return False
+    head = builtin_head(node.f) if isinstance(node, Apply) else None
+    if head is not None and head[0] in EMPTY_LIST_BUILTINS:
+        return False
+    for _, value in iter_fields(node):
+        values = value if isinstance(value, (list, tuple)) else [value]
+        if not all(_foldable_child(v) for v in values if isinstance(v, AST)):
+            return False
+    return not free_variables(node)
+
+
+def _fold(node: AST):
+    res = uplc_eval(uplc_ast.Program((1, 0, 0), node.compile()), budget=FOLDING_BUDGET)
+    if (
+        isinstance(res.result, Exception)
+        or res.logs
+        or not isinstance(res.result, uplc_ast.Constant)
+        or not serializable(res.result)
+    ):
+        return False
+    return literal(res.result)
+
+
+class ConstantFolder(NodeTransformer):
+    """
+    Replaces closed terms that apply builtins, patterns or lambdas to constants with the constant they evaluate to.
+    The terms are evaluated with the uplc machine under FOLDING_BUDGET.
+    Terms that fail, trace or do not result in a constant are left unchanged.
+    Ranges over integer literals are computed directly, up to MAX_RANGE_CONSTANT_LENGTH elements.
+    """
+
+    def visit_Range(self, node: Range):
+        node = super().generic_visit(node)
+        # folding with the machine would not succeed for larger or non-terminating ranges either
+        constant = _range_constant(node)
+        return constant if constant is not None else node
+
+    def generic_visit(self, node):
+        node = super().generic_visit(node)
+        if _is_candidate(node):
+            # the result (or False if the term can not be folded) is cached until a child changes
+            folded = analyze_cached(node, FOLDED_KEY, lambda n: (), _fold)
+            if folded is not False:
+                return folded
+        return node
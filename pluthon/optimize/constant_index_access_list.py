@@ -1,31 +1,123 @@
-from pluthon.pluthon_ast import Integer
+import typing
+from functools import lru_cache
+
+from uplc import ast as uplc_ast, eval as uplc_eval
+from uplc.cost_model import Budget
+
+from pluthon.analysis.cost import static_length
+from pluthon.pluthon_ast import AST, Integer, Program, UPLCConstant
 from pluthon.pluthon_sugar import (
     IndexAccessList,
     ConstantIndexAccessList,
     NthField,
-    ConstantNthField,
+    Fields,
     IndexAccessListFast,
     ConstantIndexAccessListFast,
 )
 from pluthon.util import NodeTransformer
 
+# unchecked constant accesses to larger indices skip through the list instead of unrolling the steps,
+# which would increase the size of the script
+MAX_UNROLLED_INDEX = 64
+# the largest step size considered for IndexAccessListFast
+MAX_STEP_SIZE = 16
+# the length assumed for lists whose length is not known statically
+ASSUMED_LIST_LENGTH = 32
+
+
+class _AccessCost(typing.NamedTuple):
+    """The cost of an access, linear in the number of skips and steps through the list"""
+
+    base: Budget
+    step: Budget
+    skip: Budget
+
+    def cost(self, i: int, step_size: int) -> Budget:
+        return self.base + self.skip * (i // step_size) + self.step * (i % step_size)
+
+
+def _measure(access: typing.Callable[[AST, AST], AST], i: int) -> Budget:
+    lst = uplc_ast.BuiltinList(
+        [uplc_ast.BuiltinInteger(0)] * (i + 1), uplc_ast.BuiltinInteger(0)
+    )
+    res = uplc_eval(Program((1, 0, 0), access(UPLCConstant(lst), Integer(i))).compile())
+    return res.cost
+
+
+@lru_cache()
+def _access_cost(step_size: typing.Optional[int]) -> _AccessCost:
+    """
+    The cost of IndexAccessListFast(step_size) or IndexAccessList if step_size is None,
+    measured with the machine on short constant lists
+    """
+    if step_size is None:
+        access = IndexAccessList
+        step_size = 1
+    else:
+        access = IndexAccessListFast(step_size)
+    base = _measure(access, 0)
+    if step_size == 1:
+        step = Budget(0, 0)
+    else:
+        step = _measure(access, 1) - base
+    skip = _measure(access, step_size) - base
+    return _AccessCost(base, step, skip)
+
+
+def _expected_cost(step_size: typing.Optional[int], indices: range) -> Budget:
+    cost = _access_cost(step_size)
+    total = Budget(0, 0)
+    for i in indices:
+        total += cost.cost(i, step_size or 1)
+    return total
+
+
+def _best_step_size(indices: range) -> typing.Optional[int]:
+    """The step size of the cheapest IndexAccessListFast for the indices or None if IndexAccessList is cheaper"""
+
+    def key(step_size: typing.Optional[int]):
+        cost = _expected_cost(step_size, indices)
+        return cost.cpu, cost.memory
+
+    return min([None, *range(1, MAX_STEP_SIZE + 1)], key=key)
+
 
 class IndexAccessOptimizer(NodeTransformer):
     """
     Replaces IndexAccesses to constants with ConstantIndexAccesses
+    If unchecked accesses are allowed, the accesses do not check that the list is long enough at every step.
+    They still fail for lists that are too short, but without the IndexError trace.
+    Unchecked accesses to large constant indices and to indices that are not constant skip through the list,
+    with the step size of IndexAccessListFast that is the cheapest for the indices that may be accessed
+    (all indices of lists with a known length, the constant index or the indices of a list of ASSUMED_LIST_LENGTH).
     """
 
+    def __init__(self, unchecked: bool = False):
+        self.unchecked = unchecked
+
     def visit_IndexAccessList(self, node: IndexAccessList):
-        if isinstance(node.i, Integer):
-            return ConstantIndexAccessList(node.l, node.i.x)
-        return node
+        node = self.generic_visit(node)
+        return self.access(node.lst, node.i) or node
 
     def visit_NthField(self, node: NthField):
-        if isinstance(node.n, Integer):
-            return ConstantNthField(node.d, node.n.x)
-        return node
-
-    def visit_IndexAccessListFast(self, node: IndexAccessListFast):
-        if isinstance(node.i, Integer):
-            return ConstantIndexAccessListFast(node.l, node.i.x)
-        return node
+        node = self.generic_visit(node)
+        return self.access(Fields(node.d), node.n) or node
+
+    def access(self, lst: AST, i: AST) -> typing.Optional[AST]:
+        """The cheapest access to index i of the list or None if the access can not be improved"""
+        if not self.unchecked:
+            # there is no checked access that skips through the list, looping is more expensive than unrolling
+            if isinstance(i, Integer) and i.x >= 0:
+                return ConstantIndexAccessList(lst, i.x)
+            return None
+        if isinstance(i, Integer) and 0 <= i.x <= MAX_UNROLLED_INDEX:
+            return ConstantIndexAccessListFast(lst, i.x)
+        if isinstance(i, Integer):
+            indices = range(max(i.x, 0), max(i.x, 0) + 1)
+        else:
+            length = static_length(lst)
+            indices = range(length if length is not None else ASSUMED_LIST_LENGTH)
+        step_size = _best_step_size(indices)
+        if step_size is None:
+            return None
+        return IndexAccessListFast(step_size)(lst, i)
@@ -0,0 +1,93 @@
+import typing
+
+from uplc import ast as uplc_ast
+
+from ..analysis.effects import builtin_arity, builtin_head
+from ..pluthon_ast import AST, Apply
+from ..pluthon_sugar import SingleDataList, SingleDataPairList
+from ..util import NodeTransformer
+from .constant_folding import LITERALS, literal, serializable
+
+# builtins that build lists, pairs and data from their arguments
+CONSTRUCTOR_BUILTINS = frozenset(
+    uplc_ast.BuiltInFun[name]
+    for name in [
+        "MkCons",
+        "MkNilData",
+        "MkNilPairData",
+        "MkPairData",
+        "IData",
+        "BData",
+        "ConstrData",
+        "ListData",
+        "MapData",
+    ]
+)
+
+# constructor indices that can be serialized
+MAX_CONSTRUCTOR_INDEX = 2**64
+
+
+def _constant(node: AST) -> typing.Optional[uplc_ast.Constant]:
+    if isinstance(node, LITERALS):
+        return node.compile()
+    if isinstance(node, Apply):
+        # empty lists are kept as calls to MkNilData and MkNilPairData (see visit_Apply)
+        return _construct(node)
+    return None
+
+
+def _construct(node: Apply) -> typing.Optional[uplc_ast.Constant]:
+    """The constant that the application of a constructor builtin to constants evaluates to"""
+    head = builtin_head(node.f)
+    if head is None or head[0] not in CONSTRUCTOR_BUILTINS:
+        return None
+    builtin, forces = head
+    if forces != uplc_ast.BuiltInFunForceMap[builtin] or len(node.xs) != builtin_arity(
+        builtin
+    ):
+        return None
+    args = [_constant(x) for x in node.xs]
+    if any(a is None for a in args):
+        return None
+    if builtin == uplc_ast.BuiltInFun.ConstrData and not (
+        isinstance(args[0], uplc_ast.BuiltinInteger)
+        and 0 <= args[0].value < MAX_CONSTRUCTOR_INDEX
+    ):
+        return None
+    try:
+        res = uplc_ast.BuiltInFunEvalMap[builtin](*args)
+    except Exception:
+        # ill-typed applications fail at runtime
+        return None
+    if not serializable(res):
+        return None
+    return res
+
+
+class ConstantListMaterializer(NodeTransformer):
+    """
+    Replaces lists, pairs and data that are built from constants with MkCons, MkNilData, IData, ConstrData etc.
+    with a single constant, e.g. a chain of PrependList over EmptyDataList() with constant elements.
+    Unlike ConstantFolder this does not run the machine and is cheap enough to be enabled at O1.
+    """
+
+    def visit_Apply(self, node: Apply):
+        node = self.generic_visit(node)
+        res = _construct(node)
+        if res is None or (isinstance(res, uplc_ast.BuiltinList) and not res.values):
+            # the empty list constants of data are larger than the builtin call
+            return node
+        return literal(res)
+
+    def visit_SingleDataList(self, node: SingleDataList):
+        return self.visit_single_list(node)
+
+    def visit_SingleDataPairList(self, node: SingleDataPairList):
+        return self.visit_single_list(node)
+
+    def visit_single_list(self, node: typing.Union[SingleDataList, SingleDataPairList]):
+        node = self.generic_visit(node)
+        if _constant(node.x) is None:
+            return node
+        return self.visit(node.compose())
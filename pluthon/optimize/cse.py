@@ -0,0 +1,232 @@
+import typing
+
+from ..analysis.steps import steps
+from ..analysis.effects import Effect, builtin_head, effect
+from ..analysis.structure import structural_hash
+from ..analysis.variables import Occurrence, scoped_children
+from ..analysis.scopes import (
+    Binder,
+    ScopeCollector,
+    certainly_evaluated,
+    child_index,
+    context,
+    dominator_depth,
+)
+from ..pluthon_ast import AST, Lambda, Let, Pattern, Program, Var
+from ..pluthon_sugar import name_scheme_compatible_varname
+from ..util import NodeTransformer, NodeVisitor, invalidate_analyses
+from .bindings import VALUES, pattern_binders
+
+
+class NameCollector(NodeVisitor):
+    """Collects all variable names of a program and the nodes that occur in several places of the tree"""
+
+    def __init__(self):
+        self.names = set()
+        self.seen = set()
+        self.shared = set()
+
+    def visit(self, node):
+        if id(node) in self.seen:
+            self.shared.add(id(node))
+            return
+        self.seen.add(id(node))
+        super().visit(node)
+
+    def visit_Var(self, node: Var):
+        self.names.add(node.name)
+
+    def visit_Lambda(self, node: Lambda):
+        self.names.update(node.vars)
+        self.generic_visit(node)
+
+    def visit_Let(self, node: Let):
+        self.names.update(name for name, _ in node.bindings)
+        self.generic_visit(node)
+
+    def generic_visit(self, node):
+        if isinstance(node, Pattern):
+            self.names.update(pattern_binders(type(node)))
+        super().generic_visit(node)
+
+
+def fresh_names(names: typing.Set[str], prefix: str) -> typing.Iterator[str]:
+    """Variable names that start with the prefix and are not in names"""
+    i = 0
+    while True:
+        name = name_scheme_compatible_varname(f"{prefix}_{i}")
+        i += 1
+        if name not in names:
+            yield name
+
+
+def _is_candidate(node: AST) -> bool:
+    return (
+        not isinstance(node, VALUES + (Let, Program))
+        # bound builtins would hide from the other optimizations which builtin is applied
+        and builtin_head(node) is None
+        and steps(node) > 1
+        # terms that may fail are only bound where they are certainly evaluated (see _evaluated_before)
+        and not effect(node) & Effect.MAY_TRACE
+    )
+
+
+def _saves(term: AST, evaluations: int) -> bool:
+    # the binding costs an application, a lambda and one variable lookup per evaluated occurrence
+    return (evaluations - 1) * steps(term) > 2 + evaluations
+
+
+def _max_evaluations(paths: typing.List[typing.List[AST]], depth: int = 0) -> int:
+    """
+    The largest number of occurrences at the ends of the paths that are evaluated together,
+    occurrences in different conditional children (the branches of Ite) exclude each other
+    """
+    if any(len(p) == depth + 1 for p in paths):
+        return 1
+    node = paths[0][depth]
+    children: typing.Dict[int, typing.List[typing.List[AST]]] = {}
+    for p in paths:
+        children.setdefault(id(p[depth + 1]), []).append(p)
+    strict, conditional = 0, 0
+    for child, position, multiplicity, _ in scoped_children(node):
+        child_paths = children.get(id(child))
+        if not child_paths or multiplicity == 0:
+            continue
+        evaluations = _max_evaluations(child_paths, depth + 1)
+        if position == Occurrence.CONDITIONAL:
+            conditional = max(conditional, evaluations)
+        else:
+            strict += evaluations * multiplicity
+    return strict + conditional
+
+
+class _SubtermCollector(ScopeCollector):
+    """Collects the candidate subterms of a scope, grouped by equal terms"""
+
+    def __init__(self, root: AST, shared: typing.Set[int]):
+        super().__init__(root, shared)
+        # occurrences of equal terms that see the same bindings of their free variables
+        self.groups: typing.Dict[
+            typing.Tuple[int, typing.Tuple[typing.Tuple[str, Binder], ...]],
+            typing.List[typing.List[AST]],
+        ] = {}
+
+    def add(self, node: AST, env: typing.Dict[str, Binder]):
+        if not _is_candidate(node):
+            return
+        groups = self.groups.setdefault((structural_hash(node), context(node, env)), [])
+        for group in groups:
+            if group[0] == node:
+                group.append(node)
+                break
+        else:
+            groups.append([node])
+
+
+class CommonSubexpressionEliminator(NodeTransformer):
+    """
+    Binds terms that occur several times in a scope to a fresh variable at the lowest point
+    that dominates all occurrences, i.e. the closest node that contains all of them.
+    Pure terms are always bound, terms that may fail only if one of the occurrences is certainly evaluated
+    after the binding and no trace happens in between. Terms that may trace are never bound.
+    Only terms for which the binding saves machine steps are bound (see analysis/steps.py),
+    i.e. that are evaluated several times on one path through the branches.
+    Lambda bodies and delayed terms are scopes of their own, terms are not moved out of them.
+    """
+
+    # the prefix of the bound variables and the collector of the scopes
+    prefix = "cse"
+    collector = _SubtermCollector
+
+    def __init__(self):
+        self.fresh_names = fresh_names(set(), self.prefix)
+        # the rewrites of the tree, by id of the affected nodes
+        self.replace: typing.Dict[int, AST] = {}
+        self.wrap: typing.Dict[int, typing.List[typing.Tuple[str, AST]]] = {}
+        self.insert: typing.Dict[int, typing.List[typing.Tuple[int, str, AST]]] = {}
+
+    def visit_Program(self, node: Program):
+        program_collector = NameCollector()
+        program_collector.visit(node)
+        self.fresh_names = fresh_names(program_collector.names, self.prefix)
+        # the collectors keep the nodes alive whose ids are used until the tree is rewritten
+        collectors = []
+        scopes = [node.prog]
+        while scopes:
+            scope_collector = self.collector(scopes.pop(), program_collector.shared)
+            scope_collector.collect()
+            self.eliminate(scope_collector)
+            scopes.extend(scope_collector.scopes)
+            collectors.append(scope_collector)
+        if not self.replace:
+            return node
+        return self.generic_visit(node)
+
+    def eliminate(self, scope_collector: _SubtermCollector):
+        groups = [
+            group
+            for groups in scope_collector.groups.values()
+            for group in groups
+            if len(group) > 1
+        ]
+        # larger terms first, the occurrences of terms within them are removed with them
+        groups.sort(key=lambda g: steps(g[0]), reverse=True)
+        taken = set()
+        for group in groups:
+            paths = [scope_collector.path(o) for o in group]
+            paths = [p for p in paths if not any(id(n) in taken for n in p)]
+            if len(paths) < 2 or not _saves(paths[0][-1], _max_evaluations(paths)):
+                continue
+            term = paths[0][-1]
+            depth = dominator_depth(paths)
+            dominator = paths[0][depth]
+            # the binding is evaluated before the first child of the dominator that contains an occurrence
+            index = min(child_index(dominator, p[depth + 1]) for p in paths)
+            if not isinstance(dominator, Let):
+                index = 0
+            if effect(term) != Effect.PURE and not any(
+                certainly_evaluated(p, depth, index) for p in paths
+            ):
+                # the binding would fail in cases where the term is not evaluated
+                continue
+            name = next(self.fresh_names)
+            for p in paths:
+                taken.add(id(p[-1]))
+                self.replace[id(p[-1])] = Var(name)
+            self.bind(dominator, index, [(name, term)])
+
+    def bind(
+        self, dominator: AST, index: int, bindings: typing.List[typing.Tuple[str, AST]]
+    ):
+        """Binds the terms before the child of the dominator at index"""
+        if isinstance(dominator, Let):
+            # the binding sees the same variables as the occurrences in the following bindings
+            self.insert.setdefault(id(dominator), []).extend(
+                (index, name, term) for name, term in bindings
+            )
+        else:
+            self.wrap.setdefault(id(dominator), []).extend(bindings)
+
+    def visit(self, node):
+        replacement = self.replace.get(id(node))
+        if replacement is not None:
+            return replacement
+        return super().visit(node)
+
+    def generic_visit(self, node):
+        node = super().generic_visit(node)
+        insertions = self.insert.pop(id(node), None)
+        if insertions:
+            # later positions first so that the indices stay valid,
+            # bindings at the same position keep their order
+            for _, (index, name, term) in sorted(
+                enumerate(insertions), key=lambda i: (i[1][0], i[0]), reverse=True
+            ):
+                node.bindings.insert(index, (name, self.generic_visit(term)))
+            invalidate_analyses(node)
+        bindings = self.wrap.pop(id(node), None)
+        if bindings:
+            node = Let(
+                [(name, self.generic_visit(term)) for name, term in bindings], node
+            )
+        return node
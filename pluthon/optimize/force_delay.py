@@ -0,0 +1,59 @@
+from uplc import ast as uplc_ast
+
+from ..analysis.effects import builtin_arity, builtin_head
+from ..analysis.variables import free_variables
+from ..pluthon_ast import Apply, Delay, Force, Lambda, Var
+from ..util import NodeTransformer
+
+
+class ForceDelayRemover(NodeTransformer):
+    """
+    Replaces Force(Delay(x)) with x
+    """
+
+    def visit_Force(self, node: Force):
+        node = self.generic_visit(node)
+        if isinstance(node.x, Delay):
+            return node.x.x
+        return node
+
+
+def _is_function_value(node, arguments: int) -> bool:
+    """
+    Whether evaluating the term can not fail and the function only starts evaluating its body
+    when it is applied to all arguments, so that applying it to fewer arguments can not fail either
+    """
+    if isinstance(node, Var):
+        # the variable may be bound to any function, it only waits for one argument
+        return arguments == 1
+    if isinstance(node, Lambda):
+        return len(node.vars) >= arguments
+    head = builtin_head(node)
+    return (
+        head is not None
+        and head[1] == uplc_ast.BuiltInFunForceMap[head[0]]
+        and builtin_arity(head[0]) >= arguments
+    )
+
+
+class EtaReducer(NodeTransformer):
+    """
+    Replaces lambdas that only pass their arguments on to a function, i.e. (\\x y -> f x y), with the function f
+    """
+
+    def visit_Lambda(self, node: Lambda):
+        node = self.generic_visit(node)
+        term = node.term
+        if (
+            isinstance(term, Apply)
+            and len(term.xs) == len(node.vars)
+            and all(
+                isinstance(x, Var) and x.name == v for x, v in zip(term.xs, node.vars)
+            )
+            # all variables are distinct, otherwise the lambda ignores some of its arguments
+            and len(set(node.vars)) == len(node.vars)
+            and _is_function_value(term.f, len(node.vars))
+            and not free_variables(term.f) & set(node.vars)
+        ):
+            return term.f
+        return node
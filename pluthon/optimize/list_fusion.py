@@ -0,0 +1,232 @@
+import dataclasses
+import typing
+
+from ..analysis.effects import Effect, effect, effects
+from ..pluthon_ast import AST, Apply, Bool, Integer, Ite, Lambda, Pattern, Program, Var
+from ..pluthon_sugar import (
+    AddInteger,
+    AllList,
+    AnyList,
+    FilterList,
+    FindList,
+    FoldList,
+    FoldListAbort,
+    FoldRange,
+    LengthList,
+    MapFilterList,
+    MapList,
+    MapRange,
+    RFoldList,
+    Range,
+)
+from ..util import NodeTransformer, iter_fields
+from .cse import NameCollector, fresh_names
+
+
+class _Producer(typing.NamedTuple):
+    """A list pattern that maps and/or filters the elements of another list"""
+
+    lst: AST
+    filter_op: typing.Optional[AST]
+    map_op: typing.Optional[AST]
+    empty_list: AST
+
+
+def _producer(node: AST) -> typing.Optional[_Producer]:
+    if isinstance(node, MapList):
+        return _Producer(node.lst, None, node.m, node.empty_list)
+    if isinstance(node, FilterList):
+        return _Producer(node.lst, node.k, None, node.empty_list)
+    if isinstance(node, MapFilterList):
+        return _Producer(node.lst, node.filter_op, node.map_op, node.empty_list)
+    if isinstance(node, MapRange):
+        # the map may fuse further, e.g. into a fold over the range
+        return _Producer(
+            Range(node.limit, node.start, node.step), None, node.m, node.empty_list
+        )
+    return None
+
+
+def _is_operator(node: AST, arity: int, total: bool = False) -> bool:
+    """
+    Whether the node is a lambda literal that can be applied per element inside another loop.
+    Applications may not trace, as fusion changes the order in which the operators are applied.
+    Operators that are not applied to every element any more need to be total.
+    """
+    if not isinstance(node, Lambda) or len(node.vars) != arity:
+        return False
+    latent = effects(node).latent
+    return latent == Effect.PURE if total else not latent & Effect.MAY_TRACE
+
+
+class ListFuser(NodeTransformer):
+    """
+    Fuses list patterns that consume the list built by MapList, FilterList or MapFilterList
+    into a single loop over the original list, e.g. FoldList(MapList(l, m), f, a) becomes
+    FoldList(l, \\a x -> f a (m x), a) and MapList(FilterList(l, k), m) becomes MapFilterList(l, k, m).
+    This saves building and traversing the intermediate list.
+    Folds, maps and the length of a Range count through the range instead (see FoldRange and MapRange).
+    Only lambda literals that do not trace are fused, as the order of their applications changes.
+    The operators of the inner pattern need to be total where the outer pattern stops early (e.g. AnyList)
+    or does not use the mapped element (LengthList).
+    """
+
+    def __init__(self):
+        self.fresh_names = fresh_names(set(), "fuse")
+        self.shared = set()
+
+    def visit_Program(self, node: Program):
+        name_collector = NameCollector()
+        name_collector.visit(node)
+        self.fresh_names = fresh_names(name_collector.names, "fuse")
+        # the fields of shared producers would end up in several places of the tree
+        self.shared = name_collector.shared
+        return self.generic_visit(node)
+
+    def generic_visit(self, node):
+        node = super().generic_visit(node)
+        while isinstance(node, Pattern):
+            fused = self.fuse(node)
+            if fused is None:
+                break
+            node = fused
+        return node
+
+    def fuse(self, node: Pattern) -> typing.Optional[AST]:
+        lst = getattr(node, "lst", None)
+        if (
+            lst is None
+            or id(lst) in self.shared
+            or any(
+                effect(value) & Effect.MAY_TRACE
+                for name, value in iter_fields(node)
+                if name != "lst" and isinstance(value, AST)
+            )
+        ):
+            return None
+        if isinstance(lst, Range):
+            return self.fuse_range(node, lst)
+        producer = _producer(lst)
+        if (
+            producer is None
+            # the list of the producer is not built any more
+            or effect(producer.empty_list) != Effect.PURE
+        ):
+            return None
+        if isinstance(node, (FoldList, RFoldList, FoldListAbort)):
+            # FoldListAbort stops once the predicate holds
+            abort = isinstance(node, FoldListAbort)
+            if (
+                not _is_operator(node.f, 2)
+                or (abort and not _is_operator(node.p, 1))
+                or not self.fusable(producer, total=abort)
+            ):
+                return None
+            acc = next(self.fresh_names)
+            f = self.element_function(
+                producer, [acc], lambda y: Apply(node.f, Var(acc), y), Var(acc)
+            )
+            return dataclasses.replace(node, lst=producer.lst, f=f)
+        if isinstance(node, LengthList):
+            if not self.fusable(producer, total=False, uses_element=False):
+                return None
+            if producer.filter_op is None:
+                return LengthList(producer.lst)
+            acc = next(self.fresh_names)
+            f = self.element_function(
+                producer,
+                [acc],
+                lambda _: AddInteger(Var(acc), Integer(1)),
+                Var(acc),
+            )
+            return FoldList(producer.lst, f, Integer(0))
+        if isinstance(node, (AnyList, AllList)):
+            if not _is_operator(node.key, 1) or not self.fusable(producer, total=True):
+                return None
+            key = self.element_function(
+                producer,
+                [],
+                lambda y: Apply(node.key, y),
+                Bool(isinstance(node, AllList)),
+            )
+            return dataclasses.replace(node, lst=producer.lst, key=key)
+        if isinstance(node, FindList):
+            # the found element would need to be mapped again
+            if (
+                producer.map_op is not None
+                or not _is_operator(node.key, 1)
+                or not self.fusable(producer, total=True)
+            ):
+                return None
+            key = self.element_function(
+                producer, [], lambda y: Apply(node.key, y), Bool(False)
+            )
+            return dataclasses.replace(node, lst=producer.lst, key=key)
+        if isinstance(node, MapList):
+            if not _is_operator(node.m, 1) or not self.fusable(producer, total=False):
+                return None
+            m = node.m
+            if producer.map_op is not None:
+                x = next(self.fresh_names)
+                m = Lambda([x], Apply(node.m, Apply(producer.map_op, Var(x))))
+            if producer.filter_op is None:
+                return MapList(producer.lst, m, node.empty_list)
+            return MapFilterList(producer.lst, producer.filter_op, m, node.empty_list)
+        if isinstance(node, (FilterList, MapFilterList)):
+            # the filtered elements would need to be mapped twice
+            op = node.k if isinstance(node, FilterList) else node.filter_op
+            if (
+                producer.map_op is not None
+                or not _is_operator(op, 1)
+                or (
+                    isinstance(node, MapFilterList) and not _is_operator(node.map_op, 1)
+                )
+                or not self.fusable(producer, total=False)
+            ):
+                return None
+            k = self.element_function(producer, [], lambda y: Apply(op, y), Bool(False))
+            if isinstance(node, FilterList):
+                return dataclasses.replace(node, lst=producer.lst, k=k)
+            return dataclasses.replace(node, lst=producer.lst, filter_op=k)
+        return None
+
+    def fuse_range(self, node: Pattern, lst: Range) -> typing.Optional[AST]:
+        if isinstance(node, FoldList) and _is_operator(node.f, 2):
+            return FoldRange(lst.limit, node.f, node.a, lst.start, lst.step)
+        if isinstance(node, LengthList):
+            acc, x = next(self.fresh_names), next(self.fresh_names)
+            f = Lambda([acc, x], AddInteger(Var(acc), Integer(1)))
+            return FoldRange(lst.limit, f, Integer(0), lst.start, lst.step)
+        if isinstance(node, MapList) and _is_operator(node.m, 1):
+            return MapRange(lst.limit, node.m, lst.start, lst.step, node.empty_list)
+        return None
+
+    def fusable(
+        self, producer: _Producer, total: bool, uses_element: bool = True
+    ) -> bool:
+        return (
+            producer.filter_op is None or _is_operator(producer.filter_op, 1, total)
+        ) and (
+            producer.map_op is None
+            or _is_operator(producer.map_op, 1, total or not uses_element)
+        )
+
+    def element_function(
+        self,
+        producer: _Producer,
+        params: typing.List[str],
+        present: typing.Callable[[AST], AST],
+        absent: AST,
+    ) -> Lambda:
+        """
+        A function of the params and an element of the original list that evaluates present on the
+        mapped element if the element passes the filter and absent otherwise
+        """
+        x = next(self.fresh_names)
+        y = Var(x)
+        if producer.map_op is not None:
+            y = Apply(producer.map_op, y)
+        term = present(y)
+        if producer.filter_op is not None:
+            term = Ite(Apply(producer.filter_op, Var(x)), term, absent)
+        return Lambda(params + [x], term)
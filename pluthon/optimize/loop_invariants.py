@@ -0,0 +1,327 @@
+import typing
+
+from ..analysis.cost import LOOP_BOUNDS, CostEstimator, max_length, static_length
+from ..analysis.effects import Effect, builtin_head, effect, effects, is_pure
+from ..analysis.steps import steps
+from ..analysis.variables import Occurrence, free_variables, pattern_summary
+from ..pluthon_ast import AST, Apply, Delay, Ite, Lambda, Let, Pattern, Program, Var
+from ..pluthon_sugar import (
+    AllList,
+    AnyList,
+    FilterList,
+    FindList,
+    FoldList,
+    FoldListAbort,
+    FoldRange,
+    MapFilterList,
+    MapList,
+    MapRange,
+    RecFun,
+    RFoldList,
+)
+from ..util import NodeTransformer, invalidate_analyses, is_analyzed, iter_fields
+from .bindings import VALUES, substitute
+from .cse import NameCollector, fresh_names
+
+# the fields of the list patterns that hold functions which are called once per element
+LOOP_FUNCTION_FIELDS = {
+    FoldList: ("f",),
+    FoldListAbort: ("f", "p"),
+    FoldRange: ("f",),
+    RFoldList: ("f",),
+    MapList: ("m",),
+    MapRange: ("m",),
+    FindList: ("key",),
+    AnyList: ("key",),
+    AllList: ("key",),
+    FilterList: ("k",),
+    MapFilterList: ("filter_op", "map_op"),
+}
+# the loop functions that are called (at least) for the first element of a non-empty list resp. range
+FIRST_CALL_FIELDS = {
+    FoldList: ("f",),
+    FoldListAbort: ("p",),
+    FoldRange: ("f",),
+    RFoldList: ("f",),
+    MapList: ("m",),
+    MapRange: ("m",),
+    FindList: ("key",),
+    AnyList: ("key",),
+    AllList: ("key",),
+    FilterList: ("k",),
+    MapFilterList: ("filter_op",),
+}
+
+
+# the binding of a hoisted term costs two steps and a variable lookup per iteration,
+# so the term has to take more steps than that to save steps in a loop that runs twice
+HOIST_OVERHEAD = 4
+# the hoisted term is evaluated once even if the loop does not run, loops that are known to run fewer times are left alone
+MIN_ITERATIONS = 2
+# set on loops that run fewer than MIN_ITERATIONS times, as their list may later be replaced by a call of a pattern
+SHORT_LOOP_ATTRIBUTE = "_pluthon_short_loop"
+
+
+def _loop_functions(node: AST) -> typing.Tuple[str, ...]:
+    """The fields of the node that hold loop functions"""
+    if isinstance(node, RecFun):
+        return ("x",)
+    return LOOP_FUNCTION_FIELDS.get(type(node), ())
+
+
+def _is_hoistable(node: AST, may_fail: bool) -> bool:
+    return (
+        not isinstance(node, VALUES)
+        and builtin_head(node) is None
+        and steps(node) > HOIST_OVERHEAD
+        # the hoisted term is evaluated even if the loop body is never evaluated,
+        # unless the loop certainly evaluates it, in which case it may fail (but not trace, as it moves before the loop)
+        and (is_pure(node) or (may_fail and not effect(node) & Effect.MAY_TRACE))
+    )
+
+
+class _InvariantExtractor(NodeTransformer):
+    """
+    Replaces the largest subterms that do not depend on variables bound within the loop function with fresh variables
+    """
+
+    def __init__(
+        self,
+        bound: typing.Iterable[str],
+        names: typing.Iterator[str],
+        recursion: typing.Optional[str] = None,
+        may_fail: bool = False,
+    ):
+        self.bound = set(bound)
+        self.names = names
+        # the variable through which a recursive function calls itself
+        self.recursion = recursion
+        # whether terms that may fail are hoisted from the positions that every call of the function evaluates
+        self.may_fail = may_fail
+        self.strict = True
+        self.hoisted: typing.List[typing.Tuple[str, AST]] = []
+        # the lambdas that are applied immediately, i.e. evaluated once with the term that applies them
+        self.applied: typing.Set[int] = set()
+
+    def exits(self, node: AST) -> bool:
+        """Whether the branch ends the recursion, i.e. is evaluated at most once per loop"""
+        return self.recursion is not None and self.recursion not in free_variables(node)
+
+    def visit(self, node):
+        if not free_variables(node) & self.bound and _is_hoistable(
+            node, self.may_fail and self.strict
+        ):
+            name = next(self.names)
+            self.hoisted.append((name, node))
+            return Var(name)
+        return super().visit(node)
+
+    def visit_Apply(self, node: Apply):
+        if isinstance(node.f, Lambda):
+            self.applied.add(id(node.f))
+            # the body of a partially applied lambda is only evaluated once it receives the remaining arguments
+            return self.conditionally(
+                self.generic_visit, node, len(node.xs) < len(node.f.vars)
+            )
+        return self.generic_visit(node)
+
+    def visit_Lambda(self, node: Lambda):
+        if id(node) not in self.applied:
+            # the function may be called any number of times per iteration, e.g. by a loop that is not a pattern
+            return node
+        return self.visit_binder(node, node.vars)
+
+    def visit_Ite(self, node: Ite):
+        i, t, e = node.i, node.t, node.e
+        node.i = self.visit(i)
+        if not self.exits(t):
+            node.t = self.conditionally(self.visit, t)
+        if not self.exits(e):
+            node.e = self.conditionally(self.visit, e)
+        if any(
+            new is not old or not is_analyzed(new)
+            for new, old in zip((node.i, node.t, node.e), (i, t, e))
+        ):
+            invalidate_analyses(node)
+        return node
+
+    def visit_Delay(self, node: Delay):
+        # the delayed branches of the choice builtins
+        if self.exits(node):
+            return node
+        return self.conditionally(self.generic_visit, node)
+
+    def conditionally(
+        self,
+        visit: typing.Callable[[AST], AST],
+        node: AST,
+        conditional: bool = True,
+    ) -> AST:
+        """Visits the node with visit, if conditional as a term that is not evaluated by every call of the function"""
+        strict = self.strict
+        self.strict = strict and not conditional
+        node = visit(node)
+        self.strict = strict
+        return node
+
+    def visit_Let(self, node: Let):
+        # later bindings may refer to earlier ones, all names are considered bound for simplicity
+        node = self.visit_binder(node, [name for name, _ in node.bindings])
+        # bindings of hoisted terms (e.g. of the loops within this loop) would only rename the hoisted variable
+        hoisted = {name for name, _ in self.hoisted}
+        for i in reversed(range(len(node.bindings))):
+            name, value = node.bindings[i]
+            if not (isinstance(value, Var) and value.name in hoisted):
+                continue
+            scope = substitute(Let(node.bindings[i + 1 :], node.term), name, value)
+            if scope is None:
+                continue
+            node.bindings[i + 1 :] = scope.bindings
+            node.term = scope.term
+            del node.bindings[i]
+            invalidate_analyses(node)
+        if not node.bindings:
+            return node.term
+        return node
+
+    def generic_visit(self, node):
+        if not isinstance(node, Pattern):
+            return super().generic_visit(node)
+        # the invariants of nested loops were hoisted out of them if the nested loop repeats,
+        # the rest of their functions is evaluated at most as often as in the nested loop
+        loop_functions = _loop_functions(node)
+        summary = pattern_summary(type(node))
+        modified = False
+        for field, value in iter_fields(node):
+            if field in loop_functions or not isinstance(value, AST):
+                continue
+            uses, occurrence = summary[field]
+            new = self.conditionally(
+                self.visit, value, uses == 0 or occurrence != Occurrence.STRICT
+            )
+            if new is not value or not is_analyzed(new):
+                setattr(node, field, new)
+                modified = True
+        if modified:
+            invalidate_analyses(node)
+        return node
+
+    def visit_binder(self, node: AST, names: typing.Iterable[str]):
+        bound = self.bound
+        self.bound = bound | set(names)
+        node = self.generic_visit(node)
+        self.bound = bound
+        return node
+
+
+class LoopInvariantHoister(NodeTransformer):
+    """
+    Moves pure subterms of loop bodies that do not depend on the loop variables out of the loop,
+    so that they are evaluated once instead of in every iteration.
+    Loop bodies are the functions passed to RecFun and the functions that the list patterns call per element.
+    The hoisted terms are bound in a let around the loop.
+    Branches of recursive functions that do not recurse are evaluated once per loop and left alone.
+    Only terms that take more than HOIST_OVERHEAD steps are hoisted, and only out of loops that may run
+    at least MIN_ITERATIONS times (see LOOP_BOUNDS, the functions of RecFun unless they are applied to a shorter list).
+    Terms that may fail, e.g. the Fields of a datum, are also hoisted if every call of the function evaluates them
+    and the list of the pattern is not empty, so that they are evaluated by the loop anyway (see FIRST_CALL_FIELDS).
+    """
+
+    def __init__(self):
+        self.fresh_names = fresh_names(set(), "licm")
+        # only used for the loop bounds of the patterns
+        self.estimator = CostEstimator()
+
+    def visit_Program(self, node: Program):
+        name_collector = NameCollector()
+        name_collector.visit(node)
+        self.fresh_names = fresh_names(name_collector.names, "licm")
+        return self.generic_visit(node)
+
+    def visit_Apply(self, node: Apply):
+        # the loops of the list patterns take the list as their first argument
+        if isinstance(node.f, RecFun) and node.xs and not self.repeats_over(node.xs[0]):
+            setattr(node.f, SHORT_LOOP_ATTRIBUTE, True)
+        return self.generic_visit(node)
+
+    def visit_RecFun(self, node: RecFun):
+        node = self.generic_visit(node)
+        if getattr(node, SHORT_LOOP_ATTRIBUTE, False):
+            return node
+        return self.hoist(node, ("x",), recursive=True)
+
+    def generic_visit(self, node):
+        node = super().generic_visit(node)
+        if (
+            isinstance(node, Pattern)
+            and type(node) in LOOP_FUNCTION_FIELDS
+            and self.repeats(node)
+        ):
+            return self.hoist(node, LOOP_FUNCTION_FIELDS[type(node)], self.called(node))
+        return node
+
+    def repeats(self, node: Pattern) -> bool:
+        """Whether the loop of the pattern may call its functions at least MIN_ITERATIONS times"""
+        if getattr(node, SHORT_LOOP_ATTRIBUTE, False):
+            return False
+        bound = LOOP_BOUNDS[type(node)](self.estimator, node)[0]
+        if isinstance(bound, int) and bound < MIN_ITERATIONS:
+            setattr(node, SHORT_LOOP_ATTRIBUTE, True)
+            return False
+        return True
+
+    def called(self, node: Pattern) -> typing.Tuple[str, ...]:
+        """
+        The loop functions that the pattern certainly calls because its list resp. range is not empty,
+        provided that no part of the pattern may trace (the hoisted terms would fail before the trace)
+        """
+        if isinstance(node, (FoldRange, MapRange)):
+            iterations = LOOP_BOUNDS[type(node)](self.estimator, node)[0]
+        else:
+            iterations = static_length(node.lst)
+        if not isinstance(iterations, int) or iterations < 1:
+            return ()
+        for field, value in iter_fields(node):
+            if not isinstance(value, AST):
+                continue
+            value_effects = effects(value)
+            if field in LOOP_FUNCTION_FIELDS[type(node)]:
+                value_effect = value_effects.effect | value_effects.latent
+            else:
+                value_effect = value_effects.effect
+            if value_effect & Effect.MAY_TRACE:
+                return ()
+        return FIRST_CALL_FIELDS[type(node)]
+
+    def repeats_over(self, lst: AST) -> bool:
+        """Whether the list may have at least MIN_ITERATIONS elements"""
+        length = max_length(lst)
+        return length is None or length >= MIN_ITERATIONS
+
+    def hoist(
+        self,
+        node: Pattern,
+        fields: typing.Iterable[str],
+        called: typing.Iterable[str] = (),
+        recursive: bool = False,
+    ) -> AST:
+        hoisted = []
+        for field in fields:
+            f = getattr(node, field)
+            if not isinstance(f, Lambda):
+                continue
+            extractor = _InvariantExtractor(
+                f.vars,
+                self.fresh_names,
+                f.vars[0] if recursive and f.vars else None,
+                may_fail=field in called,
+            )
+            term = extractor.visit(f.term)
+            if extractor.hoisted:
+                f.term = term
+                invalidate_analyses(f)
+                invalidate_analyses(node)
+                hoisted.extend(extractor.hoisted)
+        if not hoisted:
+            return node
+        return Let(hoisted, node)
@@ -0,0 +1,187 @@
+import dataclasses
+import typing
+from collections import defaultdict
+from functools import lru_cache
+
+from uplc import flatten
+
+from ..analysis.cost import LOOP_BOUNDS, CostEstimator
+from ..analysis.variables import free_variables
+from ..pluthon_ast import AST, Apply, Lambda, Pattern, Program, Var
+from ..pluthon_sugar import PLambda, PVar
+from ..util import COMPOSED_FROM_ATTRIBUTE, NodeTransformer, NodeVisitor
+from .bindings import BindingSimplifier, substitute
+from .constant_index_access_list import ASSUMED_LIST_LENGTH
+from .loop_invariants import LOOP_FUNCTION_FIELDS
+from .patterns import (
+    apply_abstract_function,
+    make_abstract_function,
+    make_abstract_function_name,
+)
+
+# the machine steps that are worth as much as a byte of the script,
+# i.e. the fee per byte over the fee of the cpu and memory of a step
+STEPS_PER_BYTE = 6
+
+
+def _operator_literals(node: Pattern) -> typing.List[Lambda]:
+    return [
+        getattr(node, field)
+        for field in LOOP_FUNCTION_FIELDS.get(type(node), ())
+        if isinstance(getattr(node, field), Lambda)
+    ]
+
+
+def specialize(node: Pattern) -> typing.Optional[AST]:
+    """
+    The composition of the list pattern with its lambda literal operators substituted into the loop
+    or None if the operators can not be substituted.
+    The list patterns bind their operators with an immediately applied lambda around the loop.
+    """
+    operators = _operator_literals(node)
+    res = node.compose()
+    if not operators or not isinstance(res, Apply) or not isinstance(res.f, Lambda):
+        return None
+    f = res.f
+    n = min(len(f.vars), len(res.xs))
+    term, params, xs = f.term, [], []
+    for var, x in zip(f.vars[:n], res.xs[:n]):
+        if not any(x is op for op in operators):
+            params.append(var)
+            xs.append(x)
+            continue
+        if free_variables(x) & set(f.vars):
+            # the operator would be captured by the other parameters of the loop
+            return None
+        term = substitute(term, var, x)
+        if term is None:
+            return None
+    if params:
+        term = Lambda(params, term)
+    xs.extend(res.xs[n:])
+    specialized = Apply(term, *xs) if xs else term
+    # the specialized loop is attributed to the pattern in source maps
+    setattr(specialized, COMPOSED_FROM_ATTRIBUTE, node)
+    return specialized
+
+
+def _steps_saved(node: Pattern) -> int:
+    """
+    The steps saved per element by the specialized loop:
+    the lookup of the operator and an application and a lambda per argument
+    """
+    return sum(1 + 2 * len(op.vars) for op in _operator_literals(node))
+
+
+def _size(term: AST, free: typing.List[str]) -> int:
+    """The bytes of the term in a script that binds its free variables"""
+    return len(flatten(Program((1, 0, 0), Lambda(free, term)).compile()))
+
+
+@lru_cache()
+def _added_size(
+    pattern_class: typing.Type[Pattern],
+    arities: typing.Tuple[typing.Optional[int], ...],
+) -> int:
+    """
+    The bytes that a specialized occurrence of the pattern adds to the script over a call of its shared loop,
+    measured with lambda literal operators that take arities arguments (None for operators that are not lambda literals)
+    """
+    operators = {
+        field: arity
+        for field, arity in zip(LOOP_FUNCTION_FIELDS[pattern_class], arities)
+        if arity is not None
+    }
+    names = [f.name for f in dataclasses.fields(pattern_class)]
+    node = pattern_class(
+        *(
+            PLambda([f"{name}_{i}" for i in range(operators[name])], PVar(name))
+            if name in operators
+            else PVar(name)
+            for name in names
+        )
+    )
+    free = [
+        PVar(name).name for name in (*names, make_abstract_function_name(pattern_class))
+    ]
+    specialized = BindingSimplifier().visit(specialize(node))
+    return _size(specialized, free) - _size(
+        apply_abstract_function(node, frozenset(), {}), free
+    )
+
+
+@lru_cache()
+def _shared_size(pattern_class: typing.Type[Pattern]) -> int:
+    """The bytes of the shared loop of the pattern"""
+    return _size(make_abstract_function(pattern_class), ["_"]) - _size(Var("_"), ["_"])
+
+
+class _OccurrenceCounter(NodeVisitor):
+    def __init__(self):
+        self.occurrences: typing.Dict[type, int] = defaultdict(int)
+        # the occurrences with lambda literal operators
+        self.specializable: typing.Dict[type, int] = defaultdict(int)
+
+    def visit(self, node):
+        if isinstance(node, Pattern):
+            self.occurrences[type(node)] += 1
+            if _operator_literals(node):
+                self.specializable[type(node)] += 1
+        return super().visit(node)
+
+
+class OperatorInliner(NodeTransformer):
+    """
+    Composes list patterns whose operators are lambda literals (e.g. MapList(l, \\x -> ...)) in place
+    instead of sharing the loop with the other occurrences of the pattern (see AllPatternReplacer).
+    The loop then applies the lambda literal instead of the operator variable,
+    which BindingSimplifier beta-reduces into the loop body, saving the application of the operator per element.
+    Every specialized occurrence adds a copy of the loop to the script, while the shared loop is only removed
+    if all occurrences of the pattern can be specialized. Patterns are specialized if the steps saved per execution
+    (assuming ASSUMED_LIST_LENGTH elements if the loop bound is not known, see LOOP_BOUNDS) are worth more than
+    the bytes added to the script (see STEPS_PER_BYTE).
+    """
+
+    def __init__(self):
+        self.occurrences = defaultdict(int)
+        self.specializable = defaultdict(int)
+        # only used for the loop bounds of the patterns
+        self.estimator = CostEstimator()
+
+    def visit_Program(self, node: Program):
+        counter = _OccurrenceCounter()
+        counter.visit(node)
+        self.occurrences = counter.occurrences
+        self.specializable = counter.specializable
+        return self.generic_visit(node)
+
+    def generic_visit(self, node):
+        node = super().generic_visit(node)
+        if isinstance(node, Pattern) and self.saves(node):
+            specialized = specialize(node)
+            if specialized is not None:
+                return specialized
+        return node
+
+    def saves(self, node: Pattern) -> bool:
+        """Whether the steps saved by specializing the pattern are worth more than the bytes it adds to the script"""
+        steps_saved = _steps_saved(node)
+        if not steps_saved:
+            return False
+        pattern_class = type(node)
+        iterations = LOOP_BOUNDS[pattern_class](self.estimator, node)[0]
+        if not isinstance(iterations, int):
+            iterations = ASSUMED_LIST_LENGTH
+        arities = tuple(
+            len(f.vars) if isinstance(f, Lambda) else None
+            for f in (
+                getattr(node, field) for field in LOOP_FUNCTION_FIELDS[pattern_class]
+            )
+        )
+        added_size = _added_size(pattern_class, arities)
+        if self.specializable[pattern_class] == self.occurrences[pattern_class]:
+            # the shared loop is removed, its size is attributed to the specialized occurrences equally
+            added_size -= (
+                _shared_size(pattern_class) / self.specializable[pattern_class]
+            )
+        return iterations * steps_saved > added_size * STEPS_PER_BYTE
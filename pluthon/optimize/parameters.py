@@ -0,0 +1,116 @@
+import typing
+
+from ..analysis.effects import Effect, effect
+from ..analysis.variables import binder_uses, free_variables, scoped_children
+from ..pluthon_ast import AST, Apply, Lambda, Let, Var
+from ..util import NodeTransformer, invalidate_analyses
+
+T = typing.TypeVar("T")
+
+
+def _calls(node: AST, name: str, arity: int) -> typing.Optional[typing.List[Apply]]:
+    """
+    The applications of the variable in the term or None if the variable is used otherwise
+    (passed as a value or applied to less than arity arguments)
+    """
+    if name not in free_variables(node):
+        return []
+    if isinstance(node, Var):
+        return None
+    calls = []
+    if isinstance(node, Apply) and node.f == Var(name):
+        if len(node.xs) < arity:
+            return None
+        calls.append(node)
+        children = node.xs
+    else:
+        children = [
+            child
+            for child, _, multiplicity, bound in scoped_children(node)
+            if multiplicity and name not in bound
+        ]
+    for child in children:
+        child_calls = _calls(child, name, arity)
+        if child_calls is None:
+            return None
+        calls.extend(child_calls)
+    return calls
+
+
+def removable_parameters(
+    parameters: typing.Sequence[T], unneeded: typing.Collection[T]
+) -> typing.List[T]:
+    """
+    The unneeded parameters that can be removed from a function, in order of the parameters.
+    A function keeps at least one parameter, as its body would be evaluated where the function is bound otherwise.
+    """
+    removable = [p for p in parameters if p in unneeded]
+    if parameters and len(removable) == len(parameters):
+        removable.pop(0)
+    return removable
+
+
+class _ArgumentDropper(NodeTransformer):
+    def __init__(self, calls: typing.Dict[int, typing.List[int]]):
+        self.calls = calls
+
+    def visit_Apply(self, node: Apply):
+        node = self.generic_visit(node)
+        dead = self.calls.get(id(node))
+        if dead is None:
+            return node
+        return Apply(node.f, *(x for i, x in enumerate(node.xs) if i not in dead))
+
+
+class DeadParameterEliminator(NodeTransformer):
+    """
+    Removes the parameters that a let bound function does not use, e.g. the abstract functions of patterns
+    (see AllPatternReplacer) whose parameters only fed branches that were folded away,
+    from the function and the arguments of all its calls.
+    This is only done if the function is only ever called with all its arguments, never passed as a value,
+    and the dropped arguments are pure at every call (see removable_parameters for the parameters that are kept).
+    """
+
+    def visit_Let(self, node: Let):
+        node = self.generic_visit(node)
+        for i, (name, value) in enumerate(node.bindings):
+            if isinstance(value, Lambda):
+                self.eliminate(node, i)
+        return node
+
+    def eliminate(self, node: Let, i: int):
+        name, f = node.bindings[i]
+        dead = [j for j, use in enumerate(binder_uses(f)) if use.uses == 0]
+        if not dead:
+            return
+        scope = [b for _, b in node.bindings[i + 1 :]] + [node.term]
+        for j, (other, _) in enumerate(node.bindings[i + 1 :]):
+            if other == name:
+                # shadowed by a later binding of the same name
+                scope = scope[: j + 1]
+                break
+        calls = []
+        for term in scope:
+            term_calls = _calls(term, name, len(f.vars))
+            if term_calls is None:
+                return
+            calls.extend(term_calls)
+        dead = removable_parameters(
+            range(len(f.vars)),
+            [
+                j
+                for j in dead
+                if all(effect(call.xs[j]) == Effect.PURE for call in calls)
+            ],
+        )
+        if not dead:
+            return
+        dropper = _ArgumentDropper({id(call): dead for call in calls})
+        node.bindings[i] = (
+            name,
+            Lambda([v for j, v in enumerate(f.vars) if j not in dead], f.term),
+        )
+        for j in range(i + 1, len(node.bindings)):
+            node.bindings[j] = (node.bindings[j][0], dropper.visit(node.bindings[j][1]))
+        node.term = dropper.visit(node.term)
+        invalidate_analyses(node)
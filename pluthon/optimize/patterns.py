@@ -1,15 +1,17 @@
 import dataclasses
 import uuid
 from collections import defaultdict
-from copy import deepcopy
 from functools import lru_cache
-from typing import Type
+from typing import Dict, Type
 from graphlib import TopologicalSorter
 from ordered_set import OrderedSet
 
 from .. import PVar, PLambda, PLet, Ite
-from ..pluthon_ast import Pattern, Program, Apply, Force, Delay, Var, Lambda
-from ..util import NodeTransformer, NodeVisitor, iter_fields
+from ..pluthon_ast import AST, Pattern, Program, Apply, Force, Delay, Var, Lambda
+from ..util import NodeTransformer, NodeVisitor, compose_in_place, iter_fields
+from ..analysis.variables import binder_uses, free_variables
+from .bindings import VALUES
+from .parameters import removable_parameters
 
 
 class EvaluatedVariableCollector(NodeVisitor):
@@ -128,28 +130,190 @@ class PatternDepBuilder(NodeVisitor):
         return res
 
 
+class DirectArgumentCollector(NodeVisitor):
+    """
+    Collects for every pattern class the conditionally evaluated parameters that are values at all occurrences.
+    These can be passed to the abstract function directly instead of delayed, since evaluating them early is free and safe.
+    """
+
+    def __init__(self):
+        self.direct = defaultdict(frozenset)
+
+    def visit(self, node):
+        if isinstance(node, Pattern):
+            node_type = type(node)
+            values = {
+                name for name, field in iter_fields(node) if isinstance(field, VALUES)
+            }
+            self.direct[node_type] = frozenset(
+                self.direct.get(node_type, conditionally_evaluated_params(node_type))
+                & values
+            )
+        return super().visit(node)
+
+
+def _contains_pattern(node: AST) -> bool:
+    if isinstance(node, Pattern):
+        return True
+    for _, value in iter_fields(node):
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for v in values:
+            if isinstance(v, tuple):
+                # the bindings of Let
+                v = v[1]
+            if isinstance(v, AST) and _contains_pattern(v):
+                return True
+    return False
+
+
+def _constant_argument(field) -> bool:
+    # patterns in the argument would need to be defined before the abstract function
+    return (
+        isinstance(field, AST)
+        and not _contains_pattern(field)
+        and not free_variables(field)
+    )
+
+
 @lru_cache()
-def make_abstract_function(pattern_class: Type[Pattern]):
+def parameter_uses(pattern_class: Type[Pattern]) -> Dict[str, int]:
+    """The number of uses of each parameter in the abstract function of the pattern"""
+    abstract_function = make_abstract_function(pattern_class)
+    if not isinstance(abstract_function, Lambda):
+        return {}
+    return {
+        f.name: u.uses
+        for f, u in zip(
+            dataclasses.fields(pattern_class), binder_uses(abstract_function)
+        )
+    }
+
+
+class ConstantArgumentCollector(NodeVisitor):
+    """
+    Collects for every pattern class the parameters that are the same closed term at all occurrences,
+    e.g. the default empty_list of MapList or default of FunctionalMapAccess.
+    These can be put into the abstract function instead of being passed at every call.
+    """
+
+    def __init__(self):
+        # the candidate parameters of every pattern class with their term and its dump
+        self.candidates = dict()
+        self.occurrences = defaultdict(int)
+
+    def visit(self, node):
+        if isinstance(node, Pattern):
+            node_type = type(node)
+            fields = dict(iter_fields(node))
+            candidates = self.candidates.get(node_type)
+            if candidates is None:
+                candidates = {
+                    name: (field, field.dumps())
+                    for name, field in fields.items()
+                    if _constant_argument(field)
+                }
+            else:
+                # the terms are compared by their dump, the fields of equal terms may differ e.g. in list or tuple
+                candidates = {
+                    name: (field, dumps)
+                    for name, (field, dumps) in candidates.items()
+                    if isinstance(fields[name], AST) and fields[name].dumps() == dumps
+                }
+            self.candidates[node_type] = candidates
+            self.occurrences[node_type] += 1
+        return super().visit(node)
+
+    def constant(self, pattern_class: Type[Pattern]) -> Dict[str, AST]:
+        """
+        The parameters that are put into the abstract function, once all occurrences of the pattern are collected.
+        Terms that are not values are only put into the abstract function if it uses the parameter at most once,
+        as every use would evaluate the term again.
+        """
+        uses = parameter_uses(pattern_class)
+        fields = dataclasses.fields(pattern_class)
+        constant = {
+            name: field
+            for name, (field, _) in self.candidates.get(pattern_class, {}).items()
+            if isinstance(field, VALUES) or uses[name] <= 1
+        }
+        removable = removable_parameters([f.name for f in fields], constant)
+        return {name: constant[name] for name in removable}
+
+
+def abstract_function_argument(field: AST, delayed: bool) -> AST:
+    if not delayed:
+        return field
+    if isinstance(field, Force) and isinstance(field.x, Var):
+        # the abstract function only ever forces the argument, so the variable can be passed as is
+        return field.x
+    return Delay(field)
+
+
+@lru_cache()
+def make_abstract_function(
+    pattern_class: Type[Pattern], direct: frozenset = frozenset()
+):
+    """
+    :param direct: conditionally evaluated parameters that are passed as values instead of delayed
+    """
+    return make_specialized_function(pattern_class, direct, {})
+
+
+def make_specialized_function(
+    pattern_class: Type[Pattern], direct: frozenset, constant: Dict[str, AST]
+):
+    """
+    The abstract function of the pattern without the constant parameters, which are replaced by their value
+    :param direct: conditionally evaluated parameters that are passed as values instead of delayed
+    :param constant: the parameters that are the same closed term at all occurrences
+    """
     fields = dataclasses.fields(pattern_class)
-    cep = conditionally_evaluated_params(pattern_class)
+    cep = conditionally_evaluated_params(pattern_class) - direct
     if fields:
         return PLambda(
-            [f.name for f in fields],
-            pattern_class(
-                *[
-                    Force(PVar(f.name)) if f.name in cep else PVar(f.name)
-                    for f in fields
-                ]
-            ).compose(),
+            [f.name for f in fields if f.name not in constant],
+            compose_in_place(
+                pattern_class(
+                    *[
+                        (
+                            constant[f.name]
+                            if f.name in constant
+                            else Force(PVar(f.name))
+                            if f.name in cep
+                            else PVar(f.name)
+                        )
+                        for f in fields
+                    ]
+                )
+            ),
         )
     else:
-        return pattern_class().compose()
+        return compose_in_place(pattern_class())
 
 
 def make_abstract_function_name(pattern_class: Type[Pattern]):
     return f"p_{pattern_class.__name__}"
 
 
+def apply_abstract_function(
+    node: Pattern, direct: frozenset, constant: Dict[str, AST]
+) -> AST:
+    """The call of the abstract function of the pattern that replaces the pattern"""
+    pattern_var = PVar(make_abstract_function_name(type(node)))
+    fields = list(iter_fields(node))
+    if not fields:
+        return pattern_var
+    cep = conditionally_evaluated_params(type(node)) - direct
+    return Apply(
+        pattern_var,
+        *(
+            abstract_function_argument(field, name in cep)
+            for name, field in fields
+            if name not in constant
+        ),
+    )
+
+
 class OncePatternReplacer(NodeTransformer):
     """
     Replaces the innermost pattern in terms of dependencies, i.e. the one that has to be defined
@@ -165,21 +329,11 @@ class OncePatternReplacer(NodeTransformer):
         ):
             # Patterns are special
             if self.unfold_pattern_occurrences > 1:
-                pattern_var = PVar(make_abstract_function_name(type(node)))
-                fields = list(iter_fields(node))
-                cep = conditionally_evaluated_params(type(node))
-                if fields:
-                    node = Apply(
-                        pattern_var,
-                        *(
-                            Delay(field) if name in cep else field
-                            for name, field in iter_fields(node)
-                        ),
-                    )
-                else:
-                    node = pattern_var
+                node = apply_abstract_function(
+                    node, self.unfold_pattern_direct, self.unfold_pattern_constant
+                )
             else:
-                node = node.compose()
+                node = compose_in_place(node)
         method = "visit_" + node.__class__.__name__
         visitor = getattr(self, method, self.generic_visit)
         return visitor(node)
@@ -193,6 +347,16 @@ class OncePatternReplacer(NodeTransformer):
             self.unfold_pattern_occurrences = pattern_collector.pattern_occurrences[
                 self.unfold_pattern_class
             ]
+            direct_argument_collector = DirectArgumentCollector()
+            direct_argument_collector.visit(node.prog)
+            self.unfold_pattern_direct = direct_argument_collector.direct.get(
+                self.unfold_pattern_class, frozenset()
+            )
+            constant_argument_collector = ConstantArgumentCollector()
+            constant_argument_collector.visit(node.prog)
+            self.unfold_pattern_constant = constant_argument_collector.constant(
+                self.unfold_pattern_class
+            )
             if self.unfold_pattern_occurrences > 1:
                 # if the pattern occurs more than once, we need to define it as a function
                 # otherwise we can just inline it
@@ -201,8 +365,11 @@ class OncePatternReplacer(NodeTransformer):
                         (
                             make_abstract_function_name(self.unfold_pattern_class),
                             self.visit(
-                                deepcopy(
-                                    make_abstract_function(self.unfold_pattern_class)
+                                # the specialized function is composed anew, so it does not need to be copied
+                                make_specialized_function(
+                                    self.unfold_pattern_class,
+                                    self.unfold_pattern_direct,
+                                    self.unfold_pattern_constant,
                                 )
                             ),
                         ),
@@ -221,23 +388,18 @@ class OncePatternReplacer(NodeTransformer):
 
 
 class AllPatternReplacer(NodeTransformer):
+    def __init__(self):
+        # the parameters passed directly and the constant parameters of every pattern class (see visit_Program)
+        self.direct: Dict[Type[Pattern], frozenset] = defaultdict(frozenset)
+        self.constant: Dict[Type[Pattern], Dict[str, AST]] = defaultdict(dict)
+
     def visit(self, node):
         """Visit a node."""
         if isinstance(node, Pattern):
             # Patterns are special
-            pattern_var = PVar(make_abstract_function_name(type(node)))
-            fields = list(iter_fields(node))
-            cep = conditionally_evaluated_params(type(node))
-            if fields:
-                node = Apply(
-                    pattern_var,
-                    *(
-                        Delay(field) if name in cep else field
-                        for name, field in iter_fields(node)
-                    ),
-                )
-            else:
-                node = pattern_var
+            node = apply_abstract_function(
+                node, self.direct[type(node)], self.constant[type(node)]
+            )
         method = "visit_" + node.__class__.__name__
         visitor = getattr(self, method, self.generic_visit)
         return visitor(node)
@@ -247,11 +409,37 @@ class AllPatternReplacer(NodeTransformer):
         pattern_collector.visit(node)
         pattern_classes = list(pattern_collector.patterns_in_dep_order())
         if pattern_classes:
+            # the occurrences of a pattern are in the program and in the abstract functions of the patterns
+            # that use it, which come later in dependency order
+            direct_argument_collector = DirectArgumentCollector()
+            direct_argument_collector.visit(node.prog)
+            self.direct = direct_argument_collector.direct
+            constant_argument_collector = ConstantArgumentCollector()
+            constant_argument_collector.visit(node.prog)
+            self.constant = defaultdict(dict)
+            for pattern_class in reversed(pattern_classes):
+                # the occurrences in the program and in the abstract functions of the patterns that use it are collected
+                self.constant[pattern_class] = constant_argument_collector.constant(
+                    pattern_class
+                )
+                abstract_function = make_specialized_function(
+                    pattern_class,
+                    self.direct[pattern_class],
+                    self.constant[pattern_class],
+                )
+                direct_argument_collector.visit(abstract_function)
+                constant_argument_collector.visit(abstract_function)
             term = PLet(
                 [
                     (
                         make_abstract_function_name(pattern_class),
-                        self.visit(deepcopy(make_abstract_function(pattern_class))),
+                        self.visit(
+                            make_specialized_function(
+                                pattern_class,
+                                self.direct[pattern_class],
+                                self.constant[pattern_class],
+                            )
+                        ),
                     )
                     for pattern_class in pattern_classes
                 ],
@@ -1,4 +1,5 @@
-from pluthon.pluthon_ast import Apply, BuiltIn, Force, Text
+from pluthon.analysis.effects import is_pure
+from pluthon.pluthon_ast import Apply, BuiltIn, Force
 from pluthon.util import NodeTransformer
 from uplc import ast as uplc_ast
 
@@ -13,9 +14,9 @@ class RemoveTrace(NodeTransformer):
             isinstance(node.f, Force)
             and isinstance(node.f.x, BuiltIn)
             and node.f.x.builtin == uplc_ast.BuiltInFun.Trace
-            # only remove traces that trace a constant string
+            # only remove traces whose message can be evaluated without effects
             # otherwise there might be side effects we are removing
-            and isinstance(node.xs[0], Text)
+            and is_pure(node.xs[0])
         ):
             return self.generic_visit(node.xs[1])
         return self.generic_visit(node)
@@ -0,0 +1,149 @@
+import typing
+
+from uplc import ast as uplc_ast
+
+from ..analysis.effects import (
+    Effect,
+    builtin_arity,
+    builtin_effect,
+    builtin_head,
+    effect,
+)
+from ..analysis.scopes import (
+    Binder,
+    ScopeCollector,
+    certainly_evaluated,
+    child_index,
+    context,
+    dominator_depth,
+)
+from ..analysis.steps import steps
+from ..analysis.structure import structural_hash
+from ..pluthon_ast import AST, Apply, Let, Var
+from ..pluthon_sugar import (
+    ConstantIndexAccessList,
+    ConstantIndexAccessListFast,
+    ConstantTailList,
+    constant_index_access,
+    n_times_taillist,
+)
+from .cse import CommonSubexpressionEliminator
+
+
+def _may_trace(node: AST) -> bool:
+    """
+    Whether evaluating the term may trace, except for the IndexError of checked accesses that fails right after.
+    A failing tail of the chain traces the same IndexError, so it may be computed before the accesses.
+    """
+    if not effect(node) & Effect.MAY_TRACE:
+        return False
+    access = constant_index_access(node)
+    if access is not None and access[1]:
+        return _may_trace(node.lst)
+    if isinstance(node, Let):
+        return any(_may_trace(b) for _, b in node.bindings) or _may_trace(node.term)
+    if isinstance(node, Apply):
+        head = builtin_head(node.f)
+        if (
+            head is not None
+            and not builtin_effect(head[0]) & Effect.MAY_TRACE
+            and head[1] == uplc_ast.BuiltInFunForceMap[head[0]]
+            and len(node.xs) == builtin_arity(head[0])
+        ):
+            return any(_may_trace(x) for x in node.xs)
+    return True
+
+
+class _AccessCollector(ScopeCollector):
+    """Collects the constant index accesses of a scope, grouped by the list that they access"""
+
+    def __init__(self, root: AST, shared: typing.Set[int]):
+        super().__init__(root, shared)
+        self.accesses: typing.Dict[tuple, typing.List[typing.List[AST]]] = {}
+
+    def add(self, node: AST, env: typing.Dict[str, Binder]):
+        access = constant_index_access(node)
+        if access is None:
+            return
+        _, checked = access
+        groups = self.accesses.setdefault(
+            (structural_hash(node.lst), context(node.lst, env), checked), []
+        )
+        for group in groups:
+            if group[0].lst == node.lst:
+                group.append(node)
+                break
+        else:
+            groups.append([node])
+
+
+class TailChainSharer(CommonSubexpressionEliminator):
+    """
+    Shares the tails of a list between constant index accesses to the same list in a scope,
+    e.g. ConstantNthField(d, 0) ... ConstantNthField(d, k) evaluate Fields(d) once and step through it once.
+    The list and the tails at the accessed positions are bound at the lowest point that dominates all accesses.
+    As computing the tails may fail, tails are only bound up to the largest index of an access
+    that is certainly evaluated after the binding (see CommonSubexpressionEliminator),
+    accesses to larger indices continue from the last bound tail.
+    """
+
+    prefix = "tail"
+    collector = _AccessCollector
+
+    def eliminate(self, scope_collector: _AccessCollector):
+        for groups in scope_collector.accesses.values():
+            for group in groups:
+                paths = [scope_collector.path(o) for o in group]
+                paths = [
+                    p
+                    for p in paths
+                    # accesses within the list of other accesses are left alone
+                    if not any(constant_index_access(n) is not None for n in p[:-1])
+                ]
+                if len(paths) < 2:
+                    continue
+                self.share(paths)
+
+    def share(self, paths: typing.List[typing.List[AST]]):
+        accesses = [p[-1] for p in paths]
+        lst = accesses[0].lst
+        _, checked = constant_index_access(accesses[0])
+        if _may_trace(lst):
+            return
+        depth = dominator_depth(paths)
+        dominator = paths[0][depth]
+        index = min(child_index(dominator, p[depth + 1]) for p in paths)
+        if not isinstance(dominator, Let):
+            index = 0
+        certain = [
+            constant_index_access(p[-1])[0]
+            for p in paths
+            if certainly_evaluated(p, depth, index, _may_trace)
+        ]
+        if not certain:
+            return
+        indices = [i for i, _ in map(constant_index_access, accesses)]
+        positions = sorted({0} | {i for i in indices if i <= max(certain)})
+        # the last tail is only bound if several accesses continue from it
+        while len(positions) > 1 and sum(i >= positions[-1] for i in indices) < 2:
+            positions.pop()
+        names = [next(self.fresh_names) for _ in positions]
+        bindings = [(names[0], lst)]
+        for j in range(1, len(positions)):
+            tail = ConstantTailList if checked else n_times_taillist
+            bindings.append(
+                (names[j], tail(Var(names[j - 1]), positions[j] - positions[j - 1]))
+            )
+        access = ConstantIndexAccessList if checked else ConstantIndexAccessListFast
+        replacements = {}
+        for node, i in zip(accesses, indices):
+            j = max(j for j, position in enumerate(positions) if position <= i)
+            replacements[id(node)] = access(Var(names[j]), i - positions[j])
+        before = sum(steps(a) for a in accesses)
+        after = sum(steps(r) for r in replacements.values()) + sum(
+            2 + steps(b) for _, b in bindings
+        )
+        if after >= before:
+            return
+        self.replace.update(replacements)
+        self.bind(dominator, index, bindings)
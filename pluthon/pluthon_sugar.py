@@ -619,6 +619,31 @@ def ConstantIndexAccessListFast(lst: AST, i: int):
     return _NthConstantIndexAccessListFast(i)(lst)
 
 
+def constant_index_access(node: AST) -> typing.Optional[typing.Tuple[int, bool]]:
+    """The index and whether the access is checked if the node is a ConstantIndexAccessList(Fast)"""
+    for checked, patterns in (
+        (True, _CONSTANT_INDEX_ACCESS_PATTERNS),
+        (False, _CONSTANT_INDEX_ACCESS_PATTERNS_FAST),
+    ):
+        for i, pattern in patterns.items():
+            if type(node) is pattern:
+                return i, checked
+    return None
+
+
+def ConstantTailList(lst: AST, i: int):
+    """Drops the first i elements of the list, fails like ConstantIndexAccessList if the list is shorter"""
+    for _ in range(i):
+        lst = Apply(
+            PLambda(
+                ["xs"],
+                IteNullList(PVar("xs"), TraceError("IndexError"), TailList(PVar("xs"))),
+            ),
+            lst,
+        )
+    return lst
+
+
 @dataclass
 class IndexAccessList(Pattern):
     lst: AST
@@ -657,72 +682,85 @@ def n_times_taillist(a: AST, n: int):
     return res
 
 
+_INDEX_ACCESS_PATTERNS_FAST = {}
+
+
 def IndexAccessListFast(step_size: int = 5):
     """
     Construct a pattern for step-size skip access
+    The pattern is created once per step size, so that all accesses with the same step size share it.
+    Fails like HeadList and TailList (without the IndexError trace) if the list is too short.
     """
-
-    def compose(self):
-        return Apply(
-            PLet(
-                [
-                    (
-                        "step_access",
-                        RecFun(
-                            PLambda(
-                                ["f", "i", "xs"],
-                                Ite(
-                                    EqualsInteger(PVar("i"), Integer(0)),
-                                    HeadList(PVar("xs")),
-                                    Apply(
-                                        PVar("f"),
-                                        PVar("f"),
-                                        SubtractInteger(PVar("i"), Integer(1)),
-                                        TailList(PVar("xs")),
+    if step_size < 1:
+        raise ValueError("Step size must be positive")
+    if _INDEX_ACCESS_PATTERNS_FAST.get(step_size) is None:
+
+        def compose(self):
+            return Apply(
+                PLet(
+                    [
+                        (
+                            "step_access",
+                            RecFun(
+                                PLambda(
+                                    ["f", "i", "xs"],
+                                    Ite(
+                                        EqualsInteger(PVar("i"), Integer(0)),
+                                        HeadList(PVar("xs")),
+                                        Apply(
+                                            PVar("f"),
+                                            PVar("f"),
+                                            SubtractInteger(PVar("i"), Integer(1)),
+                                            TailList(PVar("xs")),
+                                        ),
                                     ),
                                 ),
                             ),
                         ),
-                    ),
-                    (
-                        "skip_access",
-                        RecFun(
-                            PLambda(
-                                ["f", "i", "xs"],
-                                Ite(
-                                    LessThanInteger(PVar("i"), Integer(step_size)),
-                                    Apply(PVar("step_access"), PVar("i"), PVar("xs")),
-                                    Apply(
-                                        PVar("f"),
-                                        PVar("f"),
-                                        SubtractInteger(PVar("i"), Integer(step_size)),
-                                        n_times_taillist(PVar("xs"), step_size),
+                        (
+                            "skip_access",
+                            RecFun(
+                                PLambda(
+                                    ["f", "i", "xs"],
+                                    Ite(
+                                        LessThanInteger(PVar("i"), Integer(step_size)),
+                                        Apply(
+                                            PVar("step_access"), PVar("i"), PVar("xs")
+                                        ),
+                                        Apply(
+                                            PVar("f"),
+                                            PVar("f"),
+                                            SubtractInteger(
+                                                PVar("i"), Integer(step_size)
+                                            ),
+                                            n_times_taillist(PVar("xs"), step_size),
+                                        ),
                                     ),
-                                ),
-                            )
+                                )
+                            ),
                         ),
-                    ),
-                ],
-                Apply(PVar("skip_access"), self.i, self.lst),
+                    ],
+                    Apply(PVar("skip_access"), self.i, self.lst),
+                )
             )
-        )
 
-    def assign_vars(self, lst: AST, i: AST):
-        self.lst = lst
-        self.i = i
-
-    IndexAccessListFastType = type(
-        f"IndexAccessListFastType_{step_size}",
-        (Pattern,),
-        {
-            "__annotations__": {"lst": AST, "i": AST},
-            "__init__": assign_vars,
-            "compose": compose,
-        },
-    )
-    IndexAccessListFastType = dataclass(IndexAccessListFastType)
+        def assign_vars(self, lst: AST, i: AST):
+            self.lst = lst
+            self.i = i
 
-    return IndexAccessListFastType
+        IndexAccessListFastType = type(
+            f"IndexAccessListFastType_{step_size}",
+            (Pattern,),
+            {
+                "__annotations__": {"lst": AST, "i": AST},
+                "__init__": assign_vars,
+                "compose": compose,
+                "step_size": step_size,
+            },
+        )
+        IndexAccessListFastType = dataclass(IndexAccessListFastType)
+        _INDEX_ACCESS_PATTERNS_FAST[step_size] = IndexAccessListFastType
+    return _INDEX_ACCESS_PATTERNS_FAST[step_size]
 
 
 @dataclass
@@ -759,6 +797,89 @@ class Range(Pattern):
         )
 
 
+@dataclass
+class FoldRange(Pattern):
+    """
+    Left fold over the integers of Range(limit, start, step) with operator f: accumulator -> integer -> accumulator
+    and initial value a. Counts through the range without building the list
+    """
+
+    limit: AST
+    f: AST
+    a: AST
+    start: AST = field(default_factory=lambda: Integer(0))
+    step: AST = field(default_factory=lambda: Integer(1))
+
+    def compose(self):
+        return Apply(
+            PLambda(
+                ["op", "limit", "step"],
+                RecFun(
+                    PLambda(
+                        ["fold", "cur", "a"],
+                        Ite(
+                            LessThanInteger(PVar("cur"), PVar("limit")),
+                            Apply(
+                                PVar("fold"),
+                                PVar("fold"),
+                                AddInteger(PVar("cur"), PVar("step")),
+                                Apply(PVar("op"), PVar("a"), PVar("cur")),
+                            ),
+                            PVar("a"),
+                        ),
+                    ),
+                ),
+            ),
+            self.f,
+            self.limit,
+            self.step,
+            self.start,
+            self.a,
+        )
+
+
+@dataclass
+class MapRange(Pattern):
+    """
+    Apply a map function on each integer of Range(limit, start, step)
+    Counts through the range without building the list of integers
+    """
+
+    limit: AST
+    m: AST
+    start: AST = field(default_factory=lambda: Integer(0))
+    step: AST = field(default_factory=lambda: Integer(1))
+    empty_list: AST = field(default_factory=EmptyDataList)
+
+    def compose(self):
+        return Apply(
+            PLambda(
+                ["op", "limit", "step"],
+                RecFun(
+                    PLambda(
+                        ["map", "cur"],
+                        Ite(
+                            LessThanInteger(PVar("cur"), PVar("limit")),
+                            PrependList(
+                                Apply(PVar("op"), PVar("cur")),
+                                Apply(
+                                    PVar("map"),
+                                    PVar("map"),
+                                    AddInteger(PVar("cur"), PVar("step")),
+                                ),
+                            ),
+                            self.empty_list,
+                        ),
+                    ),
+                ),
+            ),
+            self.m,
+            self.limit,
+            self.step,
+            self.start,
+        )
+
+
 @dataclass
 class MapList(Pattern):
     """Apply a map function on each element in a list"""
@@ -1129,6 +1250,78 @@ def ConstantNthFieldFast(d: AST, i: int):
     return ConstantIndexAccessListFast(Fields(d), i)
 
 
+_DESTRUCTURE_FIELDS_PATTERNS = {}
+
+
+def _DestructureFields(
+    indices: typing.Tuple[int, ...], constructor: typing.Optional[int]
+):
+    if any(i < 0 for i in indices) or list(indices) != sorted(set(indices)):
+        raise ValueError("Field indices must be non-negative and strictly increasing")
+    key = (indices, constructor)
+    if _DESTRUCTURE_FIELDS_PATTERNS.get(key) is None:
+
+        def assign_vars(self, d: AST, f: AST):
+            self.d = d
+            self.f = f
+
+        def compose(self):
+            # every tail is used by the access to its head and the next tail, except the last one
+            bindings = []
+            args = []
+            xs, prev = SndPair(PVar("pair")), 0
+            for j, i in enumerate(indices):
+                xs = n_times_taillist(xs, i - prev)
+                prev = i
+                if j < len(indices) - 1:
+                    bindings.append((f"xs{j}", xs))
+                    xs = PVar(f"xs{j}")
+                args.append(HeadList(xs))
+            res = (
+                PLet(bindings, Apply(self.f, *args))
+                if bindings
+                else Apply(self.f, *args)
+            )
+            if constructor is not None:
+                res = Ite(
+                    EqualsInteger(FstPair(PVar("pair")), Integer(constructor)),
+                    res,
+                    TraceError("ConstructorError"),
+                )
+            return PLet([("pair", UnConstrData(self.d))], res)
+
+        name = "_".join(map(str, indices))
+        if constructor is not None:
+            name += f"_Constr{constructor}"
+        DestructureFieldsPattern = type(
+            f"DestructureFieldsPattern_{name}",
+            (Pattern,),
+            {
+                "__annotations__": {"d": AST, "f": AST},
+                "__init__": assign_vars,
+                "compose": compose,
+            },
+        )
+        DestructureFieldsPattern = dataclass(DestructureFieldsPattern)
+        _DESTRUCTURE_FIELDS_PATTERNS[key] = DestructureFieldsPattern
+    return _DESTRUCTURE_FIELDS_PATTERNS[key]
+
+
+def DestructureFields(
+    d: AST,
+    f: AST,
+    indices: typing.Iterable[int],
+    constructor: typing.Optional[int] = None,
+):
+    """
+    Applies f to the fields of data d at the given (strictly increasing) indices.
+    Unpacks d with a single UnConstrData and steps through the field list once, only the given fields are accessed.
+    If constructor is set, fails with a ConstructorError if d has a different constructor.
+    Fails if d has fewer fields.
+    """
+    return _DestructureFields(tuple(indices), constructor)(d, f)
+
+
 @dataclass
 class NoneData(Pattern):
     def compose(self):
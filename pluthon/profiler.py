@@ -0,0 +1,149 @@
+"""
+Attribution of the execution cost of a program to the pluthon constructs that generated it
+
+The program is lowered with source map tags (see source_map.py).
+The CEK machine then attributes the cost of every step and builtin call to the tag of the
+term that caused it, which results in a breakdown of the cost per pattern and per call site.
+"""
+
+import typing
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from uplc import ast as uplc_ast
+from uplc.cost_model import (
+    Budget,
+    BuiltinCostModel,
+    CekMachineCostModel,
+    CekOp,
+    default_budget,
+    default_builtin_cost_model_plutus_v3,
+    default_cek_machine_cost_model_plutus_v3,
+)
+from uplc.machine import AST_TO_CEK_OP_MAP, Machine, budget_cost_of_op_on_model
+from uplc.tools import apply as uplc_apply
+
+from .compiler_config import DEFAULT_CONFIG
+from .pluthon_ast import Program
+from .source_map import (
+    ROOT_ORIGIN,
+    Origin,
+    origin_of,
+    propagate_origins,
+    set_origin,
+)
+from .tools import compile_with_source_map
+
+
+class ProfilingMachine(Machine):
+    """A CEK machine that attributes the cost of every step to the origin of the term"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.costs: typing.Dict[Origin, Budget] = defaultdict(lambda: Budget(0, 0))
+        self._step_costs = {
+            op: budget_cost_of_op_on_model(self.cek_machine_cost_model, op, 0)
+            for op in CekOp
+        }
+        self._step_ops = {}
+        self._builtin_origin = None
+
+    def eval(self, program: uplc_ast.Program):
+        self.costs[ROOT_ORIGIN] += self._step_costs[CekOp.Startup]
+        return super().eval(program)
+
+    def step_and_maybe_spend(self, term: uplc_ast.AST):
+        op = self._step_ops.get(type(term))
+        if op is None:
+            op = [op for ast, op in AST_TO_CEK_OP_MAP.items() if isinstance(term, ast)][
+                0
+            ]
+            self._step_ops[type(term)] = op
+        self.costs[origin_of(term)] += self._step_costs[op]
+        super().step_and_maybe_spend(term)
+
+    def spend_budget(self, budget: Budget):
+        if self._builtin_origin is not None:
+            self.costs[self._builtin_origin] += budget
+        super().spend_budget(budget)
+
+    def apply_evaluate(self, context, function, argument):
+        if isinstance(function, uplc_ast.ForcedBuiltIn):
+            self._builtin_origin = origin_of(function)
+        try:
+            res = super().apply_evaluate(context, function, argument)
+        finally:
+            self._builtin_origin = None
+        return self._inherit_builtin_origin(res, function)
+
+    def force_evaluate(self, context, value):
+        return self._inherit_builtin_origin(
+            super().force_evaluate(context, value), value
+        )
+
+    def _inherit_builtin_origin(self, res, builtin):
+        # builtins that are forced or partially applied are new values
+        if isinstance(res, uplc_ast.Return) and isinstance(
+            res.value, uplc_ast.ForcedBuiltIn
+        ):
+            set_origin(res.value, origin_of(builtin))
+        return res
+
+
+@dataclass
+class CostProfile:
+    result: typing.Union[uplc_ast.AST, Exception]
+    logs: typing.List[str]
+    cost: Budget
+    costs: typing.Dict[Origin, Budget] = field(default_factory=dict)
+
+    def by_pattern(self) -> typing.Dict[str, Budget]:
+        """
+        Cost of the nodes generated by each pattern class (excluding the arguments of the patterns).
+        Costs of nodes written directly in the program are listed under "<program>".
+        """
+        res = defaultdict(lambda: Budget(0, 0))
+        for origin, cost in self.costs.items():
+            res[origin.generator or "<program>"] += cost
+        return dict(res)
+
+    def by_call_site(self) -> typing.Dict[typing.Tuple[str, str], Budget]:
+        """
+        Cost of each occurrence of a pattern, identified by (class name, path), including its arguments
+        """
+        res = defaultdict(lambda: Budget(0, 0))
+        for origin, cost in self.costs.items():
+            for frame in set(origin.patterns):
+                res[frame] += cost
+        return dict(res)
+
+    def flame_graph(self, mode: str = "cpu") -> str:
+        """The cost in the folded stack format that is read by flamegraph.pl and speedscope"""
+        stacks = defaultdict(int)
+        for origin, cost in self.costs.items():
+            stacks[";".join(origin.frames() + [origin.node])] += getattr(cost, mode)
+        return "".join(
+            f"{stack} {value}\n" for stack, value in sorted(stacks.items()) if value
+        )
+
+
+def profile(
+    x: Program,
+    *args: uplc_ast.AST,
+    config=DEFAULT_CONFIG,
+    budget: Budget = default_budget(),
+    cek_machine_cost_model: CekMachineCostModel = default_cek_machine_cost_model_plutus_v3(),
+    builtin_cost_model: BuiltinCostModel = default_builtin_cost_model_plutus_v3(),
+) -> CostProfile:
+    """
+    Compiles the program like compile, applies the arguments and evaluates it
+    while attributing the cost to the pluthon nodes and patterns the program was generated from.
+    If patterns are shared (compress_patterns), their cost is attributed to the pattern class
+    but not to the call sites.
+    """
+    compiled, _ = compile_with_source_map(x, config)
+    compiled = uplc_apply(compiled, *args)
+    propagate_origins(compiled)
+    machine = ProfilingMachine(budget, cek_machine_cost_model, builtin_cost_model)
+    res = machine.eval(compiled)
+    return CostProfile(res.result, res.logs, res.cost, dict(machine.costs))
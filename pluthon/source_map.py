@@ -0,0 +1,356 @@
+"""
+Source maps from lowered UPLC terms back to the pluthon nodes they were generated from
+
+Lowering with lower_with_origins tags every UPLC node with an Origin:
+its path in the pluthon program and the patterns it is part of.
+The tags survive the pluthon and UPLC optimizers (nodes created by the UPLC optimizer inherit the tag of their parent).
+A SourceMap stores the tags of a compiled program compactly in a side table indexed
+by the preorder position of the UPLC terms and their offset in the flat encoding.
+"""
+
+import bisect
+import copy
+import typing
+from array import array
+from ast import iter_fields as uplc_iter_fields
+from collections import defaultdict
+from dataclasses import dataclass
+
+from uplc import ast as uplc_ast
+from uplc.flat_encoder import FlatEncodingVisitor
+from uplc.transformer.debrujin_variables import DeBrujinVariableTransformer
+
+from .optimize.patterns import make_abstract_function_name
+from .pluthon_ast import AST, Let, Pattern
+from .pluthon_sugar import PVar
+from .util import COMPOSED_FROM_ATTRIBUTE, iter_fields
+
+ORIGIN_ATTRIBUTE = "_pluthon_origin"
+PATH_ATTRIBUTE = "_pluthon_path"
+# the path of the definitions of shared patterns (see compress_patterns)
+SHARED_PATH = "<shared>"
+# the variables that hold the definitions of shared patterns are named PVar(make_abstract_function_name(cls))
+_SHARED_PREFIX, _SHARED_SUFFIX = PVar(make_abstract_function_name(Pattern)).name.split(
+    Pattern.__name__
+)
+
+
+@dataclass(frozen=True)
+class Origin:
+    """Where a UPLC node comes from"""
+
+    # path of the pluthon node in the program, i.e. "prog.xs[0].lst"
+    # nodes that were generated by composing a pattern have the path of the pattern
+    path: str
+    # class of the pluthon node
+    node: str
+    # the patterns that enclose the node, outermost first, as (class name, path)
+    patterns: typing.Tuple[typing.Tuple[str, str], ...] = ()
+    # class of the pattern whose composition generated the node, None for nodes written in the program
+    generator: typing.Optional[str] = None
+
+    def frames(self) -> typing.List[str]:
+        return ["<program>"] + [f"{cls}@{path}" for cls, path in self.patterns]
+
+
+ROOT_ORIGIN = Origin("", "Program")
+
+
+def origin_of(node) -> Origin:
+    return getattr(node, ORIGIN_ATTRIBUTE, ROOT_ORIGIN)
+
+
+def set_origin(node, origin: Origin):
+    # constants are frozen dataclasses
+    object.__setattr__(node, ORIGIN_ATTRIBUTE, origin)
+
+
+def shared_pattern_class(name: str) -> typing.Optional[str]:
+    """The name of the pattern class whose shared definition is bound to the variable, if any"""
+    if name.startswith(_SHARED_PREFIX) and name.endswith(_SHARED_SUFFIX):
+        return name[len(_SHARED_PREFIX) : -len(_SHARED_SUFFIX)]
+    return None
+
+
+def _join_path(path: str, name: str) -> str:
+    return f"{path}.{name}" if path else name
+
+
+@dataclass
+class _Lowered(AST):
+    """A term that is already lowered to UPLC"""
+
+    term: uplc_ast.AST
+
+    def compile(self):
+        return self.term
+
+    def dumps(self) -> str:
+        return self.term.dumps()
+
+
+class OriginLowering:
+    """
+    Lowers pluthon to UPLC like AST.compile and tags every generated UPLC node with its Origin.
+    The definitions of shared patterns are recognized by their name and attributed to the pattern.
+    """
+
+    def lower(
+        self,
+        node: AST,
+        path: str = "",
+        patterns: typing.Tuple[typing.Tuple[str, str], ...] = (),
+        generator: typing.Optional[str] = None,
+    ) -> uplc_ast.AST:
+        if isinstance(node, _Lowered):
+            return node.term
+        if hasattr(node, PATH_ATTRIBUTE):
+            # a node of the original program, possibly moved into a composition by the optimizer
+            path = getattr(node, PATH_ATTRIBUTE)
+            generator = None
+        composed_from = getattr(node, COMPOSED_FROM_ATTRIBUTE, None)
+        if composed_from is not None:
+            # a pattern that was composed in place by the optimizer
+            path = getattr(composed_from, PATH_ATTRIBUTE, path)
+            generator = composed_from.__class__.__name__
+            if patterns[-1:] != ((generator, path),):
+                # not the definition of a shared pattern
+                patterns = patterns + ((generator, path),)
+        # nodes generated by patterns do not have a path of their own
+        child_path = (
+            (lambda name: path) if generator else (lambda name: _join_path(path, name))
+        )
+        if isinstance(node, Pattern):
+            patterns = patterns + ((node.__class__.__name__, path),)
+        lowered = copy.copy(node)
+        children = []
+
+        def lower_child(child: AST, name: str):
+            return lower_term(child, child_path(name), patterns, generator)
+
+        def lower_term(child: AST, *args):
+            term = self.lower(child, *args)
+            children.append(term)
+            return _Lowered(term)
+
+        if isinstance(node, Let):
+            bindings = []
+            for i, (name, binding) in enumerate(node.bindings):
+                shared = shared_pattern_class(name)
+                if shared is not None:
+                    b = lower_term(
+                        binding, SHARED_PATH, ((shared, SHARED_PATH),), shared
+                    )
+                else:
+                    b = lower_child(binding, f"bindings[{i}]")
+                bindings.append((name, b))
+            lowered.bindings = bindings
+        for name, value in iter_fields(node):
+            if isinstance(node, Let) and name == "bindings":
+                continue
+            if isinstance(value, (list, tuple)):
+                setattr(
+                    lowered,
+                    name,
+                    type(value)(
+                        (lower_child(v, f"{name}[{i}]") if isinstance(v, AST) else v)
+                        for i, v in enumerate(value)
+                    ),
+                )
+            elif isinstance(value, AST):
+                setattr(lowered, name, lower_child(value, name))
+        if isinstance(node, Pattern):
+            return self.lower(
+                lowered.compose(), path, patterns, node.__class__.__name__
+            )
+        res = lowered.compile()
+        origin = Origin(path, node.__class__.__name__, patterns, generator)
+        _tag(res, origin, {id(c) for c in children})
+        return res
+
+
+def _tag(term: uplc_ast.AST, origin: Origin, stop: typing.Set[int]):
+    """Tags all nodes of the term that are not part of the already tagged subterms"""
+    stack = [term]
+    while stack:
+        n = stack.pop()
+        if id(n) in stop or hasattr(n, ORIGIN_ATTRIBUTE):
+            continue
+        set_origin(n, origin)
+        if isinstance(n, uplc_ast.Constant):
+            continue
+        for _, v in uplc_iter_fields(n):
+            if isinstance(v, list):
+                stack.extend(c for c in v if isinstance(c, uplc_ast.AST))
+            elif isinstance(v, uplc_ast.AST):
+                stack.append(v)
+
+
+def propagate_origins(term: uplc_ast.AST, origin: Origin = ROOT_ORIGIN):
+    """Nodes created after lowering (i.e. by the UPLC optimizer) inherit the origin of their parent"""
+    stack = [(term, origin)]
+    while stack:
+        n, parent_origin = stack.pop()
+        if hasattr(n, ORIGIN_ATTRIBUTE):
+            parent_origin = origin_of(n)
+        else:
+            set_origin(n, parent_origin)
+        if isinstance(n, uplc_ast.Constant):
+            continue
+        for _, v in uplc_iter_fields(n):
+            if isinstance(v, list):
+                stack.extend(
+                    (c, parent_origin) for c in v if isinstance(c, uplc_ast.AST)
+                )
+            elif isinstance(v, uplc_ast.AST):
+                stack.append((v, parent_origin))
+
+
+def _children(node: AST) -> typing.Iterator[typing.Tuple[str, AST]]:
+    if isinstance(node, Let):
+        for i, (_, binding) in enumerate(node.bindings):
+            yield f"bindings[{i}]", binding
+    for name, value in iter_fields(node):
+        if isinstance(node, Let) and name == "bindings":
+            continue
+        if isinstance(value, (list, tuple)):
+            for i, v in enumerate(value):
+                if isinstance(v, AST):
+                    yield f"{name}[{i}]", v
+        elif isinstance(value, AST):
+            yield name, value
+
+
+def annotate_paths(x: AST) -> AST:
+    """
+    Records the path of every node in the program on the node itself.
+    Nodes that are moved by the optimizer (i.e. the arguments of shared patterns)
+    keep the path they have in the original program.
+    """
+    stack = [(x, "")]
+    while stack:
+        node, path = stack.pop()
+        setattr(node, PATH_ATTRIBUTE, path)
+        stack.extend((child, _join_path(path, name)) for name, child in _children(node))
+    return x
+
+
+def lower_with_origins(x: AST) -> uplc_ast.AST:
+    """Lowers the program to UPLC with every node tagged by its origin (see origin_of)"""
+    res = OriginLowering().lower(x)
+    propagate_origins(res)
+    return res
+
+
+def preorder(term: uplc_ast.AST) -> typing.Iterator[uplc_ast.AST]:
+    """Yields the terms of a UPLC program in the order in which they are flat encoded"""
+    if isinstance(term, uplc_ast.Program):
+        term = term.term
+    stack = [term]
+    while stack:
+        n = stack.pop()
+        yield n
+        if isinstance(n, uplc_ast.Constant):
+            continue
+        children = []
+        for _, v in uplc_iter_fields(n):
+            if isinstance(v, list):
+                children.extend(c for c in v if isinstance(c, uplc_ast.AST))
+            elif isinstance(v, uplc_ast.AST):
+                children.append(v)
+        stack.extend(reversed(children))
+
+
+class _OffsetRecordingFlatEncoder(FlatEncodingVisitor):
+    def __init__(self):
+        super().__init__()
+        self.offsets = array("Q")
+
+    def visit(self, node):
+        if not isinstance(node, uplc_ast.Program):
+            self.offsets.append(self.bit_writer.length)
+        return super().visit(node)
+
+
+@dataclass
+class SourceMap:
+    """
+    Maps the terms of a compiled UPLC program to their origin.
+    Terms are identified by their position in preorder (see preorder)
+    or by the bit offset of their flat encoding.
+    """
+
+    # the distinct origins of the program
+    origins: typing.List[Origin]
+    # index into origins for every term in preorder
+    term_origins: array
+    # offset in bits of every term in the flat encoding (in preorder), followed by the end of the last term
+    # offsets are relative to the start of the flat encoded program, which starts with the version
+    bit_offsets: array
+
+    @classmethod
+    def from_program(cls, program: uplc_ast.Program, flat: bool = True):
+        origins = []
+        origin_index = {}
+        term_origins = array("I")
+        for term in preorder(program):
+            origin = origin_of(term)
+            index = origin_index.get(origin)
+            if index is None:
+                index = origin_index[origin] = len(origins)
+                origins.append(origin)
+            term_origins.append(index)
+        bit_offsets = array("Q")
+        if flat:
+            encoder = _OffsetRecordingFlatEncoder()
+            encoder.visit(DeBrujinVariableTransformer().visit(program))
+            bit_offsets = encoder.offsets
+            bit_offsets.append(encoder.bit_writer.length)
+        return cls(origins, term_origins, bit_offsets)
+
+    def __len__(self):
+        return len(self.term_origins)
+
+    def origin(self, index: int) -> Origin:
+        """The origin of the term at the given position in preorder"""
+        return self.origins[self.term_origins[index]]
+
+    def index_at_bit(self, offset: int) -> int:
+        """The position in preorder of the innermost term whose flat encoding contains the bit offset"""
+        return bisect.bisect_right(self.bit_offsets, offset, hi=len(self)) - 1
+
+    def origin_at_bit(self, offset: int) -> Origin:
+        return self.origin(self.index_at_bit(offset))
+
+    def size_by_pattern(self) -> typing.Dict[str, int]:
+        """
+        Size of the flat encoding in bits per pattern class that generated the terms.
+        Terms written directly in the program are listed under "<program>".
+        """
+        res = defaultdict(int)
+        for i in range(len(self)):
+            res[self.origin(i).generator or "<program>"] += (
+                self.bit_offsets[i + 1] - self.bit_offsets[i]
+            )
+        return dict(res)
+
+    def to_dict(self) -> dict:
+        return {
+            "origins": [
+                [o.path, o.node, [list(p) for p in o.patterns], o.generator]
+                for o in self.origins
+            ],
+            "term_origins": self.term_origins.tolist(),
+            "bit_offsets": self.bit_offsets.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "SourceMap":
+        return cls(
+            [
+                Origin(path, node, tuple(tuple(p) for p in patterns), generator)
+                for path, node, patterns, generator in d["origins"]
+            ],
+            array("I", d["term_origins"]),
+            array("Q", d["bit_offsets"]),
+        )
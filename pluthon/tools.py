@@ -1,30 +1,69 @@
+import typing
+
 from uplc.ast import Program as UPLCProgram
 
 from .compiler_config import DEFAULT_CONFIG
+from .memory_profile import MemoryReport, MemoryTracker, untracked
+from .optimize.bindings import BindingSimplifier
+from .optimize.booleans import BooleanSimplifier
+from .optimize.constant_folding import ConstantFolder
 from .optimize.constant_index_access_list import IndexAccessOptimizer
+from .optimize.constant_lists import ConstantListMaterializer
+from .optimize.cse import CommonSubexpressionEliminator
+from .optimize.force_delay import EtaReducer, ForceDelayRemover
+from .optimize.list_fusion import ListFuser
+from .optimize.loop_invariants import LoopInvariantHoister
+from .optimize.operators import OperatorInliner
+from .optimize.parameters import DeadParameterEliminator
 from .optimize.patterns import OncePatternReplacer, AllPatternReplacer
 from .optimize.remove_trace import RemoveTrace
+from .optimize.tail_chains import TailChainSharer
 from .pluthon_ast import Program, AST
+from .source_map import (
+    SourceMap,
+    annotate_paths,
+    lower_with_origins,
+    propagate_origins,
+)
 from .util import NoOp
 from uplc.tools import compile as uplc_compile
 
 
-def compile(
+def _compile(
     x: Program,
-    config=DEFAULT_CONFIG,
+    config,
+    track: typing.Callable,
+    lower: typing.Callable = lambda x: x.compile(),
 ) -> UPLCProgram:
-    """
-    Returns compiled Pluto code in UPLC
-    :param x: the program to compile
-    """
     x_old_dumps = None
-    x_new_dumps = x.dumps()
+    x_new_dumps = track("dumps", lambda x: x.dumps(), x)
     # need to iterate so that pattern optimizations can be applied to patterns that are part of other patterns
     # we stop when a fixpoint is reached
     while x_new_dumps != x_old_dumps:
         x_old_dumps = x_new_dumps
         for step in [
-            IndexAccessOptimizer() if config.constant_index_access_list else NoOp(),
+            ConstantFolder() if config.fold_constants else NoOp(),
+            (
+                ConstantListMaterializer()
+                if config.materialize_constant_lists
+                else NoOp()
+            ),
+            BooleanSimplifier() if config.simplify_booleans else NoOp(),
+            ListFuser() if config.fuse_list_patterns else NoOp(),
+            (
+                IndexAccessOptimizer(unchecked=bool(config.unchecked_index_access))
+                if config.constant_index_access_list
+                else NoOp()
+            ),
+            TailChainSharer() if config.share_index_access_tails else NoOp(),
+            OperatorInliner() if config.inline_list_operators else NoOp(),
+            BindingSimplifier() if config.simplify_bindings else NoOp(),
+            (
+                CommonSubexpressionEliminator()
+                if config.eliminate_common_subexpressions
+                else NoOp()
+            ),
+            LoopInvariantHoister() if config.hoist_loop_invariants else NoOp(),
             (
                 (
                     OncePatternReplacer()
@@ -34,17 +73,66 @@ def compile(
                 if config.compress_patterns
                 else NoOp()
             ),
+            (DeadParameterEliminator() if config.remove_dead_parameters else NoOp()),
+            ForceDelayRemover() if config.remove_redundant_wrappers else NoOp(),
+            EtaReducer() if config.remove_redundant_wrappers else NoOp(),
             RemoveTrace() if config.remove_trace else NoOp(),
         ]:
-            x = step.visit(x)
-        x_new_dumps = x.dumps()
-    x = x.compile()
-    x = uplc_compile(
+            if isinstance(step, NoOp):
+                x = step.visit(x)
+            else:
+                x = track(step.__class__.__name__, step.visit, x)
+        x_new_dumps = track("dumps", lambda x: x.dumps(), x)
+    x = track("lowering", lower, x)
+    x = track(
+        "uplc_compile",
+        lambda x: uplc_compile(
+            x,
+            config=config,
+        ),
         x,
-        config=config,
     )
     return x
 
 
+def compile(
+    x: Program,
+    config=DEFAULT_CONFIG,
+) -> UPLCProgram:
+    """
+    Returns compiled Pluto code in UPLC
+    :param x: the program to compile
+    """
+    return _compile(x, config, untracked)
+
+
+def compile_with_memory_report(
+    x: Program,
+    config=DEFAULT_CONFIG,
+) -> typing.Tuple[UPLCProgram, MemoryReport]:
+    """
+    Returns compiled Pluto code in UPLC together with a report on the memory
+    allocated by each phase of the compiler. Compilation is considerably slower than with compile.
+    :param x: the program to compile
+    """
+    with MemoryTracker() as tracker:
+        res = _compile(x, config, tracker)
+    return res, tracker.report
+
+
+def compile_with_source_map(
+    x: Program,
+    config=DEFAULT_CONFIG,
+) -> typing.Tuple[UPLCProgram, SourceMap]:
+    """
+    Returns compiled Pluto code in UPLC together with a source map that relates
+    every UPLC term to the pluthon node and patterns it was generated from.
+    :param x: the program to compile
+    """
+    res = _compile(annotate_paths(x), config, untracked, lower_with_origins)
+    propagate_origins(res)
+    return res, SourceMap.from_program(res)
+
+
 def dumps(u: AST):
     return u.dumps()
@@ -1,9 +1,15 @@
+import typing
 from functools import lru_cache
 
-from .pluthon_ast import Let, AST
+from .pluthon_ast import Let, AST, Pattern
 
 from dataclasses import fields, MISSING
 
+# set on the result of composing a pattern in place, refers to the pattern (see source_map.py)
+COMPOSED_FROM_ATTRIBUTE = "_pluthon_composed_from"
+# results of analyses that are cached on a node (see analysis/variables.py)
+ANALYSIS_CACHE_ATTRIBUTE = "_pluthon_analyses"
+
 
 @lru_cache()
 def cached_fields(cls):
@@ -35,6 +41,61 @@ def iter_fields(node: AST):
     ]
 
 
+def compose_in_place(node: Pattern) -> AST:
+    """Composes the pattern and remembers on the result which pattern it was composed from"""
+    res = node.compose()
+    setattr(res, COMPOSED_FROM_ATTRIBUTE, node)
+    return res
+
+
+def is_analyzed(node: AST) -> bool:
+    return ANALYSIS_CACHE_ATTRIBUTE in node.__dict__
+
+
+def cached_analysis(node: AST, key: str):
+    """The result of the analysis stored under key on the node or None if it was not analyzed"""
+    cache = node.__dict__.get(ANALYSIS_CACHE_ATTRIBUTE)
+    return cache.get(key) if cache is not None else None
+
+
+def analyze_cached(
+    node: AST,
+    key: str,
+    children: typing.Callable[[AST], typing.Iterable[AST]],
+    analyze: typing.Callable[[AST], typing.Any],
+):
+    """
+    Runs analyze on all nodes of the tree that were not analyzed yet (children before their parents)
+    and stores the results on the nodes under key.
+    analyze can look up the results of the children of a node with cached_analysis.
+    """
+    res = cached_analysis(node, key)
+    if res is not None:
+        return res
+    # iterative post-order traversal, terms may be very deep
+    stack = [(node, False)]
+    while stack:
+        n, children_done = stack.pop()
+        if cached_analysis(n, key) is not None:
+            continue
+        if children_done:
+            n.__dict__.setdefault(ANALYSIS_CACHE_ATTRIBUTE, {})[key] = analyze(n)
+        else:
+            stack.append((n, True))
+            stack.extend(
+                (c, False) for c in children(n) if cached_analysis(c, key) is None
+            )
+    return cached_analysis(node, key)
+
+
+def invalidate_analyses(node: AST):
+    """
+    Drops the analysis results cached on the node.
+    Needs to be called when fields of an analyzed node are changed outside of NodeTransformer.generic_visit
+    """
+    node.__dict__.pop(ANALYSIS_CACHE_ATTRIBUTE, None)
+
+
 class NodeVisitor(object):
     """
     A node visitor base class that walks the abstract syntax tree and calls a
@@ -112,10 +173,19 @@ class NodeTransformer(NodeVisitor):
     """
 
     def generic_visit(self, node):
+        # cached analyses of the node are dropped if any child was replaced or its analyses were dropped
+        analyzed = is_analyzed(node)
+        modified = False
         if isinstance(node, Let):
+            old_bindings = node.bindings
             node.bindings = [
                 (name, self.visit(binding)) for name, binding in node.bindings
             ]
+            if analyzed:
+                modified = any(
+                    new is not old or not is_analyzed(new)
+                    for (_, new), (_, old) in zip(node.bindings, old_bindings)
+                )
         for field, old_value in iter_fields(node):
             if isinstance(old_value, tuple):
                 old_value = list(old_value)
@@ -131,6 +201,12 @@ class NodeTransformer(NodeVisitor):
                             new_values.extend(value)
                             continue
                     new_values.append(value)
+                if analyzed and not modified:
+                    modified = len(new_values) != len(old_value) or any(
+                        isinstance(new, AST)
+                        and (new is not old or not is_analyzed(new))
+                        for new, old in zip(new_values, old_value)
+                    )
                 old_value[:] = new_values
             elif isinstance(old_value, AST):
                 new_node = self.visit(old_value)
@@ -138,6 +214,10 @@ class NodeTransformer(NodeVisitor):
                     delattr(node, field)
                 else:
                     setattr(node, field, new_node)
+                if analyzed and not modified:
+                    modified = new_node is not old_value or not is_analyzed(new_node)
+        if modified:
+            invalidate_analyses(node)
         return node
 
 
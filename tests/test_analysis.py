@@ -0,0 +1,248 @@
+import pytest
+from uplc import eval as uplc_eval
+
+from pluthon import (
+    Program,
+    Integer,
+    Let,
+    Var,
+    Ite,
+    Lambda,
+    Apply,
+    AddInteger,
+    LessThanInteger,
+    IndexAccessList,
+    IndexAccessListFast,
+    ConstantIndexAccessList,
+    FoldList,
+    FoldRange,
+    MapList,
+    PLambda,
+    PLet,
+    PVar,
+    EmptyIntegerList,
+    PrependList,
+    AppendString,
+    DecodeUtf8,
+    DivideInteger,
+    IteNullList,
+    NoneData,
+    SomeData,
+    Text,
+    Trace,
+    TraceError,
+    UnIData,
+)
+from pluthon.optimize.remove_trace import RemoveTrace
+from pluthon.analysis.cost import estimate_cost
+from pluthon.analysis.effects import Effect, effect, is_pure
+from pluthon.analysis.steps import steps
+from pluthon.analysis.structure import structural_hash
+from pluthon.analysis.variables import (
+    Occurrence,
+    binder_uses,
+    free_variables,
+    variables,
+)
+from pluthon.util import NodeTransformer, is_analyzed
+
+
+def int_list(*xs: int):
+    res = EmptyIntegerList()
+    for x in reversed(xs):
+        res = PrependList(Integer(x), res)
+    return res
+
+
+@pytest.mark.parametrize(
+    "term",
+    [
+        AddInteger(Integer(1), Integer(2)),
+        Let(
+            [("x", Integer(3))],
+            Ite(LessThanInteger(Var("x"), Integer(4)), Integer(1), Integer(2)),
+        ),
+        Apply(
+            Lambda(["a", "b"], AddInteger(Var("a"), Var("b"))), Integer(1), Integer(2)
+        ),
+        ConstantIndexAccessList(int_list(4, 5, 6), 2),
+    ],
+)
+def test_estimate_straight_line_exact(term):
+    p = Program((1, 0, 0), term)
+    estimate = estimate_cost(p)
+    assert estimate.exact
+    assert estimate.evaluate() == uplc_eval(p.compile()).cost
+
+
+@pytest.mark.parametrize(
+    "term",
+    [
+        IndexAccessList(int_list(4, 5, 6), Integer(2)),
+        IndexAccessListFast(2)(int_list(4, 5, 6, 7, 8), Integer(3)),
+        FoldList(
+            int_list(1, 2, 3),
+            PLambda(["a", "x"], AddInteger(PVar("a"), PVar("x"))),
+            Integer(0),
+        ),
+        FoldRange(
+            Integer(5),
+            PLambda(["a", "x"], AddInteger(PVar("a"), PVar("x"))),
+            Integer(0),
+            Integer(1),
+            Integer(2),
+        ),
+    ],
+)
+def test_estimate_loop_upper_bound(term):
+    p = Program((1, 0, 0), term)
+    estimate = estimate_cost(p)
+    assert not estimate.exact
+    assert not estimate.budget.symbols
+    actual = uplc_eval(p.compile()).cost
+    assert estimate.evaluate().cpu >= actual.cpu
+    assert estimate.evaluate().memory >= actual.memory
+
+
+def test_estimate_symbolic_list_length():
+    def term():
+        return MapList(
+            PVar("input"),
+            PLambda(
+                ["x"],
+                FoldList(
+                    PVar("input"),
+                    PLambda(["a", "y"], AddInteger(PVar("a"), PVar("y"))),
+                    PVar("x"),
+                ),
+            ),
+            EmptyIntegerList(),
+        )
+
+    estimate = estimate_cost(term())
+    (symbol,) = estimate.budget.symbols
+    assert estimate.symbols[symbol] == PVar("input")
+    # quadratic in the length of the list
+    assert (symbol, symbol) in estimate.budget.terms
+    for n in range(4):
+        p = Program((1, 0, 0), PLet([("input", int_list(*range(n)))], term()))
+        actual = uplc_eval(p.compile()).cost
+        assert estimate.evaluate({symbol: n}).cpu >= actual.cpu
+
+
+def test_variables_scoping_and_positions():
+    term = Let(
+        [("x", Var("y")), ("z", AddInteger(Var("x"), Var("x")))],
+        Ite(
+            LessThanInteger(Var("z"), Var("w")),
+            Lambda(["v"], AddInteger(Var("v"), Var("x"))),
+            Var("y"),
+        ),
+    )
+    res = variables(term)
+    assert res.free == {"y", "w"}
+    assert res.uses["y"] == 2
+    assert res.occurrences["y"] == Occurrence.CONDITIONAL
+    assert res.occurrences["w"] == Occurrence.STRICT
+    assert binder_uses(term) == [
+        ("x", 3, Occurrence.REPEATED),
+        ("z", 1, Occurrence.STRICT),
+    ]
+    # the body of an immediately applied lambda is evaluated once
+    beta = Apply(Lambda(["a"], Var("a")), Var("b"))
+    assert variables(beta).occurrences == {"b": Occurrence.STRICT}
+
+
+def test_variables_patterns():
+    # the list is evaluated once, the accumulator once, the operator once per iteration
+    term = FoldList(PVar("l"), PVar("f"), PVar("a"))
+    res = variables(term)
+    assert res.free == {PVar("l").name, PVar("f").name, PVar("a").name}
+    assert res.occurrences[PVar("l").name] == Occurrence.STRICT
+    assert free_variables(term) == free_variables(term.compose())
+
+
+def test_variables_invalidated_by_transformer():
+    class RenameY(NodeTransformer):
+        def visit_Var(self, node):
+            return Var("u") if node.name == "y" else node
+
+    inner = AddInteger(Var("y"), Integer(1))
+    term = Lambda(["x"], Apply(Var("x"), inner))
+    assert free_variables(term) == {"y"}
+    assert is_analyzed(inner)
+    term = RenameY().visit(term)
+    assert free_variables(term) == {"u"}
+    # untouched subterms keep their results
+    other = Lambda(["x"], Integer(1))
+    free_variables(other)
+    RenameY().visit(other)
+    assert is_analyzed(other) and is_analyzed(other.term)
+
+
+@pytest.mark.parametrize(
+    "term,expected",
+    [
+        (AddInteger(Integer(1), Var("x")), Effect.PURE),
+        (SomeData(UnIData(Var("d"))), Effect.MAY_ERROR),
+        (NoneData(), Effect.PURE),
+        (DivideInteger(Integer(1), Integer(0)), Effect.MAY_ERROR),
+        (Trace(Text("a"), Integer(1)), Effect.MAY_TRACE),
+        (TraceError("a"), Effect.MAY_ERROR | Effect.MAY_TRACE),
+        # effects in unevaluated lambdas do not count
+        (Lambda(["x"], TraceError("a")), Effect.PURE),
+        (
+            Apply(Lambda(["x"], TraceError("a")), Integer(1)),
+            Effect.MAY_ERROR | Effect.MAY_TRACE,
+        ),
+        (IteNullList(Var("l"), Integer(1), Integer(2)), Effect.PURE),
+        (
+            IteNullList(Var("l"), Integer(1), TraceError("a")),
+            Effect.MAY_ERROR | Effect.MAY_TRACE,
+        ),
+        (Apply(Var("f"), Integer(1)), Effect.MAY_ERROR | Effect.MAY_TRACE),
+    ],
+)
+def test_effects(term, expected):
+    assert effect(term) == expected
+
+
+def test_remove_trace_pure_message():
+    term = Trace(AppendString(Text("a"), Var("s")), Integer(1))
+    assert is_pure(term.xs[0])
+    assert RemoveTrace().visit(term) == Integer(1)
+    # a message that may fail is kept
+    term = Trace(DecodeUtf8(Var("b")), Integer(1))
+    assert RemoveTrace().visit(term) == term
+
+
+def test_structural_hash():
+    def term():
+        return Let([("x", UnIData(Var("d")))], AddInteger(Var("x"), Integer(1)))
+
+    assert structural_hash(term()) == structural_hash(term())
+    assert structural_hash(term()) != structural_hash(
+        Let([("y", UnIData(Var("d")))], AddInteger(Var("y"), Integer(1)))
+    )
+
+
+@pytest.mark.parametrize(
+    "term",
+    [
+        AddInteger(Integer(1), Integer(2)),
+        Let(
+            [("x", Integer(3))],
+            Ite(LessThanInteger(Var("x"), Integer(4)), Integer(1), Integer(2)),
+        ),
+        ConstantIndexAccessList(int_list(4, 5, 6), 2),
+        FoldList(
+            int_list(1, 2),
+            Lambda(["a", "x"], AddInteger(Var("a"), Var("x"))),
+            Integer(0),
+        ),
+    ],
+)
+def test_steps_lower_bound(term):
+    res = uplc_eval(Program((1, 0, 0), term).compile())
+    # every machine step costs 16000 cpu units
+    assert steps(term) * 16000 <= res.cost.cpu
@@ -0,0 +1,55 @@
+from uplc.ast import BuiltinInteger
+
+from pluthon import (
+    Integer,
+    Program,
+    PLambda,
+    PVar,
+    AddInteger,
+    Ite,
+    EqualsInteger,
+    Error,
+    Apply,
+    Unit,
+)
+from pluthon.batch import BatchEvaluator, evaluate_batch, summarize
+
+
+def program():
+    # fails for x == 3
+    return Program(
+        (1, 0, 0),
+        PLambda(
+            ["x", "y"],
+            Ite(
+                EqualsInteger(PVar("x"), Integer(3)),
+                Apply(Error(), Unit()),
+                AddInteger(PVar("x"), PVar("y")),
+            ),
+        ),
+    )
+
+
+def test_batch_matches_single_evaluation():
+    batch = [(BuiltinInteger(x), BuiltinInteger(10)) for x in range(40)]
+    evaluator = BatchEvaluator(program())
+    serial = list(evaluator.evaluate(batch, processes=1))
+    parallel = list(evaluator.evaluate(batch, processes=2, chunksize=4))
+    assert [r.index for r in parallel] == list(range(40))
+    for s, p in zip(serial, parallel):
+        assert s.failed == p.failed
+        assert s.result == p.result
+        assert s.cost == p.cost
+    assert serial[3].failed
+    assert serial[5].result == BuiltinInteger(15)
+    assert evaluator.evaluate_one(*batch[5]).cost == serial[5].cost
+
+
+def test_batch_summary():
+    batch = [(BuiltinInteger(x), BuiltinInteger(x)) for x in range(10)]
+    results, summary = evaluate_batch(program(), batch, processes=1)
+    assert summary.runs == 10
+    assert summary.failures == 1
+    assert summary.cpu[100] == max(r.cost.cpu for r in results)
+    assert summary.cpu[50] <= summary.cpu[90] <= summary.cpu[100]
+    assert summarize([]).runs == 0
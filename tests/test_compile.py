@@ -0,0 +1,42 @@
+import pytest
+from uplc import eval as uplc_eval
+from uplc.ast import BuiltinInteger
+
+from pluthon import (
+    Program,
+    Integer,
+    IndexAccessList,
+    EmptyIntegerList,
+    PrependList,
+    compile,
+    compile_with_memory_report,
+)
+from pluthon.compiler_config import OPT_CONFIGS, OPT_O1_CONFIG
+
+
+def int_list(*xs: int):
+    res = EmptyIntegerList()
+    for x in reversed(xs):
+        res = PrependList(Integer(x), res)
+    return res
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+def test_constant_index_access(config):
+    p = Program((1, 0, 0), IndexAccessList(int_list(4, 5, 6), Integer(2)))
+    res = uplc_eval(compile(p, config)).result
+    assert res == BuiltinInteger(6)
+
+
+def test_compile_with_memory_report():
+    def p():
+        return Program((1, 0, 0), IndexAccessList(int_list(4, 5, 6), Integer(2)))
+
+    res, report = compile_with_memory_report(p(), OPT_O1_CONFIG)
+    assert res.dumps() == compile(p(), OPT_O1_CONFIG).dumps()
+    phases = {phase.phase: phase for phase in report.phases}
+    assert {"AllPatternReplacer", "lowering", "uplc_compile"} <= set(phases)
+    assert phases["lowering"].calls == 1
+    assert phases["lowering"].allocated_nodes["Apply"] > 0
+    assert report.peak > 0
+    assert report.top_node_classes(1)
@@ -0,0 +1,1259 @@
+import typing
+from copy import deepcopy
+
+import pytest
+from uplc import ast as uplc_ast, eval as uplc_eval
+
+from pluthon import (
+    AST,
+    Program,
+    Integer,
+    ByteString,
+    Text,
+    Var,
+    Lambda,
+    Apply,
+    AddInteger,
+    AppendByteString,
+    DivideInteger,
+    EqualsInteger,
+    IData,
+    NoneData,
+    SomeData,
+    Trace,
+    Let,
+    Ite,
+    LessThanInteger,
+    FoldList,
+    UnIData,
+    TraceError,
+    PLambda,
+    PLet,
+    PVar,
+    Force,
+    Delay,
+    Or,
+    And,
+    Not,
+    Iff,
+    Bool,
+    MapList,
+    HeadList,
+    MultiplyInteger,
+    SubtractInteger,
+    RecFun,
+    EmptyIntegerList,
+    FilterList,
+    MapFilterList,
+    AnyList,
+    LengthList,
+    LengthOfByteString,
+    Range,
+    FoldRange,
+    MapRange,
+    UPLCConstant,
+    PrependList,
+    EmptyDataList,
+    SingleDataList,
+    SliceList,
+    BData,
+    ConstrData,
+    ConstantNthField,
+    ConstantIndexAccessList,
+    ConstantIndexAccessListFast,
+    IndexAccessList,
+    IndexAccessListFast,
+    DestructureFields,
+    Fields,
+    compile,
+)
+from benchmarks.generator import GeneratorConfig, generate
+from pluthon.compiler_config import (
+    OPT_CONFIGS,
+    OPT_O1_CONFIG,
+    OPT_O2_CONFIG,
+    OPT_O3_CONFIG,
+)
+from pluthon.optimize.bindings import BindingSimplifier
+from pluthon.optimize.constant_index_access_list import IndexAccessOptimizer
+from pluthon.optimize.booleans import BooleanSimplifier
+from pluthon.optimize.constant_folding import ConstantFolder, MAX_RANGE_CONSTANT_LENGTH
+from pluthon.optimize.constant_lists import ConstantListMaterializer
+from pluthon.optimize.cse import CommonSubexpressionEliminator
+from pluthon.optimize.force_delay import EtaReducer, ForceDelayRemover
+from pluthon.optimize.list_fusion import ListFuser
+from pluthon.optimize.loop_invariants import LoopInvariantHoister
+from pluthon.optimize.operators import OperatorInliner
+from pluthon.optimize.parameters import DeadParameterEliminator
+from pluthon.optimize.patterns import AllPatternReplacer
+from pluthon.optimize.tail_chains import TailChainSharer
+
+
+@pytest.mark.parametrize(
+    "term,folded",
+    [
+        (AddInteger(Integer(1), AddInteger(Integer(2), Integer(3))), Integer(6)),
+        (
+            AppendByteString(ByteString(b"a"), ByteString(b"b")),
+            ByteString(b"ab"),
+        ),
+        (EqualsInteger(Integer(1), Integer(1)), uplc_ast.BuiltinBool(True)),
+        (IData(Integer(1)), uplc_ast.PlutusInteger(1)),
+        (NoneData(), uplc_ast.PlutusConstr(0, [])),
+        (
+            Apply(Lambda(["x"], AddInteger(Var("x"), Integer(1))), Integer(2)),
+            Integer(3),
+        ),
+    ],
+)
+def test_constant_folding(term, folded):
+    res = ConstantFolder().visit(term)
+    assert res.compile() == (
+        folded if isinstance(folded, uplc_ast.AST) else folded.compile()
+    )
+
+
+@pytest.mark.parametrize(
+    "term",
+    [
+        DivideInteger(Integer(1), Integer(0)),
+        Trace(Text("a"), Integer(1)),
+        AddInteger(PVar("x"), Integer(1)),
+    ],
+)
+def test_constant_folding_keeps_effects(term):
+    dumps = term.dumps()
+    assert ConstantFolder().visit(term).dumps() == dumps
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+def test_constant_folding_compile(config):
+    p = Program(
+        (1, 0, 0),
+        PLambda(
+            ["x"],
+            SomeData(IData(AddInteger(PVar("x"), AddInteger(Integer(1), Integer(2))))),
+        ),
+    )
+    res = uplc_eval(compile(p, config), uplc_ast.BuiltinInteger(1)).result
+    assert res == uplc_ast.PlutusConstr(1, [uplc_ast.PlutusInteger(4)])
+
+
+def test_constant_folding_compile_emits_constant():
+    p = Program(
+        (1, 0, 0),
+        PLambda(["x"], AddInteger(PVar("x"), AddInteger(Integer(1), Integer(2)))),
+    )
+    res = compile(p, OPT_O2_CONFIG).dumps()
+    assert "(con integer 3)" in res
+    assert res.count("addInteger") == 1
+
+
+@pytest.mark.parametrize(
+    "term,simplified",
+    [
+        # unused pure binding
+        (Let([("x", AddInteger(Var("a"), Integer(1)))], Var("b")), "b"),
+        # unused binding that may fail is kept
+        (
+            Let([("x", UnIData(Var("a")))], Var("b")),
+            "(let x = (UnIData a) in b)",
+        ),
+        # single use in a branch
+        (
+            Let(
+                [("x", AddInteger(Var("a"), Integer(1)))],
+                Ite(Var("c"), Var("x"), Integer(0)),
+            ),
+            "(if c then (AddInteger a 1) else 0)",
+        ),
+        # single use in a loop is not inlined
+        (
+            Let(
+                [("x", AddInteger(Var("a"), Integer(1)))],
+                Lambda(["y"], AddInteger(Var("x"), Var("y"))),
+            ),
+            "(let x = (AddInteger a 1) in (\\y -> (AddInteger x y)))",
+        ),
+        # copy propagation
+        (
+            Let([("x", Var("a"))], AddInteger(Var("x"), Var("x"))),
+            "(AddInteger a a)",
+        ),
+        # beta reduction
+        (
+            Apply(
+                Lambda(["x", "y"], AddInteger(Var("x"), Var("y"))),
+                Var("a"),
+                Integer(1),
+            ),
+            "(AddInteger a 1)",
+        ),
+        # no capture of the free variable y
+        (
+            Let([("x", Var("y"))], Lambda(["y"], Var("x"))),
+            "(let x = y in (\\y -> x))",
+        ),
+        # bindings of the same let inlined into each other
+        (
+            Let(
+                [
+                    ("x", AddInteger(Var("a"), Integer(1))),
+                    ("y", AddInteger(Var("x"), Integer(2))),
+                ],
+                AddInteger(Var("y"), Var("b")),
+            ),
+            "(AddInteger (AddInteger (AddInteger a 1) 2) b)",
+        ),
+        # no capture of the free variable a by a later binding
+        (
+            Let(
+                [("x", AddInteger(Var("a"), Integer(1))), ("a", UnIData(Var("b")))],
+                AddInteger(Var("x"), AddInteger(Var("a"), Var("a"))),
+            ),
+            "(let x = (AddInteger a 1);a = (UnIData b) in (AddInteger x (AddInteger a a)))",
+        ),
+        # nor of the free variables of the bindings inlined into an inlined binding
+        (
+            Let(
+                [
+                    ("x", Var("a")),
+                    ("y", UnIData(Var("x"))),
+                    ("a", UnIData(Var("b"))),
+                ],
+                AddInteger(Var("y"), AddInteger(Var("a"), Var("a"))),
+            ),
+            "(let y = (UnIData a);a = (UnIData b) in (AddInteger y (AddInteger a a)))",
+        ),
+    ],
+)
+def test_binding_simplifier(term, simplified):
+    assert BindingSimplifier().visit(term).dumps() == simplified
+
+
+def test_binding_simplifier_keeps_trace_order():
+    term = Let(
+        [("x", Trace(Text("a"), Integer(1)))],
+        AddInteger(Trace(Text("b"), Integer(2)), Var("x")),
+    )
+    assert BindingSimplifier().visit(term).dumps().startswith("(let")
+    # the trace builtin only traces once its arguments are evaluated
+    term = Let(
+        [("x", Trace(Text("a"), Integer(1)))],
+        Trace(Text("b"), Var("x")),
+    )
+    assert (
+        BindingSimplifier().visit(term).dumps() == "((! Trace) 'b' ((! Trace) 'a' 1))"
+    )
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+def test_binding_simplifier_compile(config):
+    p = Program(
+        (1, 0, 0),
+        PLambda(
+            ["xs"],
+            FoldList(
+                PVar("xs"),
+                PLambda(["a", "x"], AddInteger(PVar("a"), UnIData(PVar("x")))),
+                Ite(
+                    LessThanInteger(Integer(0), Integer(1)),
+                    Integer(0),
+                    TraceError("unreachable"),
+                ),
+            ),
+        ),
+    )
+    xs = uplc_ast.BuiltinList(
+        [uplc_ast.PlutusInteger(i) for i in range(3)], uplc_ast.PlutusData()
+    )
+    assert uplc_eval(compile(p, config), xs).result == uplc_ast.BuiltinInteger(3)
+
+
+def _increment_map(empty_list: AST) -> AST:
+    return MapList(
+        PVar("xs"), PLambda(["x"], AddInteger(PVar("x"), Integer(1))), empty_list
+    )
+
+
+def _call_program(*args: AST) -> Program:
+    return Program((1, 0, 0), PLambda(["xs"], Apply(Var("f"), *args)))
+
+
+def test_value_arguments_not_delayed():
+    res = AllPatternReplacer().visit(
+        _call_program(_increment_map(EmptyIntegerList()), _increment_map(Var("e")))
+    )
+    # the empty lists are passed directly and not forced in the loop
+    assert "(! 0empty_list_)" not in dict(res.prog.bindings)["0p_MapList_"].dumps()
+    assert "(# " not in res.prog.term.dumps()
+    # a mix of values and other terms is delayed everywhere
+    res = AllPatternReplacer().visit(
+        _call_program(
+            _increment_map(EmptyIntegerList()),
+            _increment_map(Apply(Var("g"), Var("e"))),
+        )
+    )
+    assert "(! 0empty_list_)" in dict(res.prog.bindings)["0p_MapList_"].dumps()
+    assert res.prog.term.dumps().count("(# ") == 2
+
+
+def test_constant_arguments_specialized():
+    res = AllPatternReplacer().visit(
+        _call_program(_increment_map(EmptyDataList()), _increment_map(EmptyDataList()))
+    )
+    # the function and the empty list are put into the abstract function instead of being passed by every call
+    abstract_function = dict(res.prog.bindings)["0p_MapList_"]
+    assert abstract_function.vars == ["0lst_"]
+    assert "MkNilData" in abstract_function.dumps()
+    assert "MkNilData" not in res.prog.term.dumps()
+    # arguments that differ between the calls are passed
+    res = AllPatternReplacer().visit(
+        _call_program(
+            _increment_map(EmptyDataList()), _increment_map(Apply(Var("g"), Var("e")))
+        )
+    )
+    assert dict(res.prog.bindings)["0p_MapList_"].vars == ["0lst_", "0empty_list_"]
+    # terms that are not values are not copied into the uses of the parameter
+    res = AllPatternReplacer().visit(
+        _call_program(
+            SliceList(Integer(1), Integer(2), PVar("xs"), EmptyDataList()),
+            SliceList(Integer(2), Integer(3), PVar("xs"), EmptyDataList()),
+        )
+    )
+    assert "0empty_list_" in dict(res.prog.bindings)["0p_SliceList_"].vars
+
+
+def test_constant_arguments_compared_structurally():
+    # the same empty list with its arguments in a list instead of a tuple
+    empty_list = EmptyDataList()
+    empty_list.xs = list(empty_list.xs)
+    res = AllPatternReplacer().visit(
+        _call_program(_increment_map(EmptyDataList()), _increment_map(empty_list))
+    )
+    assert dict(res.prog.bindings)["0p_MapList_"].vars == ["0lst_"]
+
+
+def test_delayed_variables_passed_on():
+    # y of Or is conditionally evaluated, a forced variable is passed on as is
+    p = Program((1, 0, 0), Apply(Var("f"), Or(Var("a"), Force(Var("b")))))
+    res = AllPatternReplacer().visit(p)
+    assert res.prog.term.dumps() == "(f (0p_Or_ a b))"
+
+
+def test_pattern_replacer_outside_program():
+    # patterns that are visited without the program are called with the default parameters
+    res = AllPatternReplacer().visit(Not(Var("x")))
+    assert res.dumps() == "(0p_Not_ x)"
+
+
+@pytest.mark.parametrize(
+    "term,reduced",
+    [
+        (Force(Delay(Var("x"))), "x"),
+        (Lambda(["x"], Apply(Var("f"), Var("x"))), "f"),
+        # f may be a function of one argument that fails when it is applied to x
+        (
+            Lambda(["x", "y"], Apply(Var("f"), Var("x"), Var("y"))),
+            "(\\x y -> (f x y))",
+        ),
+        (Lambda(["x"], UnIData(Var("x"))), "UnIData"),
+        (Lambda(["x", "y"], AddInteger(Var("x"), Var("y"))), "AddInteger"),
+        (
+            Lambda(["x", "y"], Apply(Lambda(["a", "b"], Var("a")), Var("x"), Var("y"))),
+            "(\\a b -> a)",
+        ),
+        (
+            Lambda(["x", "y"], Apply(Lambda(["a"], Var("a")), Var("x"), Var("y"))),
+            "(\\x y -> ((\\a -> a) x y))",
+        ),
+        (
+            Lambda(["x", "y"], Apply(Var("f"), Var("y"), Var("x"))),
+            "(\\x y -> (f y x))",
+        ),
+        (Lambda(["x"], Apply(Var("x"), Var("x"))), "(\\x -> (x x))"),
+    ],
+)
+def test_force_delay_and_eta_reduction(term, reduced):
+    res = EtaReducer().visit(ForceDelayRemover().visit(term))
+    assert res.dumps() == reduced
+
+
+def test_eta_reduction_compile():
+    p = Program(
+        (1, 0, 0),
+        PLambda(["xs"], MapList(PVar("xs"), PLambda(["x"], UnIData(PVar("x"))))),
+    )
+    res = compile(p, OPT_O1_CONFIG).dumps()
+    assert "(builtin unIData)]" in res
+    assert "(lam 0x_ [(builtin unIData) 0x_])" not in res
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+def test_eta_reduction_keeps_partial_application(config):
+    # g 1 is a function, f 1 would fail
+    p = Program(
+        (1, 0, 0),
+        PLet(
+            [
+                ("f", PLambda(["a"], TraceError("f"))),
+                ("g", PLambda(["x", "y"], Apply(PVar("f"), PVar("x"), PVar("y")))),
+                ("h", Apply(PVar("g"), Integer(1))),
+            ],
+            Integer(42),
+        ),
+    )
+    assert uplc_eval(compile(p, config)).result == uplc_ast.BuiltinInteger(42)
+
+
+@pytest.mark.parametrize(
+    "term,simplified",
+    [
+        (Ite(Bool(True), Var("a"), Var("b")), "a"),
+        (Ite(Not(Var("c")), Var("a"), Var("b")), "(if c then b else a)"),
+        (Ite(Var("c"), Bool(True), Bool(False)), "c"),
+        (Not(Not(Var("c"))), "c"),
+        (Iff(Var("c"), Bool(True)), "c"),
+        (
+            And(And(Var("a"), Var("b")), Var("c")),
+            "(if a then (if b then c else False) else False)",
+        ),
+        (
+            Ite(Or(Var("a"), Var("b")), Var("x"), Var("y")),
+            "(if a then x else (if b then x else y))",
+        ),
+        # the branch would be duplicated
+        (
+            Ite(And(Var("a"), Var("b")), Var("x"), TraceError("e")),
+            "(if (if a then b else False) then x else (Error ((! Trace) 'e' ())))",
+        ),
+    ],
+)
+def test_boolean_simplifier(term, simplified):
+    assert BooleanSimplifier().visit(term).dumps() == simplified
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+@pytest.mark.parametrize("a", [0, 1, 2])
+def test_boolean_simplifier_compile(config, a):
+    p = Program(
+        (1, 0, 0),
+        PLambda(
+            ["a"],
+            Ite(
+                Or(
+                    And(Not(LessThanInteger(PVar("a"), Integer(1))), Bool(True)),
+                    EqualsInteger(PVar("a"), Integer(0)),
+                ),
+                Integer(1),
+                Integer(0),
+            ),
+        ),
+    )
+    res = uplc_eval(compile(p, config), uplc_ast.BuiltinInteger(a)).result
+    assert res == uplc_ast.BuiltinInteger(1)
+
+
+@pytest.mark.parametrize(
+    "term,eliminated",
+    [
+        (
+            AddInteger(UnIData(HeadList(Var("xs"))), UnIData(HeadList(Var("xs")))),
+            "(let 0cse_0_ = (UnIData ((! HeadList) xs)) in (AddInteger 0cse_0_ 0cse_0_))",
+        ),
+        # occurrences in different branches are evaluated at most once
+        (
+            Ite(
+                Var("c"), AddInteger(Var("a"), Var("b")), AddInteger(Var("a"), Var("b"))
+            ),
+            "(if c then (AddInteger a b) else (AddInteger a b))",
+        ),
+        # pure terms are bound before the branches if they are evaluated twice on one path
+        (
+            Apply(
+                Var("f"),
+                AddInteger(Var("a"), Var("b")),
+                Ite(Var("c"), AddInteger(Var("a"), Var("b")), Integer(0)),
+            ),
+            "(let 0cse_0_ = (AddInteger a b) in (f 0cse_0_ (if c then 0cse_0_ else 0)))",
+        ),
+        # terms that may fail are not bound where they might not be evaluated
+        (
+            Ite(Var("c"), HeadList(Var("xs")), Apply(Var("f"), HeadList(Var("xs")))),
+            "(if c then ((! HeadList) xs) else (f ((! HeadList) xs)))",
+        ),
+        # the binding is placed in the let that binds the variables of the term
+        (
+            Let(
+                [("a", Var("b")), ("x", AddInteger(Var("a"), Var("a")))],
+                Apply(Var("f"), AddInteger(Var("a"), Var("a")), Var("x")),
+            ),
+            "(let a = b;0cse_0_ = (AddInteger a a);x = 0cse_0_ in (f 0cse_0_ x))",
+        ),
+        # occurrences that refer to different variables
+        (
+            Apply(
+                Var("f"),
+                AddInteger(Var("a"), Var("a")),
+                Let([("a", Var("b"))], AddInteger(Var("a"), Var("a"))),
+            ),
+            "(f (AddInteger a a) (let a = b in (AddInteger a a)))",
+        ),
+        # terms are not moved out of lambdas
+        (
+            Apply(
+                Var("f"),
+                AddInteger(Var("a"), Var("a")),
+                Lambda(["y"], AddInteger(Var("a"), Var("a"))),
+            ),
+            "(f (AddInteger a a) (\\y -> (AddInteger a a)))",
+        ),
+    ],
+)
+def test_common_subexpression_elimination(term, eliminated):
+    res = CommonSubexpressionEliminator().visit(Program((1, 0, 0), term))
+    assert res.dumps() == eliminated
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+def test_common_subexpression_elimination_compile(config):
+    p = Program(
+        (1, 0, 0),
+        PLambda(
+            ["xs"],
+            AddInteger(
+                UnIData(HeadList(PVar("xs"))),
+                MultiplyInteger(
+                    UnIData(HeadList(PVar("xs"))), UnIData(HeadList(PVar("xs")))
+                ),
+            ),
+        ),
+    )
+    xs = uplc_ast.BuiltinList([uplc_ast.PlutusInteger(3)], uplc_ast.PlutusData())
+    assert uplc_eval(compile(p, config), xs).result == uplc_ast.BuiltinInteger(12)
+
+
+def _flag_costs(program: typing.Callable[[], Program], flag: str, *args) -> list:
+    """The cost of the program at O2 and O3 with the optimization turned off and on"""
+    return [
+        [
+            uplc_eval(compile(program(), config.update(**{flag: on})), *args).cost
+            for on in (False, True)
+        ]
+        for config in (OPT_O2_CONFIG, OPT_O3_CONFIG)
+    ]
+
+
+@pytest.mark.parametrize("c", [True, False])
+def test_common_subexpression_elimination_cost(c):
+    def program():
+        x = AddInteger(
+            MultiplyInteger(PVar("a"), PVar("a")),
+            MultiplyInteger(PVar("a"), Integer(3)),
+        )
+        return Program(
+            (1, 0, 0),
+            PLambda(
+                ["a", "c"],
+                Ite(
+                    PVar("c"),
+                    AddInteger(x, Integer(1)),
+                    SubtractInteger(deepcopy(x), Integer(1)),
+                ),
+            ),
+        )
+
+    for off, on in _flag_costs(
+        program,
+        "eliminate_common_subexpressions",
+        uplc_ast.BuiltinInteger(2),
+        uplc_ast.BuiltinBool(c),
+    ):
+        assert on.cpu <= off.cpu and on.memory <= off.memory
+
+
+def _sum_times(factor: AST, lst: AST = PVar("xs")) -> AST:
+    return FoldList(
+        lst,
+        PLambda(
+            ["a", "x"],
+            AddInteger(PVar("a"), MultiplyInteger(PVar("x"), factor)),
+        ),
+        Integer(0),
+    )
+
+
+def test_loop_invariant_hoisting():
+    def program(factor, lst: AST = PVar("xs")):
+        return Program((1, 0, 0), PLambda(["xs", "d"], _sum_times(factor, lst)))
+
+    # UnIData may fail and is not hoisted
+    res = LoopInvariantHoister().visit(program(UnIData(PVar("d"))))
+    assert "0licm_" not in res.dumps()
+    # the binding costs as much as the term saves
+    res = LoopInvariantHoister().visit(program(LengthOfByteString(ByteString(b"d"))))
+    assert "0licm_" not in res.dumps()
+    # the loop runs at most once
+    res = LoopInvariantHoister().visit(
+        program(
+            AddInteger(PVar("d"), Integer(1)),
+            PrependList(Integer(1), EmptyIntegerList()),
+        )
+    )
+    assert "0licm_" not in res.dumps()
+    res = LoopInvariantHoister().visit(program(AddInteger(PVar("d"), Integer(1))))
+    assert res.prog.term.dumps().startswith("(let 0licm_0_ = (AddInteger 0d_ 1) in")
+    xs = uplc_ast.BuiltinList([uplc_ast.BuiltinInteger(i) for i in range(3)])
+    assert uplc_eval(
+        res.compile(), xs, uplc_ast.BuiltinInteger(1)
+    ).result == uplc_ast.BuiltinInteger(6)
+
+
+def test_loop_invariant_hoisting_may_fail():
+    def program(factor, lst: AST = PVar("xs")):
+        return Program((1, 0, 0), PLambda(["xs", "d"], _sum_times(factor, lst)))
+
+    first_field = UnIData(HeadList(Fields(PVar("d"))))
+    three = PrependList(
+        Integer(1), PrependList(Integer(2), PrependList(Integer(3), EmptyIntegerList()))
+    )
+    # the loop certainly runs, so the term that may fail is evaluated once before it
+    res = LoopInvariantHoister().visit(program(first_field, three))
+    assert res.prog.term.dumps().startswith(
+        "(let 0licm_0_ = (UnIData ((! HeadList) <[Fields]>"
+    )
+    d = uplc_ast.PlutusConstr(0, [uplc_ast.PlutusInteger(2)])
+    assert uplc_eval(
+        res.compile(), uplc_ast.BuiltinList([], uplc_ast.BuiltinInteger(0)), d
+    ).result == uplc_ast.BuiltinInteger(12)
+    # the list may be empty
+    res = LoopInvariantHoister().visit(program(first_field))
+    assert "0licm_" not in res.dumps()
+    # not every iteration evaluates the term
+    res = LoopInvariantHoister().visit(
+        program(
+            Ite(LessThanInteger(PVar("x"), Integer(2)), Integer(1), first_field), three
+        )
+    )
+    assert "0licm_" not in res.dumps()
+    # the loop traces before the term fails
+    res = LoopInvariantHoister().visit(
+        program(AddInteger(Trace(Text("x"), PVar("x")), first_field), three)
+    )
+    assert "0licm_" not in res.dumps()
+
+
+def test_loop_invariant_hoisting_recursive_function():
+    def loop(base):
+        return RecFun(
+            PLambda(
+                ["f", "i"],
+                Ite(
+                    EqualsInteger(PVar("i"), Integer(0)),
+                    base,
+                    AddInteger(
+                        MultiplyInteger(PVar("d"), PVar("d")),
+                        Apply(
+                            PVar("f"), PVar("f"), SubtractInteger(PVar("i"), Integer(1))
+                        ),
+                    ),
+                ),
+            )
+        )
+
+    res = LoopInvariantHoister().visit(loop(AddInteger(PVar("d"), Integer(1))))
+    # the branch that ends the recursion is left alone
+    assert res.dumps().startswith(
+        "(let 0licm_0_ = (MultiplyInteger 0d_ 0d_) in <[RecFun]>"
+    )
+    assert "(AddInteger 0d_ 1)" in res.dumps()
+    # applied to a list that is too short to repeat
+    res = LoopInvariantHoister().visit(Apply(loop(Integer(0)), EmptyIntegerList()))
+    assert "0licm_" not in res.dumps()
+
+
+def test_loop_invariant_hoisting_nested():
+    res = LoopInvariantHoister().visit(
+        _sum_times(_sum_times(AddInteger(PVar("d"), Integer(1))))
+    )
+    # the term is hoisted out of both loops without renaming it in between
+    assert res.dumps().startswith("(let 0licm_1_ = (AddInteger 0d_ 1) in")
+    assert res.dumps().count("0licm_") == 2
+
+
+def test_loop_invariant_hoisting_cost():
+    program, args = generate(0, GeneratorConfig())
+    for off, on in _flag_costs(
+        lambda: deepcopy(program), "hoist_loop_invariants", *args
+    ):
+        assert on.cpu <= off.cpu and on.memory <= off.memory
+
+
+def _fusion_program(term):
+    return Program((1, 0, 0), PLambda(["xs"], term))
+
+
+def _positive():
+    return PLambda(["x"], LessThanInteger(Integer(0), PVar("x")))
+
+
+def _double():
+    return PLambda(["x"], MultiplyInteger(PVar("x"), Integer(2)))
+
+
+@pytest.mark.parametrize(
+    "term,fused",
+    [
+        (
+            FoldList(
+                MapList(FilterList(PVar("xs"), _positive()), _double()),
+                PLambda(["a", "x"], AddInteger(PVar("a"), PVar("x"))),
+                Integer(0),
+            ),
+            FoldList,
+        ),
+        (MapList(FilterList(PVar("xs"), _positive()), _double()), MapFilterList),
+        (LengthList(FilterList(PVar("xs"), _positive())), FoldList),
+        (LengthList(MapList(PVar("xs"), _double())), LengthList),
+        (AnyList(MapList(PVar("xs"), _double()), _positive()), AnyList),
+    ],
+)
+def test_list_fusion(term, fused):
+    res = ListFuser().visit(_fusion_program(term)).prog.term
+    assert type(res) is fused
+    assert res.lst == PVar("xs")
+
+
+def test_list_fusion_keeps_effects():
+    # the map may fail on elements after the one that AnyList stops at
+    term = AnyList(MapList(PVar("xs"), PLambda(["x"], UnIData(PVar("x")))), _positive())
+    res = ListFuser().visit(_fusion_program(term)).prog.term
+    assert isinstance(res.lst, MapList)
+    # traces would be reordered
+    term = FoldList(
+        MapList(PVar("xs"), PLambda(["x"], Trace(Text("x"), PVar("x")))),
+        PLambda(["a", "x"], Trace(Text("a"), PVar("a"))),
+        Integer(0),
+    )
+    res = ListFuser().visit(_fusion_program(term)).prog.term
+    assert isinstance(res.lst, MapList)
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+def test_list_fusion_compile(config):
+    p = _fusion_program(
+        FoldList(
+            MapList(
+                FilterList(PVar("xs"), _positive(), EmptyIntegerList()),
+                _double(),
+                EmptyIntegerList(),
+            ),
+            PLambda(["a", "x"], AddInteger(PVar("a"), PVar("x"))),
+            LengthList(FilterList(PVar("xs"), _positive(), EmptyIntegerList())),
+        )
+    )
+    xs = uplc_ast.BuiltinList([uplc_ast.BuiltinInteger(i) for i in range(-2, 4)])
+    assert uplc_eval(compile(p, config), xs).result == uplc_ast.BuiltinInteger(15)
+
+
+@pytest.mark.parametrize(
+    "term,fused",
+    [
+        (
+            FoldList(
+                Range(PVar("n")),
+                PLambda(["a", "x"], AddInteger(PVar("a"), PVar("x"))),
+                Integer(0),
+            ),
+            FoldRange,
+        ),
+        (LengthList(Range(PVar("n"))), FoldRange),
+        (MapList(Range(PVar("n")), _double()), MapRange),
+        # the map is fused into the fold first
+        (
+            FoldList(
+                MapList(Range(PVar("n")), _double()),
+                PLambda(["a", "x"], AddInteger(PVar("a"), PVar("x"))),
+                Integer(0),
+            ),
+            FoldRange,
+        ),
+    ],
+)
+def test_range_fusion(term, fused):
+    res = ListFuser().visit(Program((1, 0, 0), PLambda(["n"], term))).prog.term
+    assert type(res) is fused
+    assert res.limit == PVar("n")
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+@pytest.mark.parametrize("n", [0, 1, 4])
+def test_range_fusion_compile(config, n):
+    p = Program(
+        (1, 0, 0),
+        PLambda(
+            ["n"],
+            FoldList(
+                MapList(
+                    Range(PVar("n"), Integer(1), Integer(2)),
+                    _double(),
+                    EmptyIntegerList(),
+                ),
+                PLambda(["a", "x"], AddInteger(PVar("a"), PVar("x"))),
+                LengthList(Range(PVar("n"))),
+            ),
+        ),
+    )
+    res = uplc_eval(compile(p, config), uplc_ast.BuiltinInteger(n)).result
+    assert res == uplc_ast.BuiltinInteger(n + sum(2 * i for i in range(1, n, 2)))
+
+
+@pytest.mark.parametrize(
+    "start,limit,step", [(0, 5, 1), (1, 10, 3), (-3, 3, 2), (5, 5, 1), (6, 2, -1)]
+)
+def test_constant_range(start, limit, step):
+    res = ConstantFolder().visit(Range(Integer(limit), Integer(start), Integer(step)))
+    assert res.compile().values == [
+        uplc_ast.BuiltinInteger(i) for i in range(start, limit, step) if i < limit
+    ]
+
+
+def test_constant_range_not_materialized():
+    # the range does not terminate
+    res = ConstantFolder().visit(Range(Integer(5), Integer(0), Integer(0)))
+    assert isinstance(res, Range)
+    res = ConstantFolder().visit(Range(Integer(MAX_RANGE_CONSTANT_LENGTH + 1)))
+    assert isinstance(res, Range)
+    res = ConstantFolder().visit(Range(Integer(MAX_RANGE_CONSTANT_LENGTH)))
+    assert isinstance(res, UPLCConstant)
+
+
+def test_constant_range_compile_emits_constant():
+    p = Program(
+        (1, 0, 0),
+        PLambda(["f"], FoldList(Range(Integer(3)), PVar("f"), Integer(0))),
+    )
+    res = compile(p, OPT_O2_CONFIG).dumps()
+    assert "(con (list integer) [0, 1, 2])" in res
+    assert "lessThanInteger" not in res
+
+
+@pytest.mark.parametrize(
+    "term,materialized",
+    [
+        (
+            PrependList(Integer(1), PrependList(Integer(2), EmptyIntegerList())),
+            "uplc[(con (list integer) [1, 2])]",
+        ),
+        (
+            PrependList(
+                IData(Integer(1)),
+                SingleDataList(
+                    ConstrData(Integer(0), SingleDataList(BData(ByteString(b"a"))))
+                ),
+            ),
+            "uplc[(con (list data) [I 1, Constr 0 [B #61]])]",
+        ),
+        # the empty list is kept as the builtin call
+        (EmptyDataList(), "(MkNilData ())"),
+        # non-constant elements
+        (
+            PrependList(Var("x"), PrependList(Integer(2), EmptyIntegerList())),
+            "((! MkCons) x uplc[(con (list integer) [2])])",
+        ),
+        # ill-typed lists fail at runtime
+        (
+            PrependList(Text("a"), EmptyIntegerList()),
+            "((! MkCons) 'a' MkNilBuiltinInteger ())",
+        ),
+    ],
+)
+def test_constant_list_materialization(term, materialized):
+    assert ConstantListMaterializer().visit(term).dumps() == materialized
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+def test_constant_list_materialization_compile(config):
+    p = Program(
+        (1, 0, 0),
+        PLambda(
+            ["x"],
+            LengthList(
+                PrependList(
+                    PVar("x"),
+                    PrependList(IData(Integer(1)), SingleDataList(IData(Integer(2)))),
+                )
+            ),
+        ),
+    )
+    res = uplc_eval(compile(p, config), uplc_ast.PlutusInteger(0)).result
+    assert res == uplc_ast.BuiltinInteger(3)
+
+
+def test_constant_list_materialization_compile_folded_elements():
+    # the elements are only constant once they are folded
+    p = Program(
+        (1, 0, 0),
+        PLambda(
+            ["x"],
+            PrependList(
+                PVar("x"),
+                PrependList(
+                    IData(AddInteger(Integer(1), Integer(2))),
+                    SingleDataList(IData(Integer(4))),
+                ),
+            ),
+        ),
+    )
+    res = compile(p, OPT_O1_CONFIG).dumps()
+    assert "(con (list data) [I 4])" in res
+    res = compile(p, OPT_O2_CONFIG).dumps()
+    assert "(con (list data) [I 3, I 4])" in res
+    assert res.count("mkCons") == 1
+
+
+def test_tail_chain_sharing():
+    p = Program(
+        (1, 0, 0),
+        PLambda(
+            ["d"],
+            Apply(
+                PVar("f"),
+                *(ConstantNthField(PVar("d"), i) for i in range(4)),
+            ),
+        ),
+    )
+    res = TailChainSharer().visit(p).dumps()
+    # the fields are bound once, followed by the tails at indices 1 and 2
+    assert res.count("UnConstrData") == 1
+    assert "0tail_2_ =" in res and "0tail_3_" not in res
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+@pytest.mark.parametrize(
+    "xs,c,expected", [([10, 20], False, 30), ([10, 20, 30, 40], True, 60)]
+)
+def test_tail_chain_sharing_compile(config, xs, c, expected):
+    # the access to index 3 is not evaluated for c = False and may not fail
+    p = Program(
+        (1, 0, 0),
+        PLambda(
+            ["xs", "c"],
+            AddInteger(
+                ConstantIndexAccessList(PVar("xs"), 1),
+                Ite(
+                    PVar("c"),
+                    ConstantIndexAccessList(PVar("xs"), 3),
+                    ConstantIndexAccessList(PVar("xs"), 0),
+                ),
+            ),
+        ),
+    )
+    res = uplc_eval(
+        compile(p, config),
+        uplc_ast.BuiltinList([uplc_ast.BuiltinInteger(x) for x in xs]),
+        uplc_ast.BuiltinBool(c),
+    ).result
+    assert res == uplc_ast.BuiltinInteger(expected)
+
+
+def _destructure(constructor):
+    return DestructureFields(
+        PVar("d"),
+        PLambda(
+            ["a", "b", "c"],
+            AddInteger(
+                UnIData(PVar("a")),
+                MultiplyInteger(UnIData(PVar("b")), UnIData(PVar("c"))),
+            ),
+        ),
+        [0, 2, 5],
+        constructor,
+    )
+
+
+def test_destructure_fields():
+    res = Program((1, 0, 0), PLambda(["d"], _destructure(1))).dumps()
+    assert res.count("UnConstrData") == 1
+    with pytest.raises(ValueError):
+        DestructureFields(PVar("d"), PVar("f"), [2, 1])
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+@pytest.mark.parametrize("constructor,expected", [(None, 10), (1, 10), (0, None)])
+def test_destructure_fields_compile(config, constructor, expected):
+    p = Program((1, 0, 0), PLambda(["d"], _destructure(constructor)))
+    res = uplc_eval(
+        compile(p, config),
+        uplc_ast.PlutusConstr(1, [uplc_ast.PlutusInteger(i) for i in range(6)]),
+    ).result
+    if expected is None:
+        assert isinstance(res, Exception)
+    else:
+        assert res == uplc_ast.BuiltinInteger(expected)
+
+
+def _single_int_list():
+    return UPLCConstant(
+        uplc_ast.BuiltinList([uplc_ast.BuiltinInteger(1)], uplc_ast.BuiltinInteger(0))
+    )
+
+
+def test_index_access_fast_pattern_cache():
+    assert IndexAccessListFast(3) is IndexAccessListFast(3)
+    with pytest.raises(ValueError):
+        IndexAccessListFast(0)
+
+
+@pytest.mark.parametrize(
+    "lst,i,unchecked,expected",
+    [
+        (PVar("xs"), Integer(2), False, ConstantIndexAccessList(PVar("xs"), 2)),
+        (PVar("xs"), Integer(2), True, ConstantIndexAccessListFast(PVar("xs"), 2)),
+        (PVar("xs"), PVar("i"), False, IndexAccessList(PVar("xs"), PVar("i"))),
+        # looping through a single element is cheapest without skipping
+        (
+            _single_int_list(),
+            PVar("i"),
+            True,
+            IndexAccessList(_single_int_list(), PVar("i")),
+        ),
+    ],
+)
+def test_index_access_strategy(lst, i, unchecked, expected):
+    res = IndexAccessOptimizer(unchecked).visit(IndexAccessList(lst, i))
+    assert res.dumps() == expected.dumps()
+
+
+def test_index_access_strategy_skip():
+    res = IndexAccessOptimizer(True).visit(IndexAccessList(PVar("xs"), PVar("i")))
+    assert type(res).step_size > 1
+    res = IndexAccessOptimizer(True).visit(IndexAccessList(PVar("xs"), Integer(1000)))
+    assert type(res).step_size > 1
+
+
+@pytest.mark.parametrize("i,expected", [(0, 0), (7, 7), (39, 39), (40, None)])
+def test_index_access_strategy_compile(i, expected):
+    p = Program((1, 0, 0), PLambda(["xs", "i"], IndexAccessList(PVar("xs"), PVar("i"))))
+    res = uplc_eval(
+        compile(p, OPT_O3_CONFIG),
+        uplc_ast.BuiltinList([uplc_ast.BuiltinInteger(x) for x in range(40)]),
+        uplc_ast.BuiltinInteger(i),
+    ).result
+    if expected is None:
+        assert isinstance(res, Exception)
+    else:
+        assert res == uplc_ast.BuiltinInteger(expected)
+
+
+def _add_map(i, lst: AST = PVar("xs")):
+    return MapList(
+        lst,
+        PLambda(["x"], AddInteger(PVar("x"), Integer(i))),
+        EmptyIntegerList(),
+    )
+
+
+def _long_list():
+    return UPLCConstant(
+        uplc_ast.BuiltinList(
+            [uplc_ast.BuiltinInteger(i) for i in range(100)], uplc_ast.BuiltinInteger(0)
+        )
+    )
+
+
+@pytest.mark.parametrize(
+    "maps,specialized",
+    [
+        ([_add_map(0)], True),
+        ([_add_map(i) for i in range(2)], True),
+        # every specialized loop adds a copy of the loop to the script
+        ([_add_map(i) for i in range(6)], False),
+        # the loops do not run
+        ([_add_map(i, EmptyIntegerList()) for i in range(2)], False),
+        # occurrences without lambda literals keep the loop shared, which is worth it for long lists
+        (
+            [_add_map(i, _long_list()) for i in range(2)]
+            + [MapList(PVar("xs"), PVar("g"), EmptyIntegerList()) for _ in range(3)],
+            True,
+        ),
+        (
+            [_add_map(i) for i in range(2)]
+            + [MapList(PVar("xs"), PVar("g"), EmptyIntegerList()) for _ in range(3)],
+            False,
+        ),
+    ],
+)
+def test_operator_inlining(maps, specialized):
+    k = sum(isinstance(m.m, Lambda) for m in maps)
+    p = Program((1, 0, 0), PLambda(["xs", "g"], Apply(Var("f"), *maps)))
+    res = OperatorInliner().visit(p)
+    assert specialized == (
+        sum(isinstance(x, MapList) for x in res.prog.term.xs) == len(maps) - k
+    )
+    if specialized:
+        # the loop applies the lambda literal instead of a variable bound to it
+        assert res.dumps().count("(\\0x_ -> ") == k
+
+
+def _maps(k: int, lst: typing.Callable[[], AST]) -> Program:
+    """The sum of the sums of k maps over the list"""
+    sums = [
+        FoldList(
+            _add_map(i, lst()),
+            PLambda(["a", "x"], AddInteger(PVar("a"), PVar("x"))),
+            Integer(0),
+        )
+        for i in range(k)
+    ]
+    term = sums[0]
+    for s in sums[1:]:
+        term = AddInteger(term, s)
+    return Program((1, 0, 0), PLambda(["xs"], term))
+
+
+@pytest.mark.parametrize(
+    "program",
+    [
+        lambda: _maps(2, lambda: PVar("xs")),
+        lambda: _maps(2, EmptyIntegerList),
+        lambda: _maps(1, lambda: PVar("xs")),
+    ],
+)
+def test_operator_inlining_cost(program):
+    for off, on in _flag_costs(
+        program,
+        "inline_list_operators",
+        uplc_ast.BuiltinList([uplc_ast.BuiltinInteger(i) for i in range(4)]),
+    ):
+        assert on.cpu <= off.cpu and on.memory <= off.memory
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+def test_operator_inlining_compile(config):
+    # the operators refer to variables that have the names of the loop variables
+    p = Program(
+        (1, 0, 0),
+        PLambda(
+            ["xs", "a"],
+            AddInteger(
+                FoldList(
+                    PVar("xs"),
+                    PLambda(
+                        ["b", "x"],
+                        AddInteger(PVar("b"), MultiplyInteger(PVar("x"), PVar("a"))),
+                    ),
+                    Integer(0),
+                ),
+                LengthList(
+                    FilterList(
+                        PVar("xs"),
+                        PLambda(["x"], LessThanInteger(PVar("x"), PVar("a"))),
+                        EmptyIntegerList(),
+                    )
+                ),
+            ),
+        ),
+    )
+    res = uplc_eval(
+        compile(p, config),
+        uplc_ast.BuiltinList([uplc_ast.BuiltinInteger(i) for i in range(4)]),
+        uplc_ast.BuiltinInteger(2),
+    ).result
+    assert res == uplc_ast.BuiltinInteger(12 + 2)
+
+
+def _f(*params: str) -> Lambda:
+    return Lambda(list(params), AddInteger(Var("a"), Var("c")))
+
+
+@pytest.mark.parametrize(
+    "term,eliminated",
+    [
+        # dropped at all calls
+        (
+            Let(
+                [("f", _f("a", "b", "c"))],
+                AddInteger(
+                    Apply(Var("f"), Var("x"), Integer(1), Var("y")),
+                    Apply(Var("f"), Var("y"), Var("x"), Var("x")),
+                ),
+            ),
+            "(let f = (\\a c -> (AddInteger a c)) in (AddInteger (f x y) (f y x)))",
+        ),
+        # the argument may fail at one call
+        (
+            Let(
+                [("f", _f("a", "b", "c"))],
+                AddInteger(
+                    Apply(Var("f"), Var("x"), Integer(1), Var("y")),
+                    Apply(Var("f"), Var("y"), UnIData(Var("x")), Var("x")),
+                ),
+            ),
+            "(let f = (\\a b c -> (AddInteger a c)) in (AddInteger (f x 1 y) (f y (UnIData x) x)))",
+        ),
+        # the function is passed as a value
+        (
+            Let(
+                [("f", _f("a", "b", "c"))],
+                Apply(
+                    Var("g"), Var("f"), Apply(Var("f"), Var("x"), Integer(1), Var("y"))
+                ),
+            ),
+            "(let f = (\\a b c -> (AddInteger a c)) in (g f (f x 1 y)))",
+        ),
+        # the function is called with less arguments
+        (
+            Let(
+                [("f", _f("a", "b", "c"))],
+                Apply(Apply(Var("f"), Var("x"), Integer(1)), Var("y")),
+            ),
+            "(let f = (\\a b c -> (AddInteger a c)) in ((f x 1) y))",
+        ),
+        # one parameter is kept
+        (
+            Let(
+                [("f", Lambda(["b"], Integer(0)))],
+                AddInteger(Apply(Var("f"), Integer(1)), Apply(Var("f"), Var("x"))),
+            ),
+            "(let f = (\\b -> 0) in (AddInteger (f 1) (f x)))",
+        ),
+        # the later uses refer to another binding of the same name
+        (
+            Let(
+                [
+                    ("f", _f("a", "b", "c")),
+                    ("g", Apply(Var("f"), Var("x"), Integer(1), Var("y"))),
+                    ("f", Integer(0)),
+                ],
+                AddInteger(Var("f"), Var("g")),
+            ),
+            "(let f = (\\a c -> (AddInteger a c));g = (f x y);f = 0 in (AddInteger f g))",
+        ),
+    ],
+)
+def test_dead_parameter_elimination(term, eliminated):
+    assert DeadParameterEliminator().visit(term).dumps() == eliminated
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+@pytest.mark.parametrize("b,expected", [(Integer(1), 4), (UnIData(PVar("x")), None)])
+def test_dead_parameter_elimination_compile(config, b, expected):
+    p = Program(
+        (1, 0, 0),
+        PLambda(
+            ["x"],
+            PLet(
+                [("f", PLambda(["a", "b"], AddInteger(PVar("a"), Integer(1))))],
+                AddInteger(
+                    Apply(PVar("f"), PVar("x"), Integer(2)),
+                    Apply(PVar("f"), Integer(1), b),
+                ),
+            ),
+        ),
+    )
+    res = uplc_eval(compile(p, config), uplc_ast.BuiltinInteger(1)).result
+    if expected is None:
+        assert isinstance(res, Exception)
+    else:
+        assert res == uplc_ast.BuiltinInteger(expected)
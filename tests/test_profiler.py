@@ -0,0 +1,64 @@
+import pytest
+from uplc import eval as uplc_eval
+from uplc.ast import BuiltinInteger, BuiltinList
+from uplc.cost_model import Budget
+
+from pluthon import (
+    Program,
+    Integer,
+    AddInteger,
+    FoldList,
+    LengthList,
+    PLambda,
+    PVar,
+    compile,
+)
+from pluthon.compiler_config import OPT_CONFIGS, OPT_O0_CONFIG
+from pluthon.profiler import profile
+
+
+def program():
+    return Program(
+        (1, 0, 0),
+        PLambda(
+            ["input"],
+            AddInteger(
+                LengthList(PVar("input")),
+                FoldList(
+                    PVar("input"),
+                    PLambda(["a", "x"], AddInteger(PVar("a"), PVar("x"))),
+                    Integer(0),
+                ),
+            ),
+        ),
+    )
+
+
+ARGUMENT = BuiltinList([BuiltinInteger(i) for i in range(5)], BuiltinInteger(0))
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+def test_profile_attributes_total_cost(config):
+    res = profile(program(), ARGUMENT, config=config)
+    assert res.result == BuiltinInteger(10 + 5)
+    assert res.cost == uplc_eval(compile(program(), config), ARGUMENT).cost
+    total = Budget(0, 0)
+    for cost in res.costs.values():
+        total += cost
+    assert total == res.cost
+    assert res.by_pattern()["FoldList"].cpu > 0
+    assert (
+        sum(int(line.rsplit(" ", 1)[1]) for line in res.flame_graph().splitlines())
+        == res.cost.cpu
+    )
+
+
+def test_profile_call_sites():
+    res = profile(program(), ARGUMENT, config=OPT_O0_CONFIG)
+    call_sites = res.by_call_site()
+    length = call_sites[("LengthList", "prog.term.xs[0]")]
+    fold = call_sites[("FoldList", "prog.term.xs[1]")]
+    assert length.cpu > 0 and fold.cpu > 0
+    assert length.cpu + fold.cpu < res.cost.cpu
+    # LengthList is composed of a FoldList, which is attributed to the same call site
+    assert call_sites[("FoldList", "prog.term.xs[0]")].cpu <= length.cpu
@@ -0,0 +1,60 @@
+import cbor2
+import pytest
+from uplc import flatten
+from uplc.ast import Error as UPLCError
+
+from pluthon import (
+    Program,
+    AddInteger,
+    IndexAccessList,
+    LengthList,
+    PLambda,
+    PVar,
+    compile,
+    compile_with_source_map,
+)
+from pluthon.compiler_config import OPT_CONFIGS
+from pluthon.source_map import SourceMap, preorder
+
+
+def program():
+    return Program(
+        (1, 0, 0),
+        PLambda(
+            ["input", "index"],
+            AddInteger(
+                LengthList(PVar("input")),
+                IndexAccessList(PVar("input"), PVar("index")),
+            ),
+        ),
+    )
+
+
+@pytest.mark.parametrize("config", OPT_CONFIGS)
+def test_source_map(config):
+    # unchecked index accesses do not fail explicitly
+    config = config.update(unchecked_index_access=False)
+    res, source_map = compile_with_source_map(program(), config)
+    assert res.dumps() == compile(program(), config).dumps()
+    terms = list(preorder(res))
+    assert len(source_map) == len(terms)
+    # the terms end before the padding of the flat encoding
+    assert 0 < source_map.bit_offsets[-1] <= 8 * len(cbor2.loads(flatten(res)))
+    assert list(source_map.bit_offsets) == sorted(source_map.bit_offsets)
+    # failures can be traced back to the pattern that generated them
+    errors = [i for i, t in enumerate(terms) if isinstance(t, UPLCError)]
+    assert errors
+    for i in errors:
+        assert source_map.origin(i).generator == "IndexAccessList"
+        assert source_map.origin_at_bit(source_map.bit_offsets[i]) == source_map.origin(
+            i
+        )
+    # the index is written directly in the program
+    (index,) = [
+        o
+        for o in source_map.origins
+        if o.path == "prog.term.xs[1].i" and o.node == "Var"
+    ]
+    assert index.generator is None
+    assert set(source_map.size_by_pattern()) >= {"<program>", "IndexAccessList"}
+    assert SourceMap.from_dict(source_map.to_dict()) == source_map